@@ -0,0 +1,83 @@
+"""
+Test runner is a library for running unit tests on Python code.
+
+It offers the opinion to automatically detect the correct run settings for
+the tests and gives information about the test results and coverage information.
+
+Test-Runner is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Test-Runner is distributed in the hope that it will be useful
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Test-Runner.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import argparse
+import shutil
+import tempfile
+import time
+from typing import List, Optional
+
+from testrunner.environments.base_layer import ToolingBaseLayers
+from testrunner.environments.managed_environment import temporary_environment
+from testrunner.runners.nose2_runner import Nose2Runner
+from testrunner.runners.nose_runner import NoseRunner
+from testrunner.runners.pytest_runner import PyTestRunner
+
+RUNNERS = {"pytest": PyTestRunner, "nose": NoseRunner, "nose2": Nose2Runner}
+
+
+def venv_ready_latency(
+    tooling: List[str], packages: List[str], layers: Optional[ToolingBaseLayers]
+) -> float:
+    """Measures the time until a venv with tooling and packages is ready"""
+    start = time.perf_counter()
+    with temporary_environment("benchmark") as env:
+        env.add_packages_for_installation(packages)
+        env.add_packages_for_installation(tooling)
+        if layers is not None:
+            layers.apply(env, tooling)
+        env.run_commands(["true"])
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare venv-ready latency with and without a tooling base layer"
+    )
+    parser.add_argument("--runner", choices=sorted(RUNNERS), default="pytest")
+    parser.add_argument("--packages", nargs="*", default=["six"])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    runner = RUNNERS[args.runner]("benchmark", ".")
+    tooling = runner._tooling_packages()
+    root = tempfile.mkdtemp()
+    try:
+        layers = ToolingBaseLayers(root)
+        start = time.perf_counter()
+        layers.get(tooling)
+        build_time = time.perf_counter() - start
+
+        without = [
+            venv_ready_latency(tooling, args.packages, None) for _ in range(args.repeat)
+        ]
+        with_layer = [
+            venv_ready_latency(tooling, args.packages, layers)
+            for _ in range(args.repeat)
+        ]
+        print("tooling:              {}".format(", ".join(tooling)))
+        print("base layer build:     {:.2f}s (once)".format(build_time))
+        print("without base layer:   {:.2f}s".format(min(without)))
+        print("with base layer:      {:.2f}s".format(min(with_layer)))
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
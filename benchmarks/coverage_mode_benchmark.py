@@ -0,0 +1,119 @@
+"""
+Test runner is a library for running unit tests on Python code.
+
+It offers the opinion to automatically detect the correct run settings for
+the tests and gives information about the test results and coverage information.
+
+Test-Runner is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Test-Runner is distributed in the hope that it will be useful
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Test-Runner.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from typing import Dict
+
+from testrunner.coverage_mode import CoverageMode
+from testrunner.runners.nose2_runner import Nose2Runner
+from testrunner.runners.nose_runner import NoseRunner
+from testrunner.runners.pytest_runner import PyTestRunner
+
+RUNNERS = {"pytest": PyTestRunner, "nose": NoseRunner, "nose2": Nose2Runner}
+
+MODULE = """
+def collatz_length(number):
+    length = 1
+    while number != 1:
+        if number % 2 == 0:
+            number //= 2
+        else:
+            number = 3 * number + 1
+        length += 1
+    return length
+
+
+def longest_chain(limit):
+    return max(range(1, limit), key=collatz_length)
+"""
+
+TEST_MODULE = """
+import unittest
+
+from refsuite.chains import collatz_length, longest_chain
+
+
+class ChainTest{index}(unittest.TestCase):
+    def test_length(self):
+        self.assertEqual(112, collatz_length(27))
+
+    def test_longest_chain(self):
+        self.assertGreater(longest_chain({limit}), 0)
+"""
+
+
+def write_reference_suite(path: str, modules: int, limit: int) -> None:
+    """Writes a CPU-bound project whose tests spend their time in the package"""
+    os.makedirs(os.path.join(path, "refsuite"))
+    os.makedirs(os.path.join(path, "tests"))
+    open(os.path.join(path, "refsuite", "__init__.py"), "w").close()
+    open(os.path.join(path, "tests", "__init__.py"), "w").close()
+    with open(os.path.join(path, "refsuite", "chains.py"), "w") as module:
+        module.write(MODULE)
+    for index in range(modules):
+        test_path = os.path.join(path, "tests", "test_chains{}.py".format(index))
+        with open(test_path, "w") as test_module:
+            test_module.write(TEST_MODULE.format(index=index, limit=limit))
+
+
+def run_time(runner_type: type, path: str, mode: CoverageMode, repeat: int) -> float:
+    """Gives the minimal time of repeated runs of the suite in one venv"""
+    runner = runner_type("refsuite", path, coverage_mode=mode)
+    times = []
+    with runner.prepare_environment(install=True) as env:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            runner.run_in_environment(env)
+            times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Measure the overhead of the coverage modes on a reference suite"
+    )
+    parser.add_argument("--runner", choices=sorted(RUNNERS), default="pytest")
+    parser.add_argument("--modules", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    path = tempfile.mkdtemp()
+    try:
+        write_reference_suite(path, args.modules, args.limit)
+        times: Dict[CoverageMode, float] = {}
+        for mode in CoverageMode:
+            times[mode] = run_time(RUNNERS[args.runner], path, mode, args.repeat)
+        for mode in CoverageMode:
+            overhead = times[mode] / times[CoverageMode.OFF] - 1
+            print(
+                "{:<6} {:8.2f}s  overhead {:+7.1%}".format(
+                    mode.name.lower(), times[mode], overhead
+                )
+            )
+    finally:
+        shutil.rmtree(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Test runner is a library for running unit tests on Python code.
+
+It offers the opinion to automatically detect the correct run settings for
+the tests and gives information about the test results and coverage information.
+
+Test-Runner is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Test-Runner is distributed in the hope that it will be useful
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Test-Runner.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import timeit
+
+from plumbum import local  # type: ignore
+
+from testrunner.detection import RunnerTypeDetector
+from testrunner.runner_type import RunnerType
+
+
+def create_repository(root: str, packages: int, modules: int) -> None:
+    """Creates a synthetic nose2 project with VCS metadata and a virtualenv"""
+    with open(os.path.join(root, "setup.py"), "w") as f:
+        f.write("setup(name='synthetic', tests_require=['nose2'])\n")
+    body = "import os\n\n\ndef function():\n    return os.getcwd()\n" * 50
+    for package in range(packages):
+        directory = os.path.join(root, "package{}".format(package))
+        os.makedirs(directory)
+        for module in range(modules):
+            path = os.path.join(directory, "module{}.py".format(module))
+            with open(path, "w") as f:
+                f.write(body)
+    for noise in (".git", "venv"):
+        directory = os.path.join(root, noise, "objects")
+        os.makedirs(directory)
+        for index in range(packages * modules):
+            with open(os.path.join(directory, str(index)), "wb") as f:
+                f.write(os.urandom(16 * 1024))
+    with open(os.path.join(root, "venv", "pyvenv.cfg"), "w") as f:
+        f.write("home = /usr/bin\n")
+
+
+# The grep-based checks that Runner used before RunnerTypeDetector replaced
+# them, kept as the baseline of the benchmark
+# pylint: disable=too-many-return-statements
+def is_pytest(repo_path: str) -> bool:
+    """Checks for PyTest with grep sub-processes"""
+    grep = local["grep"]
+    setup_py = os.path.join(repo_path, "setup.py")
+    if os.path.isfile(setup_py):
+        _, r, _ = grep["test_suite=pytest", setup_py].run(retcode=None)
+        if len(r) > 0:
+            return True
+
+        _, r, _ = grep["test_suite=py.test", setup_py].run(retcode=None)
+        if len(r) > 0:
+            return True
+
+    if os.path.isfile(os.path.join(repo_path, "pytest.ini")):
+        return True
+
+    _, r, _ = grep["-R", "import pytest", repo_path].run(retcode=None)
+    if len(r) > 0:
+        return True
+
+    _, r, _ = grep["-R", "from pytest import", repo_path].run(retcode=None)
+    if len(r) > 0:
+        return True
+
+    _, r, _ = grep["-R", "pytest", repo_path].run(retcode=None)
+    if len(r) > 0:
+        return True
+
+    return False
+
+
+def _setup_py_mentions(repo_path: str, pattern: str) -> bool:
+    setup_py = os.path.join(repo_path, "setup.py")
+    if not os.path.isfile(setup_py):
+        return False
+    _, r, _ = local["grep"][pattern, setup_py].run(retcode=None)
+    return len(r) > 0
+
+
+def is_nose2(repo_path: str) -> bool:
+    """Checks for nose2 with a grep sub-process"""
+    return _setup_py_mentions(repo_path, "nose2")
+
+
+def is_nose(repo_path: str) -> bool:
+    """Checks for nose with a grep sub-process"""
+    return _setup_py_mentions(repo_path, "nose")
+
+
+def is_setup_py(repo_path: str) -> bool:
+    """Checks for `setup.py test` with a grep sub-process"""
+    return _setup_py_mentions(repo_path, "test_suite=")
+
+
+def detect_with_grep(repo_path: str) -> RunnerType:
+    """The previous detection chain based on grep sub-processes"""
+    if is_pytest(repo_path):
+        return RunnerType.PYTEST
+    if is_nose2(repo_path):
+        return RunnerType.NOSE2
+    if is_nose(repo_path):
+        return RunnerType.NOSE
+    if is_setup_py(repo_path):
+        return RunnerType.SETUP_PY
+    # pylint: disable=protected-access
+    return RunnerType._UNKNOWN
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare the grep-based and the in-process runner detection"
+    )
+    parser.add_argument("--packages", type=int, default=50)
+    parser.add_argument("--modules", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp()
+    try:
+        create_repository(root, args.packages, args.modules)
+        detector = RunnerTypeDetector()
+        assert detect_with_grep(root) == detector.detect(root).runner_type
+
+        grep_time = min(
+            timeit.repeat(lambda: detect_with_grep(root), number=1, repeat=args.repeat)
+        )
+        detector_time = min(
+            timeit.repeat(lambda: detector.detect(root), number=1, repeat=args.repeat)
+        )
+        print("files per kind:    {}".format(args.packages * args.modules))
+        print("grep chain:        {:.4f}s".format(grep_time))
+        print("single-pass walk:  {:.4f}s".format(detector_time))
+        print("speed-up:          {:.1f}x".format(grep_time / detector_time))
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
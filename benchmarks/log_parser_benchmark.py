@@ -0,0 +1,115 @@
+"""
+Test runner is a library for running unit tests on Python code.
+
+It offers the opinion to automatically detect the correct run settings for
+the tests and gives information about the test results and coverage information.
+
+Test-Runner is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Test-Runner is distributed in the hope that it will be useful
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Test-Runner.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import argparse
+import os
+import re
+import tempfile
+import time
+from typing import Callable
+
+from testrunner.environments.capture import CapturedOutput
+from testrunner.runners.pytest_runner import PyTestRunner
+
+
+def legacy_pytest_result(log: str) -> None:
+    """The former parsing of PyTestRunner, scanning the log from its start"""
+    re.search(
+        r"[=]+ (([0-9]+) failed, )?"
+        r"([0-9]+) passed"
+        r"(, ([0-9]+) skipped)?"
+        r"(, ([0-9]+) warnings)?"
+        r"(, ([0-9]+) error)?"
+        r" in ([0-9.]+) seconds",
+        log,
+    )
+    matches = re.search(
+        r"TOTAL\s+([0-9]+)\s+([0-9]+)\s+(([0-9]+)\s+([0-9]+)\s+)?([0-9]+%)", log
+    )
+    if not matches:
+        re.search(
+            r".py\s+([0-9]+)\s+([0-9]+)\s+(([0-9]+)\s+([0-9]+)\s+)?([0-9]+%)", log
+        )
+
+
+def write_log(path: str, size: int, coverage: bool) -> None:
+    """Writes a synthetic pytest log of about size bytes"""
+    with open(path, "w") as log:
+        written = 0
+        index = 0
+        while written < size:
+            line = "tests/test_module{0}.py::test_case_{0} PASSED [ 42%]\n".format(
+                index
+            )
+            log.write(line)
+            written += len(line)
+            index += 1
+        if coverage:
+            log.write("Name    Stmts   Miss  Cover   Missing\n")
+            for module in range(200):
+                log.write("pkg/module{}.py    100    10    90%   1-10\n".format(module))
+            log.write("TOTAL    20000    2000    90%\n")
+        log.write("===== 3 failed, {} passed in 42.0 seconds =====\n".format(index))
+
+
+def measure(function: Callable[[], object], repeat: int) -> float:
+    """Gives the minimal time of repeated calls of a function"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare the former and the tail-anchored log parsing"
+    )
+    parser.add_argument("--size", type=int, default=128, help="Log size in MB")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--no-coverage",
+        action="store_true",
+        help="Omit the coverage table, the worst case for both parsers",
+    )
+    args = parser.parse_args()
+
+    handle, path = tempfile.mkstemp(suffix=".log")
+    os.close(handle)
+    try:
+        write_log(path, args.size * 1024 * 1024, not args.no_coverage)
+        with open(path) as log_file:
+            log = log_file.read()
+        runner = PyTestRunner("benchmark", ".")
+        legacy = measure(lambda: legacy_pytest_result(log), args.repeat)
+        parser_str = measure(lambda: runner.get_run_result(log), args.repeat)
+        # An empty tail makes the parser search the memory-mapped spill file
+        spilled = CapturedOutput("", path, os.path.getsize(path))
+        parser_file = measure(lambda: runner.get_run_result(spilled), args.repeat)
+        print("log size:               {:.0f} MB".format(len(log) / 1024 / 1024))
+        print("former parsing:         {:.4f}s".format(legacy))
+        print("parser on string:       {:.4f}s".format(parser_str))
+        print("parser on mapped file:  {:.4f}s".format(parser_file))
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
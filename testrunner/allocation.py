@@ -0,0 +1,439 @@
+"""
+Test runner is a library for running unit tests on Python code.
+
+It offers the opinion to automatically detect the correct run settings for
+the tests and gives information about the test results and coverage information.
+
+Test-Runner is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Test-Runner is distributed in the hope that it will be useful
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Test-Runner.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import contextlib
+import fcntl
+import glob
+import json
+import os
+import re
+import tempfile
+import time
+import uuid
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+import attr
+from pytesting_utils import Preconditions
+
+_LOCK_FILE = ".lock"
+_ALLOCATIONS_FILE = "allocations.json"
+_NODE_PATTERN = re.compile(r"node(\d+)$")
+
+
+def parse_cpu_list(cpu_list: str) -> List[int]:
+    """
+    Parses a CPU list of the Linux kernel.
+
+    :param cpu_list: A list like "0-3,8,10-11"
+    :return: The listed CPU ids in ascending order
+    """
+    cpus: Set[int] = set()
+    for part in cpu_list.strip().split(","):
+        if not part:
+            continue
+        first, _, last = part.partition("-")
+        cpus.update(range(int(first), int(last or first) + 1))
+    return sorted(cpus)
+
+
+def available_memory() -> int:
+    """
+    Measures the memory that is available for new processes.
+
+    :return: The available memory in bytes as estimated by the kernel, the
+    free memory if there is no estimate
+    """
+    try:
+        with open("/proc/meminfo") as meminfo:
+            for line in meminfo:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_AVPHYS_PAGES")
+
+
+# pylint: disable=too-few-public-methods
+@attr.s(frozen=True)
+class HostTopology:
+    """The CPU cores and memory of a host that runs the tests"""
+
+    units: List[Tuple[int, ...]] = attr.ib()
+    """The physical cores, each a tuple of its hyperthread siblings"""
+    nodes: Dict[int, int] = attr.ib()
+    """The NUMA node of each CPU"""
+    memory: int = attr.ib()
+    """The memory of the host in bytes"""
+
+    @property
+    def cpu_count(self) -> int:
+        """Gives the number of CPUs of all physical cores"""
+        return sum(len(unit) for unit in self.units)
+
+    @staticmethod
+    def read(sys_dir: str = "/sys") -> "HostTopology":
+        """
+        Reads the topology of the CPUs this process may run on.
+
+        CPUs without topology information are treated as physical cores
+        of their own on node 0.
+
+        :param sys_dir: The mount point of sysfs
+        :return: The topology
+        """
+        if hasattr(os, "sched_getaffinity"):
+            cpus = set(os.sched_getaffinity(0))
+        else:
+            cpus = set(range(os.cpu_count() or 1))
+        cpu_dir = os.path.join(sys_dir, "devices", "system", "cpu")
+        units = set()
+        for cpu in cpus:
+            siblings = _read_cpu_list(
+                os.path.join(cpu_dir, "cpu{}".format(cpu), "topology"),
+                "thread_siblings_list",
+            )
+            unit = tuple(sorted(cpus.intersection(siblings))) or (cpu,)
+            units.add(unit)
+        nodes = {cpu: 0 for cpu in cpus}
+        node_dirs = glob.glob(os.path.join(sys_dir, "devices", "system", "node", "*"))
+        for node_dir in node_dirs:
+            match = _NODE_PATTERN.search(node_dir)
+            if match is not None:
+                for cpu in cpus.intersection(_read_cpu_list(node_dir, "cpulist")):
+                    nodes[cpu] = int(match.group(1))
+        memory = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+        return HostTopology(sorted(units), nodes, memory)
+
+
+def _read_cpu_list(directory: str, name: str) -> List[int]:
+    try:
+        with open(os.path.join(directory, name)) as list_file:
+            return parse_cpu_list(list_file.read())
+    except (OSError, ValueError):
+        return []
+
+
+# pylint: disable=too-few-public-methods
+@attr.s(frozen=True)
+class Allocation:
+    """The CPU cores and memory allocated to one job"""
+
+    token: str = attr.ib()
+    cores: List[int] = attr.ib()
+    """The CPUs the job may run on"""
+    memory_nodes: List[int] = attr.ib()
+    """The NUMA nodes of the CPUs, from which the job allocates its memory"""
+    memory: int = attr.ib(default=0)
+    """The memory budget of the job in bytes"""
+
+
+# pylint: disable=too-few-public-methods
+@attr.s(frozen=True)
+class Utilization:
+    """The part of a host's resources that is allocated to jobs"""
+
+    cores_used: int = attr.ib()
+    cores_total: int = attr.ib()
+    memory_used: int = attr.ib()
+    memory_total: int = attr.ib()
+    jobs: int = attr.ib()
+
+
+class ResourceAllocator:
+    """
+    Hands out disjoint sets of CPU cores and memory budgets to concurrent jobs.
+
+    Physical cores are allocated as a whole with all their hyperthread
+    siblings, such that concurrent jobs never share a core's caches, and the
+    cores of a job are taken from as few NUMA nodes as possible.  Each
+    physical core is guarded by a file lock in the allocator's directory,
+    such that jobs in threads or processes of the host are coordinated, and
+    the cores of a crashed process are released by the operating system.
+    The memory budgets are kept in a file next to the locks.
+    """
+
+    def __init__(
+        self,
+        root_dir: str,
+        topology: Optional[HostTopology] = None,
+        memory: int = 0,
+        poll_interval: float = 0.5,
+    ) -> None:
+        """
+        Creates a new allocator.
+
+        :param root_dir: The directory holding the locks and budgets, it is
+        created if it does not exist; allocators sharing it share the host
+        :param topology: The topology of the host, it is read if none is given
+        :param memory: The memory that is handed out in bytes, the memory of
+        the host if zero
+        :param poll_interval: The seconds between attempts to allocate while
+        waiting for resources
+        """
+        Preconditions.check_argument(memory >= 0, "The memory has to be at least 0!")
+        os.makedirs(root_dir, exist_ok=True)
+        self._root_dir = root_dir
+        self._topology = topology if topology is not None else HostTopology.read()
+        self._memory = memory or self._topology.memory
+        self._poll_interval = poll_interval
+        self._locks: Dict[str, List[int]] = {}
+
+    def __getstate__(self) -> Dict[str, object]:
+        # Lock handles are only valid in the process that acquired them
+        state = self.__dict__.copy()
+        state["_locks"] = {}
+        return state
+
+    @property
+    def memory(self) -> int:
+        """Gives the memory that is handed out in bytes"""
+        return self._memory
+
+    @contextlib.contextmanager
+    def lease(
+        self, cores: int, memory: int = 0, timeout: Optional[float] = None
+    ) -> Iterator[Allocation]:
+        """
+        Allocates resources for the duration of a job.
+
+        :param cores: The number of CPUs the job needs, whole physical cores
+        are allocated, so the job may get more
+        :param memory: The memory budget of the job in bytes
+        :param timeout: The maximum seconds to wait for the resources, None
+        waits until they are available
+        :return: A context yielding the allocation, which is released
+        afterwards
+        """
+        allocation = self.acquire(cores, memory, timeout)
+        try:
+            yield allocation
+        finally:
+            self.release(allocation)
+
+    def acquire(
+        self, cores: int, memory: int = 0, timeout: Optional[float] = None
+    ) -> Allocation:
+        """
+        Allocates resources, waiting until they are available.
+
+        :param cores: The number of CPUs the job needs, whole physical cores
+        are allocated, so the job may get more
+        :param memory: The memory budget of the job in bytes
+        :param timeout: The maximum seconds to wait for the resources, None
+        waits until they are available
+        :return: The allocation, which has to be released with `release`
+        :raises TimeoutError: If the resources did not become available in time
+        """
+        Preconditions.check_argument(
+            0 < cores <= self._topology.cpu_count,
+            "The number of cores has to be between 1 and {}!".format(
+                self._topology.cpu_count
+            ),
+        )
+        Preconditions.check_argument(
+            0 <= memory <= self._memory,
+            "The memory has to be between 0 and {}!".format(self._memory),
+        )
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            allocation = self.try_acquire(cores, memory)
+            if allocation is not None:
+                return allocation
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(
+                    "Could not allocate {} cores and {} bytes in time".format(
+                        cores, memory
+                    )
+                )
+            time.sleep(self._poll_interval)
+
+    def try_acquire(self, cores: int, memory: int = 0) -> Optional[Allocation]:
+        """
+        Allocates resources if they are available.
+
+        :param cores: The number of CPUs the job needs
+        :param memory: The memory budget of the job in bytes
+        :return: The allocation, None if the resources are not available
+        """
+        with self._allocator_lock():
+            budgets = self._live_budgets()
+            if memory > self._memory - sum(budgets.values()):
+                return None
+            free = self._lock_free_units()
+            units = self._choose(free, cores)
+            for unit, lock in free.items():
+                if units is None or unit not in units:
+                    os.close(lock)
+            if units is None:
+                return None
+            token = uuid.uuid4().hex
+            self._locks[token] = [self._lock_job(token)]
+            self._locks[token].extend(free[unit] for unit in units)
+            budgets[token] = memory
+            self._write_budgets(budgets)
+        selected = sorted(cpu for unit in units for cpu in unit)
+        return Allocation(
+            token,
+            selected,
+            sorted({self._topology.nodes.get(cpu, 0) for cpu in selected}),
+            memory,
+        )
+
+    def release(self, allocation: Allocation) -> None:
+        """
+        Releases the resources of an allocation.
+
+        :param allocation: The allocation created by this allocator
+        """
+        with self._allocator_lock():
+            budgets = self._read_budgets()
+            budgets.pop(allocation.token, None)
+            self._write_budgets(budgets)
+            locks = self._locks.pop(allocation.token, [])
+            if locks:
+                os.remove(self._job_lock_path(allocation.token))
+            for lock in locks:
+                os.close(lock)
+
+    def utilization(self) -> Utilization:
+        """
+        Gives the resources that are currently allocated on the host.
+
+        :return: The allocated cores and memory of all jobs sharing the
+        allocator's directory
+        """
+        with self._allocator_lock():
+            budgets = self._live_budgets()
+            free = self._lock_free_units()
+            for lock in free.values():
+                os.close(lock)
+        free_cpus = sum(len(unit) for unit in free)
+        return Utilization(
+            self._topology.cpu_count - free_cpus,
+            self._topology.cpu_count,
+            sum(budgets.values()),
+            self._memory,
+            len(budgets),
+        )
+
+    def _choose(
+        self, free: Dict[Tuple[int, ...], int], cores: int
+    ) -> Optional[List[Tuple[int, ...]]]:
+        """Chooses free physical cores from as few NUMA nodes as possible"""
+        by_node: Dict[int, List[Tuple[int, ...]]] = {}
+        for unit in sorted(free):
+            by_node.setdefault(self._topology.nodes.get(unit[0], 0), []).append(unit)
+        sizes = {
+            node: sum(len(unit) for unit in units) for node, units in by_node.items()
+        }
+        fitting = [node for node, size in sizes.items() if size >= cores]
+        if fitting:
+            # The fullest node that fits keeps larger nodes free for larger jobs
+            nodes = [min(fitting, key=lambda node: (sizes[node], node))]
+        else:
+            nodes = sorted(sizes, key=lambda node: (-sizes[node], node))
+        chosen: List[Tuple[int, ...]] = []
+        count = 0
+        for node in nodes:
+            for unit in by_node[node]:
+                if count >= cores:
+                    return chosen
+                chosen.append(unit)
+                count += len(unit)
+        return chosen if count >= cores else None
+
+    def _lock_free_units(self) -> Dict[Tuple[int, ...], int]:
+        """Locks all free physical cores, giving their lock handles"""
+        free = {}
+        for unit in self._topology.units:
+            lock = self._try_lock(unit)
+            if lock is not None:
+                free[unit] = lock
+        return free
+
+    def _try_lock(self, unit: Tuple[int, ...]) -> Optional[int]:
+        path = os.path.join(self._root_dir, "core-{}.lock".format(unit[0]))
+        handle = os.open(path, os.O_RDWR | os.O_CREAT)
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(handle)
+            return None
+        return handle
+
+    def _live_budgets(self) -> Dict[str, int]:
+        """Reads the budgets, dropping those of processes that ended"""
+        budgets = self._read_budgets()
+        live = {
+            token: memory for token, memory in budgets.items() if self._is_held(token)
+        }
+        if len(live) < len(budgets):
+            self._write_budgets(live)
+        return live
+
+    def _lock_job(self, token: str) -> int:
+        """Locks the file that marks the job's budget as live"""
+        handle = os.open(self._job_lock_path(token), os.O_RDWR | os.O_CREAT)
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        return handle
+
+    def _is_held(self, token: str) -> bool:
+        path = self._job_lock_path(token)
+        try:
+            handle = os.open(path, os.O_RDWR)
+        except OSError:
+            return False
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return True
+        finally:
+            os.close(handle)
+        os.remove(path)
+        return False
+
+    def _job_lock_path(self, token: str) -> str:
+        return os.path.join(self._root_dir, "job-{}.lock".format(token))
+
+    def _read_budgets(self) -> Dict[str, int]:
+        try:
+            with open(os.path.join(self._root_dir, _ALLOCATIONS_FILE)) as budget_file:
+                return {
+                    str(token): int(memory)
+                    for token, memory in json.load(budget_file).items()
+                }
+        except (OSError, ValueError, AttributeError):
+            return {}
+
+    def _write_budgets(self, budgets: Dict[str, int]) -> None:
+        handle, tmp_path = tempfile.mkstemp(dir=self._root_dir, suffix=".tmp")
+        with os.fdopen(handle, "w") as budget_file:
+            json.dump(budgets, budget_file)
+        os.replace(tmp_path, os.path.join(self._root_dir, _ALLOCATIONS_FILE))
+
+    @contextlib.contextmanager
+    def _allocator_lock(self) -> Iterator[None]:
+        handle = os.open(
+            os.path.join(self._root_dir, _LOCK_FILE), os.O_RDWR | os.O_CREAT
+        )
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(handle)
@@ -0,0 +1,546 @@
+"""
+Test runner is a library for running unit tests on Python code.
+
+It offers the opinion to automatically detect the correct run settings for
+the tests and gives information about the test results and coverage information.
+
+Test-Runner is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Test-Runner is distributed in the hope that it will be useful
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Test-Runner.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import contextlib
+import json
+import os
+import tempfile
+import time
+import traceback
+from collections import deque
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from concurrent.futures.process import BrokenProcessPool
+from typing import (
+    Any,
+    Deque,
+    Dict,
+    Generator,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+import attr
+from pytesting_utils import Preconditions
+
+from testrunner.allocation import available_memory
+from testrunner.environments.managed_environment import (
+    ManagedEnvironment,
+    directory_size,
+)
+from testrunner.runner import Runner
+from testrunner.runner_type import RunnerType
+from testrunner.runners.abstract_runner import RunResult
+from testrunner.runners.measurements import RunStatus
+
+
+# pylint: disable=too-few-public-methods
+@attr.s
+class PipelineResult:
+    """The result of one project that was run by a pipeline"""
+
+    runner: Runner = attr.ib()
+    output: Optional[Tuple[str, str]] = attr.ib(default=None)
+    error: Optional[Exception] = attr.ib(default=None)
+    preparation_time: float = attr.ib(default=-1.0)
+    execution_time: float = attr.ib(default=-1.0)
+
+
+# pylint: disable=too-few-public-methods
+@attr.s
+class _Preparation:
+    stack: contextlib.ExitStack = attr.ib()
+    environment: ManagedEnvironment = attr.ib()
+    size: int = attr.ib()
+    time: float = attr.ib()
+
+
+class RunPipeline:
+    """
+    Runs a sequence of projects while preparing the venvs of upcoming ones.
+
+    The projects are executed one after the other in the calling thread.
+    Meanwhile a pool of worker threads creates the venvs and installs the
+    requirements for up to `lookahead` upcoming projects.  No further
+    preparation is started while the prepared but not yet executed venvs
+    occupy `max_disk_usage` bytes or more; venvs that are still being
+    prepared are estimated by the largest venv seen so far.  Removing a venv
+    after its run also happens in the background.
+    """
+
+    def __init__(
+        self,
+        runners: Iterable[Runner],
+        lookahead: int = 2,
+        workers: int = 2,
+        max_disk_usage: int = 0,
+    ) -> None:
+        """
+        Creates a new pipeline.
+
+        :param runners: The runners for the projects, in execution order
+        :param lookahead: The number of projects prepared ahead of execution
+        :param workers: The number of threads preparing venvs
+        :param max_disk_usage: The maximum size in bytes of the prepared venvs
+        waiting for execution, zero means unbounded
+        """
+        Preconditions.check_argument(lookahead >= 0, "The look-ahead must be >= 0!")
+        Preconditions.check_argument(workers > 0, "At least one worker is needed!")
+        Preconditions.check_argument(
+            max_disk_usage >= 0, "The disk usage has to be at least 0!"
+        )
+        self._runners = runners
+        self._lookahead = lookahead
+        self._workers = workers
+        self._max_disk_usage = max_disk_usage
+
+    def run(self) -> Iterator[PipelineResult]:
+        """
+        Runs all projects.
+
+        :return: An iterator over the results, in the order of the runners
+        """
+        runners = iter(self._runners)
+        pending: Deque[Tuple[Runner, "Future[_Preparation]"]] = deque()
+        largest_size = 0
+        with ThreadPoolExecutor(max_workers=self._workers) as executor:
+            try:
+                while True:
+                    if not pending:
+                        runner = next(runners, None)
+                        if runner is None:
+                            break
+                        pending.append((runner, executor.submit(_prepare, runner)))
+                    runner, future = pending.popleft()
+                    if future.exception() is None:
+                        largest_size = max(largest_size, future.result().size)
+                    self._schedule(executor, runners, pending, largest_size)
+                    yield self._execute(executor, runner, future)
+            finally:
+                for _, future in pending:
+                    future.add_done_callback(_close_preparation)
+
+    def _schedule(
+        self,
+        executor: ThreadPoolExecutor,
+        runners: Iterator[Runner],
+        pending: Deque[Tuple[Runner, "Future[_Preparation]"]],
+        largest_size: int,
+    ) -> None:
+        while len(pending) < self._lookahead and self._has_disk_space(
+            pending, largest_size
+        ):
+            runner = next(runners, None)
+            if runner is None:
+                return
+            pending.append((runner, executor.submit(_prepare, runner)))
+
+    def _has_disk_space(
+        self,
+        pending: Deque[Tuple[Runner, "Future[_Preparation]"]],
+        largest_size: int,
+    ) -> bool:
+        # The size of a venv that is still being prepared is not known yet,
+        # hence it is estimated by the largest venv seen so far.
+        if self._max_disk_usage == 0:
+            return True
+        usage = 0
+        for _, future in pending:
+            if not future.done():
+                usage += largest_size
+            elif future.exception() is None:
+                usage += future.result().size
+        return usage < self._max_disk_usage
+
+    @staticmethod
+    def _execute(
+        executor: ThreadPoolExecutor,
+        runner: Runner,
+        future: "Future[_Preparation]",
+    ) -> PipelineResult:
+        try:
+            preparation = future.result()
+        # pylint: disable=broad-except
+        except Exception as error:
+            return PipelineResult(runner, error=error)
+
+        result = PipelineResult(runner, preparation_time=preparation.time)
+        start = time.perf_counter()
+        try:
+            result.output = runner.run_in_environment(preparation.environment)
+        # pylint: disable=broad-except
+        except Exception as error:
+            result.error = error
+        finally:
+            result.execution_time = time.perf_counter() - start
+            executor.submit(preparation.stack.close)
+        return result
+
+
+def _prepare(runner: Runner) -> _Preparation:
+    start = time.perf_counter()
+    stack = contextlib.ExitStack()
+    try:
+        environment = stack.enter_context(runner.prepare_environment(install=True))
+        size = directory_size(environment.get_env_dir())
+    except BaseException:
+        stack.close()
+        raise
+    return _Preparation(stack, environment, size, time.perf_counter() - start)
+
+
+def _close_preparation(future: "Future[_Preparation]") -> None:
+    if not future.cancelled() and future.exception() is None:
+        future.result().stack.close()
+
+
+# pylint: disable=too-few-public-methods
+@attr.s(frozen=True)
+class Project:
+    """A project to be run by a batch runner"""
+
+    project_name: str = attr.ib()
+    repo_path: str = attr.ib()
+    runner: RunnerType = attr.ib(default=RunnerType.AUTO_DETECT)
+    time_limit: int = attr.ib(default=0)
+    junit_xml_file: Optional[str] = attr.ib(default=None)
+    memory_limit: int = attr.ib(default=0)
+
+
+# pylint: disable=too-few-public-methods
+@attr.s
+class BatchResult:
+    """The result of one project that was run by a batch runner"""
+
+    project: Project = attr.ib()
+    run_result: Optional[RunResult] = attr.ib(default=None)
+    output: Optional[Tuple[str, str]] = attr.ib(default=None)
+    error: Optional[str] = attr.ib(default=None)
+    time: float = attr.ib(default=-1.0)
+
+
+class MemoryHistory:
+    """
+    The peak memory of the previous runs of projects, as measured by runexec.
+
+    The peaks are kept in a JSON file by project name.  The peak of a run
+    that was killed for exceeding its memory limit is only a lower bound,
+    hence it does not lower a known peak.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Creates a new memory history.
+
+        :param path: The JSON file holding the peaks, it is created on the
+        first update if it does not exist
+        """
+        self._path = path
+        self._peaks: Dict[str, int] = {}
+        try:
+            with open(path) as history_file:
+                self._peaks = {
+                    str(name): int(peak)
+                    for name, peak in json.load(history_file).items()
+                }
+        except (OSError, ValueError, AttributeError, TypeError):
+            pass
+
+    def peak(self, project_name: str) -> Optional[int]:
+        """
+        Gives the peak memory of the last run of a project.
+
+        :param project_name: The name of the project
+        :return: The peak in bytes, None if the project was not run yet
+        """
+        return self._peaks.get(project_name)
+
+    def update(self, project_name: str, run_result: RunResult) -> None:
+        """
+        Records the peak memory of a run and saves the history.
+
+        :param project_name: The name of the project
+        :param run_result: The result of the run, it is ignored if it has no
+        memory measurement
+        """
+        if run_result.resources is None or run_result.resources.memory < 0:
+            return
+        peak = run_result.resources.memory
+        if run_result.status == RunStatus.OUT_OF_MEMORY:
+            peak = max(peak, self._peaks.get(project_name, 0))
+        self._peaks[project_name] = peak
+        directory = os.path.dirname(os.path.abspath(self._path))
+        handle, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(handle, "w") as history_file:
+                json.dump(self._peaks, history_file)
+            os.replace(tmp_path, self._path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+
+class BatchRunner:
+    """
+    Runs the tests of many projects in parallel on a pool of processes.
+
+    Each project is run by a `Runner` in one of the worker processes, the
+    results are yielded as soon as they are available.  An exception raised
+    while running a project is reported in the project's result.  If a
+    worker process dies, the projects that were still pending are run again,
+    each one in a process of its own, such that a crash only affects the
+    project that caused it.
+
+    With a memory history, projects are only admitted while the sum of the
+    peak memory of the running projects stays within the memory budget and
+    the measured available memory covers the peak of the next project;
+    projects wait in order otherwise.  One project is always admitted, such
+    that projects larger than the budget still run, alone.
+    """
+
+    def __init__(
+        self,
+        projects: Iterable[Project],
+        workers: Optional[int] = None,
+        memory_history: Optional[MemoryHistory] = None,
+        memory_budget: int = 0,
+        default_memory: int = 512 * 1024 * 1024,
+        **runner_options: Any,
+    ) -> None:
+        """
+        Creates a new batch runner.
+
+        :param projects: The projects to run
+        :param workers: The number of worker processes, defaults to the number
+        of CPUs
+        :param memory_history: An optional history of the peak memory of the
+        projects, which enables the memory-aware admission and is updated
+        with the measurements of the runs
+        :param memory_budget: The memory the running projects may use in
+        bytes, the memory available when the batch starts if zero
+        :param default_memory: The peak memory in bytes assumed for projects
+        without history and without memory limit
+        :param runner_options: Further keyword arguments for each `Runner`,
+        e.g., a venv pool or a wheelhouse; they have to be picklable
+        """
+        if workers is None:
+            workers = os.cpu_count() or 1
+        Preconditions.check_argument(workers > 0, "At least one worker is needed!")
+        Preconditions.check_argument(
+            memory_budget >= 0, "The memory budget has to be at least 0!"
+        )
+        self._projects = list(projects)
+        self._workers = workers
+        self._memory_history = memory_history
+        self._memory_budget = memory_budget
+        self._default_memory = default_memory
+        self._runner_options = runner_options
+        self._start_time = -1.0
+        self._end_time = -1.0
+        self._completed = 0
+        self._failed = 0
+        self._out_of_memory = 0
+        self._deferred: Set[Project] = set()
+        self._budget = 0
+
+    @property
+    def completed(self) -> int:
+        """Gives the number of projects that have been run so far"""
+        return self._completed
+
+    @property
+    def failed(self) -> int:
+        """Gives the number of projects that could not be run so far"""
+        return self._failed
+
+    @property
+    def out_of_memory(self) -> int:
+        """Gives the number of projects killed for exceeding their memory limit"""
+        return self._out_of_memory
+
+    @property
+    def deferred(self) -> int:
+        """Gives the number of projects that waited for memory so far"""
+        return len(self._deferred)
+
+    @property
+    def elapsed_time(self) -> float:
+        """Gives the time in seconds since the batch was started"""
+        if self._start_time < 0:
+            return 0.0
+        if self._end_time < 0:
+            return time.perf_counter() - self._start_time
+        return self._end_time - self._start_time
+
+    @property
+    def throughput(self) -> float:
+        """Gives the number of completed projects per minute"""
+        elapsed_time = self.elapsed_time
+        if elapsed_time <= 0:
+            return 0.0
+        return self._completed / elapsed_time * 60
+
+    def run(self) -> Iterator[BatchResult]:
+        """
+        Runs all projects.
+
+        :return: An iterator over the results, in the order of completion
+        """
+        self._start_time = time.perf_counter()
+        self._end_time = -1.0
+        self._completed = 0
+        self._failed = 0
+        self._out_of_memory = 0
+        self._deferred = set()
+        self._budget = self._memory_budget or available_memory()
+        try:
+            crashed = yield from self._run_pooled()
+            yield from self._run_isolated(crashed)
+        finally:
+            self._end_time = time.perf_counter()
+
+    def _run_pooled(self) -> Generator[BatchResult, None, List[Project]]:
+        crashed: List[Project] = []
+        pending = deque(self._projects)
+        futures: Dict["Future[BatchResult]", Project] = {}
+        with ProcessPoolExecutor(max_workers=self._workers) as executor:
+            try:
+                while pending or futures:
+                    while pending and self._admits(pending[0], list(futures.values())):
+                        project = pending.popleft()
+                        try:
+                            future = executor.submit(
+                                _run_project, project, self._runner_options
+                            )
+                        except BrokenProcessPool:
+                            # A worker crashed before all projects were submitted
+                            crashed.append(project)
+                            crashed.extend(pending)
+                            pending.clear()
+                            break
+                        futures[future] = project
+                    if not futures:
+                        break
+                    done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        project = futures.pop(future)
+                        try:
+                            result = future.result()
+                        except BrokenProcessPool:
+                            crashed.append(project)
+                            continue
+                        yield self._record(result)
+            finally:
+                for future in futures:
+                    future.cancel()
+        return crashed
+
+    def _run_isolated(self, projects: List[Project]) -> Iterator[BatchResult]:
+        pending = deque(projects)
+        running: Dict["Future[BatchResult]", Tuple[Project, ProcessPoolExecutor]] = {}
+        try:
+            while pending or running:
+                while pending and self._admits(
+                    pending[0], [project for project, _ in running.values()]
+                ):
+                    project = pending.popleft()
+                    executor = ProcessPoolExecutor(max_workers=1)
+                    future = executor.submit(
+                        _run_project, project, self._runner_options
+                    )
+                    running[future] = (project, executor)
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    project, executor = running.pop(future)
+                    executor.shutdown()
+                    try:
+                        result = future.result()
+                    except BrokenProcessPool:
+                        result = BatchResult(
+                            project, error="The worker process terminated abruptly"
+                        )
+                    yield self._record(result)
+        finally:
+            for _, executor in running.values():
+                executor.shutdown()
+
+    def _admits(self, project: Project, running: List[Project]) -> bool:
+        """Decides whether a project can start next to the running ones"""
+        if len(running) >= self._workers:
+            return False
+        if self._memory_history is None or not running:
+            return True
+        estimate = self._estimate(project)
+        reserved = sum(self._estimate(other) for other in running)
+        if reserved + estimate <= self._budget and estimate <= available_memory():
+            return True
+        self._deferred.add(project)
+        return False
+
+    def _estimate(self, project: Project) -> int:
+        """Gives the expected peak memory of a project"""
+        if self._memory_history is not None:
+            peak = self._memory_history.peak(project.project_name)
+            if peak is not None:
+                return peak
+        return project.memory_limit or self._default_memory
+
+    def _record(self, result: BatchResult) -> BatchResult:
+        self._completed += 1
+        if result.error is not None:
+            self._failed += 1
+        if result.run_result is not None:
+            if result.run_result.status == RunStatus.OUT_OF_MEMORY:
+                self._out_of_memory += 1
+            if self._memory_history is not None:
+                self._memory_history.update(
+                    result.project.project_name, result.run_result
+                )
+        return result
+
+
+def _run_project(project: Project, runner_options: Dict[str, Any]) -> BatchResult:
+    start = time.perf_counter()
+    try:
+        runner = Runner(
+            project.project_name,
+            project.repo_path,
+            runner=project.runner,
+            time_limit=project.time_limit,
+            junit_xml_file=project.junit_xml_file,
+            memory_limit=project.memory_limit,
+            **runner_options,
+        )
+        output = runner.run()
+        run_result = runner.get_run_result(output[0]) if output is not None else None
+    # pylint: disable=broad-except
+    except Exception:
+        return BatchResult(
+            project, error=traceback.format_exc(), time=time.perf_counter() - start
+        )
+    return BatchResult(project, run_result, output, time=time.perf_counter() - start)
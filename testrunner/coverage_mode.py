@@ -0,0 +1,36 @@
+"""
+Test runner is a library for running unit tests on Python code.
+
+It offers the opinion to automatically detect the correct run settings for
+the tests and gives information about the test results and coverage information.
+
+Test-Runner is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Test-Runner is distributed in the hope that it will be useful
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Test-Runner.  If not, see <https://www.gnu.org/licenses/>.
+"""
+from enum import Enum, auto
+
+
+class CoverageMode(Enum):
+    """The ways the runners measure the coverage of the tests"""
+
+    OFF = auto()
+    """Do not measure coverage, the runs only report the test results."""
+
+    FULL = auto()
+    """Measure coverage with coverage.py's default tracing core."""
+
+    LINES = auto()
+    """Measure line coverage with coverage.py's sys.monitoring core.
+
+    The core is only available on Python 3.12 and newer with coverage 7.4 or
+    newer; coverage.py falls back to its tracing core otherwise."""
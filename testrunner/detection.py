@@ -0,0 +1,212 @@
+"""
+Test runner is a library for running unit tests on Python code.
+
+It offers the opinion to automatically detect the correct run settings for
+the tests and gives information about the test results and coverage information.
+
+Test-Runner is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Test-Runner is distributed in the hope that it will be useful
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Test-Runner.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+from collections import deque
+from typing import Deque, FrozenSet, Iterable, Optional, Tuple
+
+import attr
+from pytesting_utils import Preconditions
+
+from testrunner.runner_type import RunnerType
+
+DEFAULT_SKIP_DIRECTORIES: FrozenSet[str] = frozenset(
+    {
+        ".bzr",
+        ".eggs",
+        ".git",
+        ".hg",
+        ".idea",
+        ".mypy_cache",
+        ".nox",
+        ".svn",
+        ".tox",
+        ".venv",
+        ".vscode",
+        "__pycache__",
+        "node_modules",
+        "venv",
+    }
+)
+"""Names of directories that are never descended into during detection"""
+
+_PYTEST_MARKER = b"pytest"
+_CHUNK_SIZE = 1024 * 1024
+_PREFERRED_SUFFIXES = (".py", ".cfg", ".ini", ".toml", ".txt")
+
+
+# pylint: disable=too-few-public-methods
+@attr.s(frozen=True)
+class DetectionResult:
+    """The detected runner type together with the evidence that settled it"""
+
+    runner_type: RunnerType = attr.ib()
+    evidence: str = attr.ib(default="")
+    files_scanned: int = attr.ib(default=0)
+
+
+class RunnerTypeDetector:
+    """
+    Detects the runner type of a project with a single walk over its tree.
+
+    The heuristics are the same as the ones of the former grep-based checks:
+    a `pytest.ini` file or any file mentioning pytest selects PyTest,
+    otherwise the contents of `setup.py` decide between nose2, nose, and
+    `setup.py test`.  All signals of the project root are evaluated upfront,
+    the walk only happens if they do not settle the decision, and it stops at
+    the first file mentioning pytest.  VCS metadata, virtual environments,
+    caches, and files larger than `max_file_size` are not scanned.
+    """
+
+    def __init__(
+        self,
+        skip_directories: Iterable[str] = DEFAULT_SKIP_DIRECTORIES,
+        max_file_size: int = 8 * 1024 * 1024,
+    ) -> None:
+        """
+        Creates a new detector.
+
+        :param skip_directories: Names of directories that are not scanned
+        :param max_file_size: Files larger than this (in bytes) are not scanned
+        """
+        Preconditions.check_argument(
+            max_file_size > 0, "The maximum file size has to be positive!"
+        )
+        self._skip_directories = frozenset(skip_directories)
+        self._max_file_size = max_file_size
+
+    def detect(self, repo_path: str) -> DetectionResult:
+        """
+        Detects the runner type for a project.
+
+        :param repo_path: Path to the project's source code
+        :return: The detected runner type and the evidence for it
+        """
+        setup_py_path = os.path.join(repo_path, "setup.py")
+        setup_py = self._read_file(setup_py_path)
+
+        if os.path.isfile(os.path.join(repo_path, "pytest.ini")):
+            return DetectionResult(RunnerType.PYTEST, "pytest.ini exists")
+        if setup_py is not None and (
+            _PYTEST_MARKER in setup_py or b"test_suite=py.test" in setup_py
+        ):
+            return DetectionResult(RunnerType.PYTEST, "setup.py mentions pytest", 1)
+
+        match, files_scanned = self._find_pytest_mention(repo_path, setup_py_path)
+        if setup_py is not None:
+            files_scanned += 1
+        if match is not None:
+            return DetectionResult(
+                RunnerType.PYTEST,
+                "{} mentions pytest".format(os.path.relpath(match, repo_path)),
+                files_scanned,
+            )
+
+        if setup_py is not None:
+            for marker, runner_type in (
+                (b"nose2", RunnerType.NOSE2),
+                (b"nose", RunnerType.NOSE),
+                (b"test_suite=", RunnerType.SETUP_PY),
+            ):
+                if marker in setup_py:
+                    return DetectionResult(
+                        runner_type,
+                        "setup.py mentions {}".format(marker.decode()),
+                        files_scanned,
+                    )
+        # pylint: disable=protected-access
+        return DetectionResult(
+            RunnerType._UNKNOWN, "no framework signal found", files_scanned
+        )
+
+    def _find_pytest_mention(
+        self, repo_path: str, already_scanned: str
+    ) -> Tuple[Optional[str], int]:
+        files_scanned = 0
+        pending: Deque[str] = deque([repo_path])
+        while pending:
+            directory = pending.popleft()
+            try:
+                with os.scandir(directory) as iterator:
+                    entries = list(iterator)
+            except OSError:
+                continue
+            if self._is_virtual_environment(directory, entries):
+                continue
+
+            files = []
+            directories = []
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in self._skip_directories:
+                            directories.append(entry.path)
+                    elif entry.is_file() and entry.path != already_scanned:
+                        files.append(entry)
+                except OSError:
+                    continue
+
+            files.sort(key=lambda e: not e.name.endswith(_PREFERRED_SUFFIXES))
+            for entry in files:
+                files_scanned += 1
+                if self._mentions_pytest(entry):
+                    return entry.path, files_scanned
+
+            directories.sort(key=lambda d: not os.path.basename(d).startswith("test"))
+            pending.extend(directories)
+        return None, files_scanned
+
+    @staticmethod
+    def _is_virtual_environment(directory: str, entries) -> bool:
+        names = {entry.name for entry in entries}
+        if "pyvenv.cfg" in names:
+            return True
+        if "bin" not in names or "lib" not in names:
+            return False
+        return os.path.isfile(os.path.join(directory, "bin", "activate"))
+
+    def _mentions_pytest(self, entry: os.DirEntry) -> bool:
+        try:
+            if entry.stat().st_size > self._max_file_size:
+                return False
+            with open(entry.path, "rb") as file:
+                overlap = len(_PYTEST_MARKER) - 1
+                tail = b""
+                while True:
+                    chunk = file.read(_CHUNK_SIZE)
+                    if not chunk:
+                        return False
+                    if _PYTEST_MARKER in chunk:
+                        return True
+                    if _PYTEST_MARKER in tail + chunk[:overlap]:
+                        return True
+                    tail = chunk[-overlap:]
+        except OSError:
+            return False
+
+    @staticmethod
+    def _read_file(path: str) -> Optional[bytes]:
+        if not os.path.isfile(path):
+            return None
+        try:
+            with open(path, "rb") as file:
+                return file.read()
+        except OSError:
+            return None
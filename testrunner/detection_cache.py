@@ -0,0 +1,165 @@
+"""
+Test runner is a library for running unit tests on Python code.
+
+It offers the opinion to automatically detect the correct run settings for
+the tests and gives information about the test results and coverage information.
+
+Test-Runner is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Test-Runner is distributed in the hope that it will be useful
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Test-Runner.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from typing import Optional
+
+from plumbum import local, CommandNotFound  # type: ignore
+
+from testrunner.detection import DetectionResult, RunnerTypeDetector
+from testrunner.runner_type import RunnerType
+
+CONFIGURATION_FILES = (
+    "setup.py",
+    "setup.cfg",
+    "pytest.ini",
+    "tox.ini",
+    "pyproject.toml",
+)
+"""Files whose metadata make up the fingerprint of repositories without git"""
+
+
+def repository_fingerprint(repo_path: str) -> str:
+    """
+    Computes a fingerprint of a repository's content.
+
+    The fingerprint is the hash of the tree of the git HEAD commit at
+    `repo_path`, if the path is inside a git repository.  Otherwise it is
+    derived from the path and the modification times and sizes of the
+    configuration files of the project.  Uncommitted changes are therefore
+    not reflected in the fingerprint of a git repository.
+
+    :param repo_path: Path to the project's source code
+    :return: A string identifying the repository's content
+    """
+    tree_hash = _git_tree_hash(repo_path)
+    if tree_hash is not None:
+        return "git-tree:{}".format(tree_hash)
+
+    parts = [os.path.abspath(repo_path)]
+    for file_name in CONFIGURATION_FILES:
+        try:
+            stat = os.stat(os.path.join(repo_path, file_name))
+            parts.append("{}:{}:{}".format(file_name, stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            parts.append("{}:-".format(file_name))
+    digest = hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+    return "files:{}".format(digest)
+
+
+def _git_tree_hash(repo_path: str) -> Optional[str]:
+    try:
+        git = local["git"]
+    except CommandNotFound:
+        return None
+    # HEAD:./ resolves to the tree of repo_path, which also distinguishes
+    # projects living in sub-folders of the same repository
+    retcode, out, _ = git["-C", repo_path, "rev-parse", "HEAD:./"].run(retcode=None)
+    if retcode != 0:
+        return None
+    return out.strip() or None
+
+
+class DetectionCache:
+    """
+    An on-disk cache for runner-type detection results.
+
+    Every entry is a small JSON file in the cache directory that maps a
+    repository fingerprint, see `repository_fingerprint`, to the detected
+    runner type and the evidence for it.
+    """
+
+    def __init__(
+        self, cache_dir: str, detector: Optional[RunnerTypeDetector] = None
+    ) -> None:
+        """
+        Creates a new detection cache.
+
+        :param cache_dir: The directory holding the cache entries, it is
+        created if it does not exist
+        :param detector: The detector that is used on cache misses
+        """
+        os.makedirs(cache_dir, exist_ok=True)
+        self._cache_dir = cache_dir
+        self._detector = detector if detector is not None else RunnerTypeDetector()
+
+    def detect(self, repo_path: str) -> DetectionResult:
+        """
+        Looks up the detection result for a repository and runs the detector
+        on a cache miss, storing its result.
+
+        :param repo_path: Path to the project's source code
+        :return: The cached or freshly computed detection result
+        """
+        fingerprint = repository_fingerprint(repo_path)
+        result = self.get(fingerprint)
+        if result is None:
+            result = self._detector.detect(repo_path)
+            self.put(fingerprint, result)
+        return result
+
+    def get(self, fingerprint: str) -> Optional[DetectionResult]:
+        """
+        Gives the cached detection result for a fingerprint.
+
+        :param fingerprint: A repository fingerprint
+        :return: The cached result, or None if there is no valid entry
+        """
+        try:
+            with open(self._entry_path(fingerprint)) as entry_file:
+                entry = json.load(entry_file)
+            if entry["fingerprint"] != fingerprint:
+                return None
+            return DetectionResult(
+                runner_type=RunnerType[entry["runner_type"]],
+                evidence=entry["evidence"],
+                files_scanned=entry["files_scanned"],
+            )
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def put(self, fingerprint: str, result: DetectionResult) -> None:
+        """
+        Stores a detection result for a fingerprint.
+
+        :param fingerprint: A repository fingerprint
+        :param result: The detection result
+        """
+        entry = {
+            "fingerprint": fingerprint,
+            "runner_type": result.runner_type.name,
+            "evidence": result.evidence,
+            "files_scanned": result.files_scanned,
+        }
+        handle, tmp_path = tempfile.mkstemp(dir=self._cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(handle, "w") as entry_file:
+                json.dump(entry, entry_file)
+            os.replace(tmp_path, self._entry_path(fingerprint))
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    def _entry_path(self, fingerprint: str) -> str:
+        digest = hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()
+        return os.path.join(self._cache_dir, "{}.json".format(digest))
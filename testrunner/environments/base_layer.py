@@ -0,0 +1,109 @@
+"""
+Test runner is a library for running unit tests on Python code.
+
+It offers the opinion to automatically detect the correct run settings for
+the tests and gives information about the test results and coverage information.
+
+Test-Runner is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Test-Runner is distributed in the hope that it will be useful
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Test-Runner.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import contextlib
+import fcntl
+import hashlib
+import json
+import os
+from typing import Iterator, List, Optional
+
+from testrunner.environments.managed_environment import ManagedEnvironment
+from testrunner.environments.pool import interpreter_version, normalize_requirement
+from testrunner.environments.wheelhouse import Wheelhouse
+
+
+class ToolingBaseLayers:
+    """
+    Pre-built environments that only hold the tooling of a runner.
+
+    There is one base environment per tooling set, which identifies the
+    runner type, and interpreter.  Per-run environments are layered on top
+    of it, see `ManagedEnvironment.add_base_layer`, such that only the
+    project requirements are installed for each run.
+    """
+
+    def __init__(self, root_dir: str, wheelhouse: Optional[Wheelhouse] = None) -> None:
+        """
+        Creates a new store for base layers.
+
+        :param root_dir: The directory holding the base environments, it is
+        created if it does not exist
+        :param wheelhouse: An optional local wheelhouse the tooling is
+        installed from
+        """
+        os.makedirs(root_dir, exist_ok=True)
+        self._root_dir = root_dir
+        self._wheelhouse = wheelhouse
+
+    @staticmethod
+    def layer_key(tooling: List[str]) -> str:
+        """
+        Computes the key of the base layer for a tooling set.
+
+        :param tooling: The packages the runner needs for running the tests
+        :return: A hash identifying the base layer
+        """
+        description = {
+            "tooling": sorted({normalize_requirement(p) for p in tooling}),
+            "interpreter": interpreter_version(),
+        }
+        payload = json.dumps(description, sort_keys=True).encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()
+
+    def get(self, tooling: List[str]) -> ManagedEnvironment:
+        """
+        Gives the base layer for a tooling set, building it if necessary.
+
+        Tooling packages that fail to install are retried on the next call.
+
+        :param tooling: The packages the runner needs for running the tests
+        :return: The base environment
+        """
+        key = self.layer_key(tooling)
+        base = ManagedEnvironment("base", os.path.join(self._root_dir, key))
+        if set(tooling) <= base.installed_packages():
+            return base
+        with self._build_lock(key):
+            base.create()
+            if self._wheelhouse is not None:
+                base.use_wheelhouse(self._wheelhouse)
+            base.add_packages_for_installation(tooling)
+            base.run_commands([])
+        return base
+
+    def apply(self, env: ManagedEnvironment, tooling: List[str]) -> None:
+        """
+        Layers an environment on top of the base layer for a tooling set.
+
+        :param env: The per-run environment
+        :param tooling: The packages the runner needs for running the tests
+        """
+        env.add_base_layer(self.get(tooling))
+
+    @contextlib.contextmanager
+    def _build_lock(self, key: str) -> Iterator[None]:
+        handle = os.open(
+            os.path.join(self._root_dir, "{}.lock".format(key)), os.O_RDWR | os.O_CREAT
+        )
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(handle)
@@ -0,0 +1,137 @@
+"""
+Test runner is a library for running unit tests on Python code.
+
+It offers the opinion to automatically detect the correct run settings for
+the tests and gives information about the test results and coverage information.
+
+Test-Runner is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Test-Runner is distributed in the hope that it will be useful
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Test-Runner.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import os
+import shutil
+import tempfile
+from typing import IO, Optional
+
+DEFAULT_TAIL_SIZE = 1024 * 1024
+
+_CHUNK_SIZE = 1024 * 1024
+
+
+class CapturedOutput(str):
+    """
+    The tail of a captured output.
+
+    The string holds at most the last `tail_size` bytes of the output,
+    starting at a line break if the output was truncated.  The complete
+    output is kept in the file `path`, if the capture was spilled to a
+    named file.
+    """
+
+    path: Optional[str]
+    size: int
+
+    def __new__(
+        cls, tail: str, path: Optional[str] = None, size: int = -1
+    ) -> "CapturedOutput":
+        output = super().__new__(cls, tail)  # type: ignore
+        output.path = path
+        output.size = size if size >= 0 else len(tail.encode("utf-8"))
+        return output
+
+    def __getnewargs__(self):  # type: ignore
+        return str(self), self.path, self.size
+
+    @property
+    def truncated(self) -> bool:
+        """Whether the string holds only a part of the output"""
+        return self.size > len(self.encode("utf-8"))
+
+
+class OutputCapture:
+    """
+    Captures the output of processes in a file, thus bounding the memory.
+
+    The capture spills to the file `spill_path`, or to an anonymous temporary
+    file if none is given.  Only the tail of the output is loaded into memory
+    when the capture is finished.
+    """
+
+    def __init__(
+        self, spill_path: Optional[str] = None, tail_size: int = DEFAULT_TAIL_SIZE
+    ) -> None:
+        """
+        Creates a new capture.
+
+        :param spill_path: An optional path for the file keeping the output
+        :param tail_size: The maximum number of bytes of the tail
+        """
+        self._spill_path = spill_path
+        self._tail_size = tail_size
+        self._file: IO[bytes]
+        if spill_path is None:
+            self._file = tempfile.TemporaryFile()
+        else:
+            self._file = open(spill_path, "w+b")
+
+    @property
+    def file(self) -> IO[bytes]:
+        """Gives the file the output is written to, e.g., by a subprocess"""
+        return self._file
+
+    def write(self, data: bytes) -> None:
+        """
+        Appends data to the output.
+
+        :param data: The data to append
+        """
+        self._file.seek(0, os.SEEK_END)
+        self._file.write(data)
+
+    def append_file(self, path: str) -> None:
+        """
+        Appends the content of a file to the output, if the file exists.
+
+        :param path: The path to the file
+        """
+        if not os.path.isfile(path):
+            return
+        with open(path, "rb") as source:
+            self._file.seek(0, os.SEEK_END)
+            shutil.copyfileobj(source, self._file, _CHUNK_SIZE)
+
+    def finish(self) -> CapturedOutput:
+        """
+        Closes the capture and loads the tail of the output.
+
+        :return: The tail of the output
+        """
+        self._file.flush()
+        size = self._file.seek(0, os.SEEK_END)
+        start = max(0, size - self._tail_size)
+        self._file.seek(start)
+        data = self._file.read()
+        self._file.close()
+        if start > 0:
+            line_break = data.find(b"\n")
+            data = data[line_break + 1 :] if line_break >= 0 else b""
+        return CapturedOutput(data.decode("utf-8", "replace"), self._spill_path, size)
+
+    def close(self) -> None:
+        """Closes the capture without loading the output"""
+        self._file.close()
+
+    def __enter__(self) -> "OutputCapture":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
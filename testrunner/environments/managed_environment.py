@@ -0,0 +1,368 @@
+"""
+Test runner is a library for running unit tests on Python code.
+
+It offers the opinion to automatically detect the correct run settings for
+the tests and gives information about the test results and coverage information.
+
+Test-Runner is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Test-Runner is distributed in the hope that it will be useful
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Test-Runner.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import contextlib
+import os
+import shlex
+import shutil
+import subprocess
+import tempfile
+from typing import Any, AsyncIterator, Iterator, List, Optional, Set, Tuple, Union
+
+import virtualenv  # type: ignore
+from pytesting_utils import Preconditions
+
+from testrunner.environments.capture import OutputCapture
+from testrunner.environments.streaming import OutputLine, stream_shell
+from testrunner.environments.wheelhouse import Wheelhouse
+
+_INSTALLED_FILE = ".testrunner-installed"
+_BASE_LAYER_FILE = "_testrunner_base_layer.pth"
+_ENVIRONMENT_SCRIPTS = ("activate", "easy_install", "pip", "python", "wheel")
+_LOCAL_PREFIXES = ("-e", ".", "/", "~", "file:")
+
+
+def is_local_requirement(requirement: str) -> bool:
+    """
+    Checks whether a requirement refers to a local path.
+
+    Local requirements, such as `-e .`, depend on the working directory of
+    the installation and are therefore installed on every run.
+
+    :param requirement: A requirement as given in a requirements file
+    :return: Whether the requirement refers to a local path
+    """
+    return requirement.strip().startswith(_LOCAL_PREFIXES)
+
+
+def is_installable_requirement(requirement: str) -> bool:
+    """
+    Checks whether a line of a requirements file is a requirement at all.
+
+    :param requirement: A line of a requirements file
+    :return: False for empty lines and comments, True otherwise
+    """
+    stripped = requirement.strip()
+    return len(stripped) > 0 and not stripped.startswith("#")
+
+
+class ManagedEnvironment:
+    """
+    Wraps a virtual environment in a given directory.
+
+    The environment keeps track of the packages it successfully installed,
+    thus it can be reused by later runs without installing them again.
+    Local requirements are installed on every run.
+    """
+
+    def __init__(self, env_name: str, env_dir: Union[str, os.PathLike]) -> None:
+        """
+        Creates a new wrapper, use `create()` to set up the environment.
+
+        :param env_name: Name of the virtual environment
+        :param env_dir: Directory that holds the virtual environment
+        """
+        Preconditions.check_argument(
+            len(env_name) > 0, "Cannot create an virtual environment without a name!"
+        )
+        self._env_name = env_name
+        self._env_dir = os.fspath(env_dir)
+        self._packages: List[str] = []
+        self._installed_from_base: Set[str] = set()
+        self._wheelhouse: Optional[Wheelhouse] = None
+
+    def create(self) -> None:
+        """Creates the virtual environment, unless it already exists"""
+        if not os.path.isfile(self._activate_script()):
+            virtualenv.create_environment(self._env_dir)
+
+    def get_env_dir(self) -> str:
+        """
+        Gives the folder the virtual environment is installed in.
+
+        :return: The path to the virtual environment folder
+        """
+        return self._env_dir
+
+    def get_site_packages_dir(self) -> str:
+        """
+        Gives the site-packages folder of the virtual environment.
+
+        :return: The path to the site-packages folder
+        """
+        _, lib_dir, _, _ = virtualenv.path_locations(self._env_dir)
+        return os.path.join(lib_dir, "site-packages")
+
+    def add_base_layer(self, base: "ManagedEnvironment") -> None:
+        """
+        Makes the packages of a base environment available in this one.
+
+        The base's site-packages folder is appended to the module search path
+        by a .pth file, and the base's console scripts are copied with their
+        interpreter line pointing to this environment's interpreter.  Packages
+        installed in this environment take precedence over those of the base.
+
+        :param base: An environment holding the packages to layer below
+        """
+        site_packages_dir = self.get_site_packages_dir()
+        os.makedirs(site_packages_dir, exist_ok=True)
+        with open(os.path.join(site_packages_dir, _BASE_LAYER_FILE), "w") as pth:
+            pth.write(base.get_site_packages_dir() + "\n")
+
+        base_bin_dir = os.path.join(base.get_env_dir(), "bin")
+        bin_dir = os.path.join(self._env_dir, "bin")
+        interpreter_line = "#!{}\n".format(os.path.join(bin_dir, "python"))
+        for name in os.listdir(base_bin_dir):
+            target = os.path.join(bin_dir, name)
+            if name.startswith(_ENVIRONMENT_SCRIPTS) or os.path.exists(target):
+                continue
+            with open(os.path.join(base_bin_dir, name), "rb") as script:
+                first_line = script.readline()
+                if not first_line.startswith(b"#!") or b"python" not in first_line:
+                    continue
+                body = script.read()
+            with open(target, "wb") as copy:
+                copy.write(interpreter_line.encode("utf-8"))
+                copy.write(body)
+            shutil.copymode(os.path.join(base_bin_dir, name), target)
+        self._installed_from_base = base.installed_packages()
+
+    def use_wheelhouse(self, wheelhouse: Wheelhouse) -> None:
+        """
+        Installs packages from a wheelhouse and stores newly built wheels in it.
+
+        :param wheelhouse: The wheelhouse to use
+        """
+        self._wheelhouse = wheelhouse
+
+    def installed_packages(self) -> Set[str]:
+        """
+        Gives the packages that were successfully installed before.
+
+        :return: A set of package specifications
+        """
+        try:
+            with open(os.path.join(self._env_dir, _INSTALLED_FILE)) as installed:
+                return {line.rstrip("\n") for line in installed if line.strip()}
+        except OSError:
+            return set()
+
+    def add_package_for_installation(self, package: str) -> None:
+        """
+        Add a package to the list of PyPI packages that will be installed
+        before the execution.
+
+        :param package: The name of a package on PyPI
+        """
+        self._packages.append(package)
+
+    def add_packages_for_installation(self, packages: List[str]) -> None:
+        """
+        Adds a list of packages to the list of PyPI packages that will be
+        installed before the execution.
+
+        :param packages: A list of package names on PyPI
+        """
+        self._packages.extend(packages)
+
+    def run_commands(
+        self, commands: List[str], cwd: Optional[str] = None
+    ) -> Tuple[str, str]:
+        """
+        Run commands in the virtual environment setting.
+
+        Packages that were added for installation and are not yet installed
+        are installed first.  ATTENTION: The commands are run in a shell,
+        be sure that you know what you execute here!
+
+        :param commands: A list of commands the be executed in the virtual env
+        :param cwd: The working directory for the commands
+        :return: A tuple of output and error outputs of the process, which
+        are limited to their tails
+        """
+        with OutputCapture() as out, OutputCapture() as err:
+            self.run_commands_into(commands, out, err, cwd)
+            return out.finish(), err.finish()
+
+    def run_commands_into(
+        self,
+        commands: List[str],
+        out: OutputCapture,
+        err: OutputCapture,
+        cwd: Optional[str] = None,
+    ) -> int:
+        """
+        Run commands in the virtual environment setting and capture their
+        output without keeping it in memory.
+
+        :param commands: A list of commands the be executed in the virtual env
+        :param out: The capture for the output
+        :param err: The capture for the error output
+        :param cwd: The working directory for the commands
+        :return: The exit code of the commands
+        """
+        staging_dir = None
+        if self._wheelhouse is not None:
+            staging_dir = self._wheelhouse.create_staging_dir()
+        script = self._create_script(commands, staging_dir)
+        out.file.flush()
+        err.file.flush()
+        return_code = subprocess.call(
+            script, stdout=out.file, stderr=err.file, shell=True, cwd=cwd
+        )
+        if self._wheelhouse is not None and staging_dir is not None:
+            self._wheelhouse.ingest(staging_dir)
+            self._wheelhouse.mark_used(self._packages)
+        self._packages = []
+        return return_code
+
+    async def stream_commands(
+        self,
+        commands: List[str],
+        cwd: Optional[str] = None,
+        follow: Optional[str] = None,
+    ) -> AsyncIterator[OutputLine]:
+        """
+        Run commands in the virtual environment and stream their output.
+
+        This is the asynchronous variant of `run_commands`.  If the iteration
+        is stopped early or the consuming task is cancelled, the process tree
+        of the commands is terminated.
+
+        :param commands: A list of commands the be executed in the virtual env
+        :param cwd: The working directory for the commands
+        :param follow: An optional file written by the commands whose lines
+        are streamed, too
+        :return: An asynchronous iterator over the output lines
+        """
+        staging_dir = None
+        if self._wheelhouse is not None:
+            staging_dir = self._wheelhouse.create_staging_dir()
+        script = self._create_script(commands, staging_dir)
+        try:
+            async for line in stream_shell(script, cwd=cwd, follow=follow):
+                yield line
+        finally:
+            if self._wheelhouse is not None and staging_dir is not None:
+                self._wheelhouse.ingest(staging_dir)
+                self._wheelhouse.mark_used(self._packages)
+            self._packages = []
+
+    def install(self, cwd: Optional[str] = None) -> Tuple[str, str]:
+        """
+        Installs the packages that were added for installation.
+
+        :param cwd: The working directory for the installation, relevant for
+        local requirements
+        :return: A tuple of output and error outputs of the installation
+        """
+        return self.run_commands([], cwd)
+
+    def _create_script(self, commands: List[str], staging_dir: Optional[str]) -> str:
+        lines = [". {}".format(shlex.quote(self._activate_script())), "python -V"]
+        lines.extend(self._install_commands(staging_dir))
+        lines.extend(commands)
+        return "\n".join(lines)
+
+    def _install_commands(self, staging_dir: Optional[str]) -> List[str]:
+        installed = self.installed_packages() | self._installed_from_base
+        marker = shlex.quote(os.path.join(self._env_dir, _INSTALLED_FILE))
+        commands = []
+        for package in self._packages:
+            if not is_installable_requirement(package) or package in installed:
+                continue
+            requirement = self._quote_requirement(package)
+            local = is_local_requirement(package)
+            if self._wheelhouse is not None and staging_dir is not None:
+                command = self._wheelhouse.install_command(
+                    requirement, staging_dir, local
+                )
+                command = "{{ {}; }}".format(command)
+            else:
+                command = "pip install {}".format(requirement)
+            if not local:
+                installed.add(package)
+                command += " && printf '%s\\n' {} >> {}".format(
+                    shlex.quote(package), marker
+                )
+            commands.append(command)
+        return commands
+
+    @staticmethod
+    def _quote_requirement(requirement: str) -> str:
+        try:
+            parts = shlex.split(requirement)
+        except ValueError:
+            parts = [requirement.strip()]
+        return " ".join(shlex.quote(part) for part in parts)
+
+    def _activate_script(self) -> str:
+        return os.path.join(self._env_dir, "bin", "activate")
+
+    def __str__(self) -> str:
+        return "ManagedEnvironment {} in directory {}".format(
+            self._env_name, self._env_dir
+        )
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+
+@contextlib.contextmanager
+def temporary_environment(
+    env_name: str, tmp_dir: Optional[Union[bytes, str, os.PathLike]] = None
+) -> Iterator[ManagedEnvironment]:
+    """
+    Creates a context for a throw-away virtual environment.
+
+    :param env_name: The name for the virtual environment
+    :param tmp_dir: An optional root path for the temporary directory
+    :return: A ManagedEnvironment that is removed when the context is left
+    """
+    env_dir = tempfile.mkdtemp(suffix=env_name, dir=_as_str_path(tmp_dir))
+    try:
+        env = ManagedEnvironment(env_name, env_dir)
+        env.create()
+        yield env
+    finally:
+        shutil.rmtree(env_dir, ignore_errors=True)
+
+
+def directory_size(path: str) -> int:
+    """
+    Computes the size of all files in a directory tree.
+
+    :param path: The path to the directory
+    :return: The sum of the file sizes in bytes
+    """
+    size = 0
+    for root, _, files in os.walk(path):
+        for file_name in files:
+            try:
+                size += os.lstat(os.path.join(root, file_name)).st_size
+            except OSError:
+                continue
+    return size
+
+
+def _as_str_path(path: Any) -> Optional[str]:
+    if path is None:
+        return None
+    path = os.fspath(path)
+    return path.decode() if isinstance(path, bytes) else path
@@ -0,0 +1,257 @@
+"""
+Test runner is a library for running unit tests on Python code.
+
+It offers the opinion to automatically detect the correct run settings for
+the tests and gives information about the test results and coverage information.
+
+Test-Runner is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Test-Runner is distributed in the hope that it will be useful
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Test-Runner.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import contextlib
+import fcntl
+import hashlib
+import json
+import os
+import platform
+import re
+import shutil
+import sys
+import time
+from typing import Iterator, List, Optional, Tuple
+
+from pytesting_utils import Preconditions
+
+from testrunner.environments.managed_environment import (
+    ManagedEnvironment,
+    directory_size,
+    is_installable_requirement,
+)
+
+_LOCK_FILE = ".lock"
+_LAST_USED_FILE = ".last-used"
+_SIZE_FILE = ".size"
+_NAME_PATTERN = re.compile(r"^([A-Za-z0-9][A-Za-z0-9._-]*)(.*)$")
+
+
+def normalize_requirement(requirement: str) -> str:
+    """
+    Normalizes a requirement such that equivalent spellings compare equal.
+
+    The project name is normalized according to PEP 503, whitespace is
+    removed from the version specifiers.  Requirements that do not start
+    with a project name, such as URLs or options, are only stripped.
+
+    :param requirement: A requirement as given in a requirements file
+    :return: The normalized requirement
+    """
+    stripped = requirement.strip()
+    match = _NAME_PATTERN.match(stripped)
+    if match is None:
+        return stripped
+    name = re.sub(r"[-_.]+", "-", match.group(1)).lower()
+    return name + re.sub(r"\s+", "", match.group(2))
+
+
+def interpreter_version() -> str:
+    """
+    Describes the interpreter that is used to create virtual environments.
+
+    :return: Implementation, version, and path of the running interpreter
+    """
+    return "{} {} {}".format(
+        platform.python_implementation(), platform.python_version(), sys.executable
+    )
+
+
+class VirtualEnvironmentPool:
+    """
+    A pool of ready-made virtual environments.
+
+    Environments are keyed by a hash of the normalized project requirements,
+    the runner tooling, and the interpreter version.  A lease hands out an
+    environment with the matching key that is not leased by anyone else, or
+    creates a new one.  Each environment is guarded by a file lock, such that
+    concurrent runs, in threads or processes, never share an environment.
+    Environments that are not leased are evicted in least-recently-used order
+    when the pool grows beyond its bounds.
+    """
+
+    def __init__(
+        self, root_dir: str, max_environments: int = 16, max_size: int = 0
+    ) -> None:
+        """
+        Creates a new pool.
+
+        :param root_dir: The directory holding the pooled environments, it is
+        created if it does not exist
+        :param max_environments: The maximum number of kept environments
+        :param max_size: The maximum size of all kept environments in bytes,
+        zero means unbounded
+        """
+        Preconditions.check_argument(
+            max_environments > 0, "The pool has to hold at least one environment!"
+        )
+        Preconditions.check_argument(max_size >= 0, "The size has to be at least 0!")
+        os.makedirs(root_dir, exist_ok=True)
+        self._root_dir = root_dir
+        self._max_environments = max_environments
+        self._max_size = max_size
+
+    @staticmethod
+    def environment_key(packages: List[str], tooling: List[str]) -> str:
+        """
+        Computes the key of an environment.
+
+        :param packages: The project requirements
+        :param tooling: The packages the runner needs for running the tests
+        :return: A hash identifying the environment
+        """
+        description = {
+            "packages": sorted(
+                {
+                    normalize_requirement(p)
+                    for p in packages
+                    if is_installable_requirement(p)
+                }
+            ),
+            "tooling": sorted({normalize_requirement(p) for p in tooling}),
+            "interpreter": interpreter_version(),
+        }
+        payload = json.dumps(description, sort_keys=True).encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()
+
+    @contextlib.contextmanager
+    def lease(
+        self, env_name: str, packages: List[str], tooling: List[str]
+    ) -> Iterator[ManagedEnvironment]:
+        """
+        Leases an environment for the given requirements.
+
+        The yielded environment has all given packages added for installation;
+        packages it already installed on an earlier lease are skipped.
+
+        :param env_name: The name for the virtual environment
+        :param packages: The project requirements
+        :param tooling: The packages the runner needs for running the tests
+        :return: A context yielding the leased environment
+        """
+        slot_dir, lock = self._acquire(self.environment_key(packages, tooling))
+        try:
+            env = ManagedEnvironment(env_name, os.path.join(slot_dir, "env"))
+            env.create()
+            env.add_packages_for_installation(packages)
+            env.add_packages_for_installation(tooling)
+            yield env
+        finally:
+            self._release(slot_dir, lock)
+        self.evict()
+
+    def evict(self) -> None:
+        """Removes least-recently-used environments until the pool fits"""
+        with self._pool_lock():
+            slots = sorted(self._slots())
+            count = len(slots)
+            total_size = sum(size for _, size, _ in slots)
+            for _, size, slot_dir in slots:
+                if count <= self._max_environments and (
+                    self._max_size == 0 or total_size <= self._max_size
+                ):
+                    break
+                lock = self._try_lock(slot_dir)
+                if lock is None:
+                    continue
+                try:
+                    shutil.rmtree(slot_dir, ignore_errors=True)
+                finally:
+                    os.close(lock)
+                count -= 1
+                total_size -= size
+            for key in os.listdir(self._root_dir):
+                key_dir = os.path.join(self._root_dir, key)
+                if os.path.isdir(key_dir) and not os.listdir(key_dir):
+                    os.rmdir(key_dir)
+
+    def _acquire(self, key: str) -> Tuple[str, int]:
+        key_dir = os.path.join(self._root_dir, key)
+        with self._pool_lock():
+            os.makedirs(key_dir, exist_ok=True)
+            for name in sorted(os.listdir(key_dir)):
+                slot_dir = os.path.join(key_dir, name)
+                lock = self._try_lock(slot_dir)
+                if lock is not None:
+                    return slot_dir, lock
+            index = 0
+            while True:
+                slot_dir = os.path.join(key_dir, str(index))
+                try:
+                    os.mkdir(slot_dir)
+                    break
+                except FileExistsError:
+                    index += 1
+            lock = self._try_lock(slot_dir)
+            assert lock is not None
+            return slot_dir, lock
+
+    def _release(self, slot_dir: str, lock: int) -> None:
+        try:
+            with open(os.path.join(slot_dir, _SIZE_FILE), "w") as size_file:
+                size_file.write(str(directory_size(slot_dir)))
+            with open(os.path.join(slot_dir, _LAST_USED_FILE), "w") as used_file:
+                used_file.write(repr(time.time()))
+        finally:
+            os.close(lock)
+
+    def _slots(self) -> Iterator[Tuple[float, int, str]]:
+        for key in os.listdir(self._root_dir):
+            key_dir = os.path.join(self._root_dir, key)
+            if not os.path.isdir(key_dir):
+                continue
+            for name in os.listdir(key_dir):
+                slot_dir = os.path.join(key_dir, name)
+                yield (
+                    _read_number(os.path.join(slot_dir, _LAST_USED_FILE)),
+                    int(_read_number(os.path.join(slot_dir, _SIZE_FILE))),
+                    slot_dir,
+                )
+
+    @staticmethod
+    def _try_lock(slot_dir: str) -> Optional[int]:
+        try:
+            handle = os.open(os.path.join(slot_dir, _LOCK_FILE), os.O_RDWR | os.O_CREAT)
+        except OSError:
+            return None
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(handle)
+            return None
+        return handle
+
+    @contextlib.contextmanager
+    def _pool_lock(self) -> Iterator[None]:
+        handle = os.open(
+            os.path.join(self._root_dir, _LOCK_FILE), os.O_RDWR | os.O_CREAT
+        )
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(handle)
+
+
+def _read_number(path: str) -> float:
+    try:
+        with open(path) as number_file:
+            return float(number_file.read())
+    except (OSError, ValueError):
+        return 0.0
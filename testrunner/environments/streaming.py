@@ -0,0 +1,179 @@
+"""
+Test runner is a library for running unit tests on Python code.
+
+It offers the opinion to automatically detect the correct run settings for
+the tests and gives information about the test results and coverage information.
+
+Test-Runner is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Test-Runner is distributed in the hope that it will be useful
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Test-Runner.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import asyncio
+import os
+import signal
+from asyncio.subprocess import Process
+from typing import AsyncIterator, Optional, Tuple
+
+import attr
+
+STDOUT = "stdout"
+STDERR = "stderr"
+LOG = "log"
+
+_EOF = None
+
+
+# pylint: disable=too-few-public-methods
+@attr.s(frozen=True)
+class OutputLine:
+    """A line of output of a process, without its trailing newline"""
+
+    stream: str = attr.ib()
+    text: str = attr.ib()
+
+
+async def stream_shell(
+    script: str,
+    cwd: Optional[str] = None,
+    follow: Optional[str] = None,
+    poll_interval: float = 0.1,
+    kill_timeout: float = 5.0,
+) -> AsyncIterator[OutputLine]:
+    """
+    Runs a shell script and yields its output lines as they arrive.
+
+    The script is run in a session of its own.  If the consumer stops the
+    iteration or the consuming task is cancelled, the whole process group is
+    terminated, and killed if it does not terminate within `kill_timeout`.
+
+    :param script: The shell script to run
+    :param cwd: The working directory for the script
+    :param follow: An optional file, e.g., a log written by the script,
+    whose lines are yielded on the `log` stream
+    :param poll_interval: The interval in seconds to poll the followed file
+    :param kill_timeout: The time in seconds the processes have to terminate
+    :return: An asynchronous iterator over the output lines
+    """
+    process = await asyncio.create_subprocess_shell(
+        script,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        cwd=cwd,
+        start_new_session=True,
+    )
+    queue: "asyncio.Queue[Optional[OutputLine]]" = asyncio.Queue()
+    readers = [
+        asyncio.ensure_future(_read_stream(process.stdout, STDOUT, queue)),
+        asyncio.ensure_future(_read_stream(process.stderr, STDERR, queue)),
+    ]
+    if follow is not None:
+        readers.append(
+            asyncio.ensure_future(_follow_file(follow, process, queue, poll_interval))
+        )
+    try:
+        remaining = len(readers)
+        while remaining > 0:
+            line = await queue.get()
+            if line is _EOF:
+                remaining -= 1
+            else:
+                yield line
+        await process.wait()
+    finally:
+        for reader in readers:
+            reader.cancel()
+        if process.returncode is None:
+            await _terminate(process, kill_timeout)
+
+
+async def _read_stream(
+    stream: Optional[asyncio.StreamReader],
+    name: str,
+    queue: "asyncio.Queue[Optional[OutputLine]]",
+) -> None:
+    try:
+        while stream is not None:
+            line = await stream.readline()
+            if not line:
+                break
+            await queue.put(OutputLine(name, _decode_line(line)))
+    finally:
+        queue.put_nowait(_EOF)
+
+
+async def _follow_file(
+    path: str,
+    process: Process,
+    queue: "asyncio.Queue[Optional[OutputLine]]",
+    poll_interval: float,
+) -> None:
+    position = 0
+    partial = b""
+    try:
+        while True:
+            finished = process.returncode is not None
+            new_position, data = _read_from(path, position)
+            if new_position - len(data) < position:
+                # The file was truncated and is read from its beginning
+                partial = b""
+            position = new_position
+            lines = (partial + data).split(b"\n")
+            partial = lines.pop()
+            for line in lines:
+                await queue.put(OutputLine(LOG, _decode_line(line)))
+            if finished:
+                break
+            await _wait_for_exit(process, poll_interval)
+        if partial:
+            await queue.put(OutputLine(LOG, _decode_line(partial)))
+    finally:
+        queue.put_nowait(_EOF)
+
+
+def _read_from(path: str, position: int) -> Tuple[int, bytes]:
+    try:
+        with open(path, "rb") as file:
+            if os.fstat(file.fileno()).st_size < position:
+                position = 0
+            file.seek(position)
+            data = file.read()
+    except OSError:
+        return position, b""
+    return position + len(data), data
+
+
+async def _wait_for_exit(process: Process, timeout: float) -> None:
+    try:
+        await asyncio.wait_for(asyncio.shield(process.wait()), timeout)
+    except asyncio.TimeoutError:
+        pass
+
+
+async def _terminate(process: Process, kill_timeout: float) -> None:
+    _signal_group(process.pid, signal.SIGTERM)
+    try:
+        await asyncio.wait_for(asyncio.shield(process.wait()), kill_timeout)
+    except asyncio.TimeoutError:
+        pass
+    _signal_group(process.pid, signal.SIGKILL)
+    await process.wait()
+
+
+def _signal_group(pid: int, sig: int) -> None:
+    try:
+        os.killpg(pid, sig)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def _decode_line(line: bytes) -> str:
+    return line.decode("utf-8", "replace").rstrip("\r\n")
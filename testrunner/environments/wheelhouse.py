@@ -0,0 +1,196 @@
+"""
+Test runner is a library for running unit tests on Python code.
+
+It offers the opinion to automatically detect the correct run settings for
+the tests and gives information about the test results and coverage information.
+
+Test-Runner is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Test-Runner is distributed in the hope that it will be useful
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Test-Runner.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import hashlib
+import os
+import re
+import shlex
+import shutil
+import tempfile
+from typing import Iterable, List, Tuple
+
+from pytesting_utils import Preconditions
+
+_WHEEL_NAME = re.compile(r"^([A-Za-z0-9._]+)-")
+_REQUIREMENT_NAME = re.compile(r"^([A-Za-z0-9][A-Za-z0-9._-]*)")
+
+
+def _canonical_name(name: str) -> str:
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+class Wheelhouse:
+    """
+    A local, content-addressed store of wheels shared by all runners.
+
+    Wheels are stored once per content hash in `blobs/` and made available to
+    pip through symbolic links with their wheel file names in `links/`, the
+    folder that is passed as `--find-links`.  Installations try the
+    wheelhouse alone first; only if that fails, the missing wheels are built
+    or downloaded by `pip wheel` and added to the wheelhouse afterwards.  In
+    offline mode the index is never contacted.  When the wheels exceed the
+    size bound, the least recently used ones are evicted.
+    """
+
+    def __init__(self, root_dir: str, max_size: int = 0, offline: bool = False):
+        """
+        Creates a new wheelhouse.
+
+        :param root_dir: The directory holding the wheels, it is created if it
+        does not exist
+        :param max_size: The maximum size of all wheels in bytes, zero means
+        unbounded
+        :param offline: Whether installations must only use the wheelhouse
+        """
+        Preconditions.check_argument(max_size >= 0, "The size has to be at least 0!")
+        self._root_dir = root_dir
+        self._blobs_dir = os.path.join(root_dir, "blobs")
+        self._links_dir = os.path.join(root_dir, "links")
+        self._staging_dir = os.path.join(root_dir, "staging")
+        for directory in (self._blobs_dir, self._links_dir, self._staging_dir):
+            os.makedirs(directory, exist_ok=True)
+        self._max_size = max_size
+        self._offline = offline
+
+    @property
+    def offline(self) -> bool:
+        """Whether installations must only use the wheelhouse"""
+        return self._offline
+
+    def get_find_links_dir(self) -> str:
+        """
+        Gives the folder that is passed to pip as `--find-links`.
+
+        :return: The path to the folder containing all wheels
+        """
+        return self._links_dir
+
+    def create_staging_dir(self) -> str:
+        """
+        Creates a folder that receives the wheels built during one run.
+
+        :return: The path to the new staging folder
+        """
+        return tempfile.mkdtemp(dir=self._staging_dir)
+
+    def install_command(
+        self, requirement: str, staging_dir: str, local: bool = False
+    ) -> str:
+        """
+        Creates the shell command that installs a requirement.
+
+        :param requirement: The quoted requirement arguments for pip
+        :param staging_dir: The staging folder for newly built wheels
+        :param local: Whether the requirement refers to a local path, its
+        wheel is not stored in the wheelhouse
+        :return: A shell command
+        """
+        find_links = "--find-links {}".format(shlex.quote(self._links_dir))
+        if local:
+            index = " --no-index" if self._offline else ""
+            return "pip install{} {} {}".format(index, find_links, requirement)
+        command = "pip install --no-index {} {}".format(find_links, requirement)
+        if self._offline:
+            return command
+        staging = shlex.quote(staging_dir)
+        fallback = "pip wheel {} -w {} {}".format(find_links, staging, requirement)
+        fallback += " && pip install --no-index {} --find-links {} {}".format(
+            find_links, staging, requirement
+        )
+        return "{} || {{ {}; }}".format(command, fallback)
+
+    def ingest(self, staging_dir: str) -> None:
+        """
+        Adds the wheels of a staging folder to the wheelhouse and removes the
+        staging folder.
+
+        :param staging_dir: A folder created by `create_staging_dir`
+        """
+        try:
+            for name in os.listdir(staging_dir):
+                if name.endswith(".whl"):
+                    self._add(os.path.join(staging_dir, name), name)
+        finally:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+        self.evict()
+
+    def mark_used(self, requirements: Iterable[str]) -> None:
+        """
+        Marks the wheels of the given requirements as recently used.
+
+        :param requirements: Requirements that were installed
+        """
+        names = set()
+        for requirement in requirements:
+            match = _REQUIREMENT_NAME.match(requirement.strip())
+            if match is not None:
+                names.add(_canonical_name(match.group(1)))
+        for link_name in os.listdir(self._links_dir):
+            match = _WHEEL_NAME.match(link_name)
+            if match is not None and _canonical_name(match.group(1)) in names:
+                try:
+                    os.utime(os.path.join(self._links_dir, link_name))
+                except OSError:
+                    continue
+
+    def evict(self) -> None:
+        """Removes least-recently-used wheels until the wheelhouse fits"""
+        if self._max_size == 0:
+            return
+        wheels = self._wheels()
+        total_size = sum(size for _, size, _, _ in wheels)
+        for _, size, link, blob in sorted(wheels):
+            if total_size <= self._max_size:
+                break
+            for path in (link, blob):
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+            total_size -= size
+
+    def _add(self, wheel: str, name: str) -> None:
+        digest = hashlib.sha256()
+        with open(wheel, "rb") as wheel_file:
+            for chunk in iter(lambda: wheel_file.read(1024 * 1024), b""):
+                digest.update(chunk)
+        blob = os.path.join(self._blobs_dir, digest.hexdigest())
+        if not os.path.exists(blob):
+            os.replace(wheel, blob)
+        else:
+            os.utime(blob)
+        tmp_link = os.path.join(self._links_dir, ".{}.tmp".format(digest.hexdigest()))
+        if os.path.lexists(tmp_link):
+            os.unlink(tmp_link)
+        os.symlink(os.path.relpath(blob, self._links_dir), tmp_link)
+        os.replace(tmp_link, os.path.join(self._links_dir, name))
+
+    def _wheels(self) -> List[Tuple[float, int, str, str]]:
+        wheels = []
+        for link_name in os.listdir(self._links_dir):
+            link = os.path.join(self._links_dir, link_name)
+            try:
+                blob = os.path.join(self._links_dir, os.readlink(link))
+                stat = os.stat(blob)
+            except OSError:
+                if os.path.islink(link):
+                    os.unlink(link)
+                continue
+            wheels.append((stat.st_mtime, stat.st_size, link, blob))
+        return wheels
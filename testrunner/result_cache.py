@@ -0,0 +1,415 @@
+"""
+Test runner is a library for running unit tests on Python code.
+
+It offers the opinion to automatically detect the correct run settings for
+the tests and gives information about the test results and coverage information.
+
+Test-Runner is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Test-Runner is distributed in the hope that it will be useful
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Test-Runner.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+import attr
+from plumbum import local, CommandNotFound  # type: ignore
+from pytesting_utils import Preconditions
+
+from testrunner.detection import DEFAULT_SKIP_DIRECTORIES
+from testrunner.environments.pool import interpreter_version
+from testrunner.runners.abstract_runner import JUNIT_XML_FILE, RunResult
+from testrunner.runners.coverage_contexts import COVERAGE_DATA_FILE
+from testrunner.runners.coverage_report import (
+    COVERAGE_REPORT_FILE,
+    CoverageData,
+    FileCoverage,
+)
+from testrunner.runners.junit_reader import (
+    DEFAULT_MAX_MESSAGE_LENGTH,
+    TestCaseResult,
+)
+from testrunner.runners.measurements import ResourceMeasurements
+from testrunner.runners.pytest_runner import COLLECTED_FILE, RESULTS_FILE
+
+_RESULT_FILE = "result.json"
+_OUTPUT_FILES = ("stdout.log", "stderr.log")
+_TEST_RESULTS_FILE = "tests.jsonl"
+
+# Files the runs write into the project, which must not change the key
+_RUN_FILES = frozenset(
+    {
+        "output.log",
+        COLLECTED_FILE,
+        COVERAGE_DATA_FILE,
+        COVERAGE_REPORT_FILE,
+        JUNIT_XML_FILE,
+        RESULTS_FILE,
+    }
+)
+_RUN_DIRECTORIES = DEFAULT_SKIP_DIRECTORIES | {".pytest_cache"}
+
+
+def working_tree_fingerprint(repo_path: str) -> str:
+    """
+    Computes a fingerprint of the content of a project's working tree.
+
+    The fingerprint covers the paths and the content of all files below
+    `repo_path`.  Inside a git repository these are the tracked files,
+    including uncommitted modifications, and the untracked files that are
+    not ignored.  Tracked files without modifications contribute the blob
+    ids of the git index, only modified and untracked files are read and
+    hashed.  Outside of git all files are hashed.  Tooling directories like
+    venvs or egg-info and the files the runs write into the project, like
+    the output log or the coverage data, are left out.
+
+    :param repo_path: Path to the project's source code
+    :return: A string identifying the content of the working tree
+    """
+    files = _git_files(repo_path)
+    if files is None:
+        files = dict.fromkeys(_walk_files(repo_path))
+    digest = hashlib.sha256()
+    for path in sorted(files):
+        if _is_run_file(path):
+            continue
+        digest.update(path.encode("utf-8", "surrogateescape") + b"\0")
+        blob_id = files[path]
+        if blob_id is not None:
+            digest.update(b"blob:" + blob_id.encode("ascii"))
+        else:
+            digest.update(b"sha256:" + _file_digest(os.path.join(repo_path, path)))
+    return "content:{}".format(digest.hexdigest())
+
+
+def _git_files(repo_path: str) -> Optional[Dict[str, Optional[str]]]:
+    """
+    Lists the files of the working tree by git, with the blob id of the
+    files that match the index and None for the files that have to be hashed
+    """
+    try:
+        git = local["git"]["-C", repo_path]
+    except CommandNotFound:
+        return None
+    retcode, staged, _ = git["ls-files", "-z", "--stage"].run(retcode=None)
+    if retcode != 0:
+        return None
+    files: Dict[str, Optional[str]] = {}
+    for entry in staged.split("\0"):
+        if not entry:
+            continue
+        info, path = entry.split("\t", 1)
+        _, blob_id, stage = info.split(" ")
+        # Unmerged paths have several entries, their content is hashed
+        files[path] = blob_id if stage == "0" and path not in files else None
+    _, modified, _ = git[
+        "diff", "-z", "--name-only", "--no-renames", "--relative"
+    ].run()
+    _, untracked, _ = git["ls-files", "-z", "--others", "--exclude-standard"].run()
+    for path in modified.split("\0") + untracked.split("\0"):
+        if path:
+            files[path] = None
+    return {
+        path: blob_id
+        for path, blob_id in files.items()
+        if not any(_is_run_directory(name) for name in path.split("/")[:-1])
+    }
+
+
+def _walk_files(repo_path: str) -> List[str]:
+    paths = []
+    for root, directories, files in os.walk(repo_path):
+        directories[:] = [name for name in directories if not _is_run_directory(name)]
+        relative_root = os.path.relpath(root, repo_path)
+        for name in files:
+            path = os.path.normpath(os.path.join(relative_root, name))
+            paths.append(path.replace(os.sep, "/"))
+    return paths
+
+
+def _is_run_directory(name: str) -> bool:
+    return name in _RUN_DIRECTORIES or name.endswith(".egg-info")
+
+
+def _is_run_file(path: str) -> bool:
+    name = os.path.basename(path)
+    return name in _RUN_FILES or name.startswith(COVERAGE_DATA_FILE + ".")
+
+
+def _file_digest(path: str) -> bytes:
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as source_file:
+            for chunk in iter(lambda: source_file.read(1 << 16), b""):
+                digest.update(chunk)
+    except OSError:
+        # Deleted tracked files and submodules
+        return b"-"
+    return digest.digest()
+
+
+# pylint: disable=too-few-public-methods
+@attr.s(frozen=True)
+class CachedRun:
+    """A run result with the outputs of the run it was parsed from"""
+
+    run_result: RunResult = attr.ib()
+    output: Tuple[str, str] = attr.ib()
+    coverage: Optional[CoverageData] = attr.ib(default=None)
+
+
+class ResultCache:
+    """
+    An on-disk, content-addressed cache for the results of runs.
+
+    The key of a run combines the fingerprint of the working tree, see
+    `working_tree_fingerprint`, the requirements and tooling of its venv, the
+    runner type with its options, and the interpreter version.  Every entry
+    is a directory in the cache directory holding the run result, the
+    outputs, the test case results and the coverage data of the run.
+    Least-recently-used entries are evicted when the cache grows beyond its
+    bounds.
+    """
+
+    def __init__(
+        self, cache_dir: str, max_entries: int = 1024, max_size: int = 0
+    ) -> None:
+        """
+        Creates a new result cache.
+
+        :param cache_dir: The directory holding the cache entries, it is
+        created if it does not exist
+        :param max_entries: The maximum number of kept entries
+        :param max_size: The maximum size of all kept entries in bytes, zero
+        means unbounded
+        """
+        Preconditions.check_argument(
+            max_entries > 0, "The cache has to hold at least one entry!"
+        )
+        Preconditions.check_argument(max_size >= 0, "The size has to be at least 0!")
+        os.makedirs(cache_dir, exist_ok=True)
+        self._cache_dir = cache_dir
+        self._max_entries = max_entries
+        self._max_size = max_size
+
+    @staticmethod
+    def key(repo_path: str, configuration: Mapping[str, Any]) -> str:
+        """
+        Computes the key of a run.
+
+        :param repo_path: Path to the project's source code
+        :param configuration: The options of the runner that determine the
+        results, see `AbstractRunner.configuration`
+        :return: A hash identifying the run
+        """
+        description = {
+            "repository": working_tree_fingerprint(repo_path),
+            "configuration": configuration,
+            "interpreter": interpreter_version(),
+        }
+        payload = json.dumps(description, sort_keys=True).encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()
+
+    def get(self, key: str) -> Optional[CachedRun]:
+        """
+        Gives the cached run for a key and marks the entry as used.
+
+        :param key: The key of the run
+        :return: The cached run, or None if there is no valid entry
+        """
+        entry_dir = self._entry_dir(key)
+        try:
+            with open(os.path.join(entry_dir, _RESULT_FILE)) as result_file:
+                entry = json.load(result_file)
+            outputs = []
+            for name in _OUTPUT_FILES:
+                with open(os.path.join(entry_dir, name)) as output_file:
+                    outputs.append(output_file.read())
+            run_result = _run_result(entry["run_result"])
+            coverage = _coverage_data(entry.get("coverage"))
+            os.utime(os.path.join(entry_dir, _RESULT_FILE))
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        return CachedRun(run_result, (outputs[0], outputs[1]), coverage)
+
+    def get_test_results(
+        self, key: str, max_message_length: int = DEFAULT_MAX_MESSAGE_LENGTH
+    ) -> Iterator[TestCaseResult]:
+        """
+        Reads the test case results of a cached run.
+
+        :param key: The key of the run
+        :param max_message_length: The maximum length of failure messages
+        :return: An iterator over the test case results, which is empty if
+        there is no entry
+        """
+        path = os.path.join(self._entry_dir(key), _TEST_RESULTS_FILE)
+        try:
+            results_file = open(path)
+        except OSError:
+            return
+        with results_file:
+            for line in results_file:
+                result = TestCaseResult(**json.loads(line))
+                if result.message is not None:
+                    result = attr.evolve(
+                        result, message=result.message[:max_message_length]
+                    )
+                yield result
+
+    def put(
+        self,
+        key: str,
+        run_result: RunResult,
+        output: Tuple[str, str],
+        repo_path: str,
+        *,
+        test_results: Iterable[TestCaseResult] = (),
+        coverage: Optional[CoverageData] = None,
+    ) -> None:
+        """
+        Stores a run and evicts entries if the cache grows beyond its bounds.
+
+        :param key: The key of the run
+        :param run_result: The result of the run
+        :param output: The normal and error output of the run
+        :param repo_path: Path to the project's source code, which allows
+        invalidating the entries of a repository
+        :param test_results: The results of the single test cases of the run
+        :param coverage: The coverage data of the run
+        """
+        entry = {
+            "repo_path": os.path.abspath(repo_path),
+            "run_result": attr.asdict(run_result),
+            "coverage": None if coverage is None else attr.asdict(coverage),
+        }
+        tmp_dir = tempfile.mkdtemp(dir=self._cache_dir, prefix=".tmp-")
+        try:
+            for name, text in zip(_OUTPUT_FILES, output):
+                with open(os.path.join(tmp_dir, name), "w") as output_file:
+                    output_file.write(text)
+            with open(os.path.join(tmp_dir, _TEST_RESULTS_FILE), "w") as results_file:
+                for result in test_results:
+                    results_file.write(json.dumps(attr.asdict(result)) + "\n")
+            with open(os.path.join(tmp_dir, _RESULT_FILE), "w") as result_file:
+                json.dump(entry, result_file, default=list)
+            self.invalidate(key)
+            os.rename(tmp_dir, self._entry_dir(key))
+        except OSError:
+            # A concurrent run may have stored the same entry in between,
+            # any other failure is an error
+            if not os.path.isdir(self._entry_dir(key)):
+                raise
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        self.evict()
+
+    def invalidate(self, key: str) -> bool:
+        """
+        Removes the entry of a run.
+
+        :param key: The key of the run
+        :return: Whether there was an entry
+        """
+        entry_dir = self._entry_dir(key)
+        if not os.path.isdir(entry_dir):
+            return False
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        return True
+
+    def invalidate_repository(self, repo_path: str) -> int:
+        """
+        Removes the entries of all runs of a repository.
+
+        :param repo_path: Path to the project's source code
+        :return: The number of removed entries
+        """
+        repo_path = os.path.abspath(repo_path)
+        removed = 0
+        for key in list(self._keys()):
+            try:
+                with open(os.path.join(self._entry_dir(key), _RESULT_FILE)) as f:
+                    entry_repo_path = json.load(f)["repo_path"]
+            except (OSError, ValueError, KeyError, TypeError):
+                continue
+            if entry_repo_path == repo_path and self.invalidate(key):
+                removed += 1
+        return removed
+
+    def clear(self) -> None:
+        """Removes all entries"""
+        for key in list(self._keys()):
+            self.invalidate(key)
+
+    def evict(self) -> None:
+        """Removes least-recently-used entries until the cache fits"""
+        entries = sorted(self._entries())
+        count = len(entries)
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, key in entries:
+            if count <= self._max_entries and (
+                self._max_size == 0 or total_size <= self._max_size
+            ):
+                break
+            self.invalidate(key)
+            count -= 1
+            total_size -= size
+
+    def _entries(self) -> Iterator[Tuple[float, int, str]]:
+        for key in self._keys():
+            entry_dir = self._entry_dir(key)
+            try:
+                last_used = os.stat(os.path.join(entry_dir, _RESULT_FILE)).st_mtime
+                size = sum(
+                    os.stat(os.path.join(entry_dir, name)).st_size
+                    for name in os.listdir(entry_dir)
+                )
+            except OSError:
+                continue
+            yield last_used, size, key
+
+    def _keys(self) -> Iterator[str]:
+        for name in os.listdir(self._cache_dir):
+            if not name.startswith(".") and os.path.isdir(self._entry_dir(name)):
+                yield name
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self._cache_dir, key)
+
+
+def _run_result(values: Dict[str, Any]) -> RunResult:
+    resources = values.pop("resources", None)
+    if resources is not None:
+        values["resources"] = ResourceMeasurements(**resources)
+    return RunResult(**values)
+
+
+def _coverage_data(values: Optional[Dict[str, Any]]) -> Optional[CoverageData]:
+    if values is None:
+        return None
+    files = {
+        name: FileCoverage(
+            file_values["statements"],
+            file_values["missing"],
+            file_values["coverage"],
+            array("I", file_values["executed_lines"]),
+            array("I", file_values["missing_lines"]),
+        )
+        for name, file_values in values["files"].items()
+    }
+    return CoverageData(
+        values["statements"], values["missing"], values["coverage"], files
+    )
@@ -18,39 +18,55 @@ You should have received a copy of the GNU Lesser General Public License
 along with Test-Runner.  If not, see <https://www.gnu.org/licenses/>.
 """
 import os
-from enum import Enum, auto
-from typing import Union, Tuple, Optional
+import sys
+from typing import (
+    Any,
+    AsyncIterator,
+    ContextManager,
+    Dict,
+    Iterator,
+    List,
+    Mapping,
+    Sequence,
+    Union,
+    Tuple,
+    Optional,
+)
 
-from plumbum import local  # type: ignore
 from pytesting_utils import IllegalStateException, Preconditions
 
+from testrunner.allocation import ResourceAllocator
+from testrunner.coverage_mode import CoverageMode
+from testrunner.detection import RunnerTypeDetector
+from testrunner.detection_cache import DetectionCache
+from testrunner.environments.base_layer import ToolingBaseLayers
+from testrunner.environments.capture import DEFAULT_TAIL_SIZE
+from testrunner.environments.managed_environment import ManagedEnvironment
+from testrunner.environments.pool import VirtualEnvironmentPool
+from testrunner.environments.streaming import OutputLine
+from testrunner.environments.wheelhouse import Wheelhouse
+from testrunner.result_cache import CachedRun, ResultCache
+from testrunner.runner_type import RunnerType
 from testrunner.runners.abstract_runner import AbstractRunner, RunResult
+from testrunner.runners.coverage_contexts import CoverageContextIndex
+from testrunner.runners.coverage_report import CoverageData
+from testrunner.runners.junit_reader import (
+    DEFAULT_MAX_MESSAGE_LENGTH,
+    TestCaseResult,
+)
+from testrunner.runners.measurements import ResourceMeasurements
 from testrunner.runners.nose2_runner import Nose2Runner
 from testrunner.runners.nose_runner import NoseRunner
 from testrunner.runners.pytest_runner import PyTestRunner
 from testrunner.runners.setup_py_runner import SetupPyRunner
-
-
-class RunnerType(Enum):
-    """Various types of known runners"""
-
-    AUTO_DETECT = auto()
-    """Use the auto-detection for the correct runner.
-    ATTENTION: This is not yet implemented!"""
-
-    PYTEST = auto()
-    """Use the PyTest runner."""
-
-    SETUP_PY = auto()
-    """Use setup.py test as runner."""
-
-    NOSE = auto()
-    """Use the nose runner."""
-
-    NOSE2 = auto()
-    """Use the nose2 runner."""
-
-    _UNKNOWN = auto()
+from testrunner.runners.sharding import ShardPlan
+from testrunner.selection import (
+    FULL_RUN_PATTERNS,
+    ImportGraphCache,
+    TestSelection,
+    configured_test_patterns,
+    select_tests,
+)
 
 
 # pylint: disable=too-many-instance-attributes,too-many-arguments
@@ -65,8 +81,27 @@ class Runner:
         repo_path: str,
         runner: RunnerType = RunnerType.AUTO_DETECT,
         time_limit: int = 0,
-        junit_xml_file: str = None,
-        venv_path: Union[bytes, str, os.PathLike] = None,
+        junit_xml_file: Optional[str] = None,
+        venv_path: Optional[Union[bytes, str, os.PathLike]] = None,
+        *,
+        detection_cache: Optional[DetectionCache] = None,
+        venv_pool: Optional[VirtualEnvironmentPool] = None,
+        base_layers: Optional[ToolingBaseLayers] = None,
+        wheelhouse: Optional[Wheelhouse] = None,
+        output_dir: Optional[str] = None,
+        tail_size: int = DEFAULT_TAIL_SIZE,
+        coverage_mode: CoverageMode = CoverageMode.FULL,
+        shards: int = 1,
+        test_durations: Optional[Mapping[str, float]] = None,
+        changed_since: Optional[str] = None,
+        import_graph_cache: Optional[ImportGraphCache] = None,
+        full_run_patterns: Sequence[str] = FULL_RUN_PATTERNS,
+        coverage_contexts: bool = False,
+        memory_limit: int = 0,
+        cores: Union[int, Sequence[int], None] = None,
+        output_limit: int = 0,
+        allocator: Optional[ResourceAllocator] = None,
+        result_cache: Optional[ResultCache] = None,
     ) -> None:
         """
         Creates a new runner for tests.
@@ -75,10 +110,46 @@ class Runner:
         :param repo_path: Path to the project's source code
         :param runner: The RunnerType that should be used
         :param time_limit: An optional time limit for the execution (in seconds)
-        :param junit_xml_file: Create an JUnit-like XML file from the runs (
-        only for PyTest)
+        :param junit_xml_file: The path of the JUnit-like XML file created by
+        the runs, a file in the project directory is used if none is given
         :param venv_path: Path where the temporary venv will be created
-         (only for PyTest)
+        :param detection_cache: An optional cache for the results of the
+        runner-type auto detection
+        :param venv_pool: An optional pool to lease reusable venvs from instead
+        of creating a temporary venv for each run
+        :param base_layers: Optional pre-built tooling environments the venvs
+        are layered on, such that only the project requirements are installed
+        :param wheelhouse: An optional local wheelhouse packages are installed
+        from
+        :param output_dir: An optional directory the complete outputs of the
+        runs are kept in, only their tails are kept otherwise
+        :param tail_size: The maximum number of bytes of an output's tail
+        that is kept in memory
+        :param coverage_mode: Whether and how the coverage of the tests is
+        measured
+        :param shards: The number of parallel processes a pytest suite is
+        split across
+        :param test_durations: Recorded durations of the tests by the ids of
+        `get_test_results`, which balance the shards
+        :param changed_since: An optional git revision, only the test modules
+        affected by the changes since this revision are run
+        :param import_graph_cache: An optional cache for the import graph of
+        the change-based test selection
+        :param full_run_patterns: Names of files whose changes make all tests
+        run despite `changed_since`
+        :param coverage_contexts: Whether the pytest runner records the
+        coverage per test, see `get_coverage_contexts`
+        :param memory_limit: An optional memory limit for the execution (in
+        bytes)
+        :param cores: An optional number of CPU cores or an explicit set of
+        cores the execution is restricted to
+        :param output_limit: An optional size the output log of the execution
+        is shrunk to (in bytes)
+        :param allocator: An optional allocator the cores and the memory
+        budget of each run are allocated from, shared by concurrent runners
+        :param result_cache: An optional cache, `run` gives the cached outputs
+        of an identical earlier run instead of running the tests, and the
+        results of the last run are read from the cache then
         """
         Preconditions.check_argument(
             time_limit >= 0, "A specified time limit has to be at least 0!"
@@ -88,25 +159,43 @@ class Runner:
         self._time_limit = time_limit
         self._junit_xml_file = junit_xml_file
         self._venv_path = venv_path
-        self._grep = local["grep"]
+        self._detection_cache = detection_cache
+        self._venv_pool = venv_pool
+        self._base_layers = base_layers
+        self._wheelhouse = wheelhouse
+        self._output_dir = output_dir
+        self._tail_size = tail_size
+        self._coverage_mode = coverage_mode
+        self._shards = shards
+        self._test_durations = test_durations
+        self._coverage_contexts = coverage_contexts
+        self._memory_limit = memory_limit
+        self._cores = cores
+        self._output_limit = output_limit
+        self._allocator = allocator
+        self._result_cache = result_cache
+        self._cached_run: Optional[CachedRun] = None
+        self._cached_key: Optional[str] = None
+        self._test_selection: Optional[TestSelection] = None
 
         if runner != RunnerType.AUTO_DETECT:
             self._runner_type = runner
         else:
             self._runner_type = self._detect_runner_type()
+        if changed_since is not None:
+            self._test_selection = select_tests(
+                repo_path,
+                changed_since,
+                import_graph_cache,
+                full_run_patterns,
+                configured_test_patterns(repo_path, self._runner_type),
+            )
         self._runner = self._instantiate_runner()
 
     def _detect_runner_type(self) -> RunnerType:
-        if self._is_pytest():
-            return RunnerType.PYTEST
-        if self._is_nose2():
-            return RunnerType.NOSE2
-        if self._is_nose():
-            return RunnerType.NOSE
-        if self._is_setup_py():
-            return RunnerType.SETUP_PY
-        # pylint: disable=protected-access
-        return RunnerType._UNKNOWN  # pragma: no cover
+        if self._detection_cache is not None:
+            return self._detection_cache.detect(self._repo_path).runner_type
+        return RunnerTypeDetector().detect(self._repo_path).runner_type
 
     def _instantiate_runner(self) -> AbstractRunner:
         runner: AbstractRunner
@@ -115,92 +204,57 @@ class Runner:
                 self._project_name,
                 self._repo_path,
                 self._time_limit,
-                self._junit_xml_file,
-                self._venv_path,
+                coverage_contexts=self._coverage_contexts,
+                **self._runner_options(),
             )
         elif self._runner_type == RunnerType.SETUP_PY:
             runner = SetupPyRunner(
-                self._project_name, self._repo_path, self._time_limit
+                self._project_name,
+                self._repo_path,
+                self._time_limit,
+                **self._runner_options(),
             )
         elif self._runner_type == RunnerType.NOSE:
-            runner = NoseRunner(self._project_name, self._repo_path, self._time_limit)
+            runner = NoseRunner(
+                self._project_name,
+                self._repo_path,
+                self._time_limit,
+                **self._runner_options(),
+            )
         elif self._runner_type == RunnerType.NOSE2:
-            runner = Nose2Runner(self._project_name, self._repo_path, self._time_limit)
+            runner = Nose2Runner(
+                self._project_name,
+                self._repo_path,
+                self._time_limit,
+                **self._runner_options(),
+            )
         else:
             raise IllegalStateException("Could not find a matching runner!")
         return runner
 
-    # pylint: disable=invalid-name,too-many-return-statements
-    def _is_pytest(self) -> bool:
-        if os.path.exists(os.path.join(self._repo_path, "setup.py")) and os.path.isfile(
-            os.path.join(self._repo_path, "setup.py")
-        ):
-            _, r, _ = self._grep[
-                "test_suite=pytest", os.path.join(self._repo_path, "setup.py")
-            ].run(retcode=None)
-            if len(r) > 0:
-                return True
-
-            _, r, _ = self._grep[
-                "test_suite=py.test", os.path.join(self._repo_path, "setup.py")
-            ].run(retcode=None)
-            if len(r) > 0:
-                return True
-
-        if os.path.exists(
-            os.path.join(self._repo_path, "pytest.ini")
-        ) and os.path.isfile(os.path.join(self._repo_path, "pytest.ini")):
-            return True
-
-        _, r, _ = self._grep["-R", "import pytest", self._repo_path].run(retcode=None)
-        if len(r) > 0:
-            return True
-
-        _, r, _ = self._grep["-R", "from pytest import", self._repo_path].run(
-            retcode=None
-        )
-        if len(r) > 0:
-            return True
-
-        _, r, _ = self._grep["-R", "pytest", self._repo_path].run(retcode=None)
-        if len(r) > 0:
-            return True
-
-        return False
-
-    def _is_nose2(self) -> bool:
-        if os.path.exists(os.path.join(self._repo_path, "setup.py")) and os.path.isfile(
-            os.path.join(self._repo_path, "setup.py")
-        ):
-            _, r, _ = self._grep[
-                "nose2", os.path.join(self._repo_path, "setup.py")
-            ].run(retcode=None)
-            if len(r) > 0:
-                return True
-        return False
-
-    def _is_nose(self) -> bool:
-        if os.path.exists(os.path.join(self._repo_path, "setup.py")) and os.path.isfile(
-            os.path.join(self._repo_path, "setup.py")
-        ):
-            _, r, _ = self._grep["nose", os.path.join(self._repo_path, "setup.py")].run(
-                retcode=None
-            )
-            if len(r) > 0:
-                return True
-        return False
-
-    def _is_setup_py(self) -> bool:
-        if os.path.exists(os.path.join(self._repo_path, "setup.py")) and os.path.isfile(
-            os.path.join(self._repo_path, "setup.py")
-        ):
-            _, r, _ = self._grep[
-                "test_suite=", os.path.join(self._repo_path, "setup.py")
-            ].run(retcode=None)
-            if len(r) > 0:
-                return True
-
-        return False
+    def _runner_options(self) -> Dict[str, Any]:
+        return {
+            "venv_path": self._venv_path,
+            "venv_pool": self._venv_pool,
+            "base_layers": self._base_layers,
+            "wheelhouse": self._wheelhouse,
+            "output_dir": self._output_dir,
+            "tail_size": self._tail_size,
+            "junit_xml_file": self._junit_xml_file,
+            "coverage_mode": self._coverage_mode,
+            "shards": self._shards,
+            "test_durations": self._test_durations,
+            "test_modules": self._selected_test_modules(),
+            "memory_limit": self._memory_limit,
+            "cores": self._cores,
+            "output_limit": self._output_limit,
+            "allocator": self._allocator,
+        }
+
+    def _selected_test_modules(self) -> Optional[List[str]]:
+        if self._test_selection is None or self._test_selection.run_all:
+            return None
+        return self._test_selection.test_modules
 
     def run(self) -> Optional[Tuple[str, str]]:
         """
@@ -208,7 +262,144 @@ class Runner:
 
         :return: A tuple (stdout, stderr) with the outputs of the run process
         """
-        return self._runner.run()
+        self._cached_run = None
+        self._cached_key = None
+        if self._result_cache is None:
+            return self._runner.run()
+        key = self.cache_key()
+        self._cached_run = self._result_cache.get(key)
+        if self._cached_run is not None:
+            self._cached_key = key
+            return self._cached_run.output
+        output = self._runner.run()
+        if output is not None:
+            self._store(key, output)
+        return output
+
+    def cache_key(self) -> str:
+        """
+        Computes the key of the run in the result cache.
+
+        :return: A hash of the working-tree content and the run configuration
+        """
+        return ResultCache.key(self._repo_path, self._runner.configuration())
+
+    def _store(self, key: str, output: Tuple[str, str]) -> None:
+        assert self._result_cache is not None
+        try:
+            run_result = self._runner.get_run_result(output[0])
+        except NotImplementedError:
+            return
+        coverage = self._runner.get_coverage()
+        self._result_cache.put(
+            key,
+            run_result,
+            output,
+            self._repo_path,
+            test_results=self._runner.get_test_results(sys.maxsize),
+            coverage=coverage,
+        )
+        self._cached_run = CachedRun(run_result, output, coverage)
+
+    async def run_async(self) -> AsyncIterator[OutputLine]:
+        """
+        Run the test runner for the project and stream its output
+
+        :return: An asynchronous iterator over the output lines as they arrive
+        """
+        async for line in self._runner.run_async():
+            yield line
+
+    def prepare_environment(
+        self, install: bool = False
+    ) -> ContextManager[ManagedEnvironment]:
+        """
+        Sets up the venv for running the tests.
+
+        :param install: Whether the requirements and tooling are installed
+        before the venv is yielded
+        :return: A context yielding the venv
+        """
+        return self._runner.prepare_environment(install)
+
+    def run_in_environment(self, env: ManagedEnvironment) -> Optional[Tuple[str, str]]:
+        """
+        Run the test runner for the project in a venv created by
+        `prepare_environment`
+
+        :param env: The venv for the run
+        :return: A tuple (stdout, stderr) with the outputs of the run process
+        """
+        return self._runner.run_in_environment(env)
+
+    def get_test_results(
+        self, max_message_length: int = DEFAULT_MAX_MESSAGE_LENGTH
+    ) -> Iterator[TestCaseResult]:
+        """
+        Reads the results of the single test cases of the last run.
+
+        :param max_message_length: The maximum length of failure messages
+        :return: An iterator over the test case results
+        """
+        if self._cached_key is not None:
+            assert self._result_cache is not None
+            return self._result_cache.get_test_results(
+                self._cached_key, max_message_length
+            )
+        return self._runner.get_test_results(max_message_length)
+
+    def get_test_selection(self) -> Optional[TestSelection]:
+        """
+        Gives the change-based test selection.
+
+        :return: The selected test modules, None if all tests are run
+        because no base revision was given
+        """
+        return self._test_selection
+
+    def get_resource_measurements(self) -> Optional[ResourceMeasurements]:
+        """
+        Gives the resources the last run used, as measured by runexec.
+
+        :return: The measurements, None if runexec did not report any
+        """
+        if self._cached_key is not None:
+            assert self._cached_run is not None
+            return self._cached_run.run_result.resources
+        return self._runner.get_resource_measurements()
+
+    def get_shard_plan(self) -> Optional[ShardPlan]:
+        """
+        Gives the shard plan of the last run.
+
+        :return: The plan with the predicted and actual durations of the
+        shards, None if the run was not sharded or came from the result cache
+        """
+        if self._cached_key is not None:
+            return None
+        return self._runner.get_shard_plan()
+
+    def get_coverage_contexts(self) -> Optional[CoverageContextIndex]:
+        """
+        Reads the lines each test of the last run covered.
+
+        :return: The index from covered lines to the tests, None if the run
+        did not record the coverage per test or came from the result cache
+        """
+        if self._cached_key is not None or not isinstance(self._runner, PyTestRunner):
+            return None
+        return self._runner.get_coverage_contexts()
+
+    def get_coverage(self) -> Optional[CoverageData]:
+        """
+        Reads the coverage data of the last run.
+
+        :return: The coverage data, None if the run did not measure coverage
+        """
+        if self._cached_key is not None:
+            assert self._cached_run is not None
+            return self._cached_run.coverage
+        return self._runner.get_coverage()
 
     def get_run_result(self, result: str) -> RunResult:
         """
@@ -217,4 +408,6 @@ class Runner:
         :param result: The output of the run method
         :return: A run-result object containing the extracted information
         """
+        if self._cached_run is not None and result == self._cached_run.output[0]:
+            return self._cached_run.run_result
         return self._runner.get_run_result(result)
@@ -17,14 +17,63 @@ GNU Lesser General Public License for more details.
 You should have received a copy of the GNU Lesser General Public License
 along with Test-Runner.  If not, see <https://www.gnu.org/licenses/>.
 """
+import asyncio
+import contextlib
 import os
+import shlex
+import tempfile
 from abc import ABCMeta, abstractmethod
-from typing import List, Optional, Tuple
+from typing import (
+    Any,
+    AsyncIterator,
+    ContextManager,
+    Dict,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
 import attr
 import pipfile  # type: ignore
 from pytesting_utils import Preconditions
 
+from testrunner.allocation import Allocation, ResourceAllocator
+from testrunner.coverage_mode import CoverageMode
+from testrunner.environments.base_layer import ToolingBaseLayers
+from testrunner.environments.capture import DEFAULT_TAIL_SIZE, OutputCapture
+from testrunner.environments.managed_environment import (
+    ManagedEnvironment,
+    temporary_environment,
+)
+from testrunner.environments.pool import VirtualEnvironmentPool
+from testrunner.environments.streaming import STDOUT, OutputLine
+from testrunner.environments.wheelhouse import Wheelhouse
+from testrunner.runners.coverage_contexts import COVERAGE_DATA_FILE
+from testrunner.runners.coverage_report import (
+    COVERAGE_REPORT_FILE,
+    CoverageData,
+    display_percent,
+    read_coverage_report,
+)
+from testrunner.runners.junit_reader import (
+    DEFAULT_MAX_MESSAGE_LENGTH,
+    TestCaseResult,
+    read_junit_xml,
+)
+from testrunner.runners.measurements import (
+    ResourceMeasurements,
+    RunStatus,
+    parse_measurements,
+    read_measurements,
+)
+from testrunner.runners.sharding import ShardPlan
+
+JUNIT_XML_FILE = ".testrunner-junit.xml"
+
 
 # pylint: disable=too-many-instance-attributes,too-few-public-methods
 @attr.s
@@ -34,6 +83,8 @@ class RunResult:
     statements: int = attr.ib(default=-1)
     missing: int = attr.ib(default=-1)
     coverage: float = attr.ib(default=-1.0)
+    """The percentage of covered statements, rounded to an integer like the
+    TOTAL line of coverage.py's report; see `get_coverage` for the exact one"""
     failed: int = attr.ib(default=-1)
     passed: int = attr.ib(default=-1)
     skipped: int = attr.ib(default=-1)
@@ -41,30 +92,448 @@ class RunResult:
     error: int = attr.ib(default=-1)
     time: float = attr.ib(default=-1.0)
     runner: str = attr.ib(default="")
+    resources: Optional[ResourceMeasurements] = attr.ib(default=None)
+
+    @property
+    def status(self) -> RunStatus:
+        """
+        Gives the outcome of the run with respect to its resource limits.
+
+        :return: The status, COMPLETED if runexec did not report measurements
+        """
+        if self.resources is None:
+            return RunStatus.COMPLETED
+        return self.resources.status
 
 
 class AbstractRunner(metaclass=ABCMeta):
     """An abstract base class for test runners."""
 
-    def __init__(self, project_name: str, path: str) -> None:
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        project_name: str,
+        path: str,
+        time_limit: int = 0,
+        *,
+        venv_path: Optional[Union[bytes, str, os.PathLike]] = None,
+        venv_pool: Optional[VirtualEnvironmentPool] = None,
+        base_layers: Optional[ToolingBaseLayers] = None,
+        wheelhouse: Optional[Wheelhouse] = None,
+        output_dir: Optional[str] = None,
+        tail_size: int = DEFAULT_TAIL_SIZE,
+        junit_xml_file: Optional[Union[str, os.PathLike]] = None,
+        coverage_mode: CoverageMode = CoverageMode.FULL,
+        shards: int = 1,
+        test_durations: Optional[Mapping[str, float]] = None,
+        test_modules: Optional[Sequence[str]] = None,
+        memory_limit: int = 0,
+        cores: Union[int, Sequence[int], None] = None,
+        output_limit: int = 0,
+        allocator: Optional[ResourceAllocator] = None,
+    ) -> None:
+        """
+        Creates a new runner.
+
+        :param project_name: The name of the project
+        :param path: Path to the project's source code
+        :param time_limit: An optional time limit for the execution (in seconds)
+        :param venv_path: Path where the temporary venv will be created
+        :param venv_pool: An optional pool to lease reusable venvs from, the
+        venv_path is ignored if a pool is given
+        :param base_layers: Optional pre-built tooling environments the venvs
+        are layered on, such that only the project requirements are installed
+        :param wheelhouse: An optional local wheelhouse packages are installed
+        from
+        :param output_dir: An optional directory the complete outputs of the
+        runs are kept in, only their tails are kept otherwise
+        :param tail_size: The maximum number of bytes of an output's tail
+        that is kept in memory
+        :param junit_xml_file: The JUnit-like XML file the test tool writes,
+        a file in the project directory is used if none is given
+        :param coverage_mode: Whether and how the coverage of the tests is
+        measured
+        :param shards: The number of parallel processes the tests are split
+        across, runners that cannot split the tests run them in one process
+        :param test_durations: Recorded durations of the tests by the ids of
+        `get_test_results`, which balance the shards; the results of the
+        previous run in the project directory are used if none are given
+        :param test_modules: Paths of the test modules to run relative to the
+        project, all tests are run if None and none if empty
+        :param memory_limit: An optional memory limit for the execution (in
+        bytes)
+        :param cores: An optional number of CPU cores or an explicit set of
+        cores the execution is restricted to; for a number, the first cores
+        this process may run on are used
+        :param output_limit: An optional size the output log of the execution
+        is shrunk to (in bytes), runexec removes lines from its middle
+        :param allocator: An optional allocator the cores and the memory
+        budget of each run are allocated from; the run gets the given number
+        of cores, or one per shard, and waits until they are available
+        """
         Preconditions.check_argument(
             len(project_name) > 0, "Project name must not be empty!"
         )
         Preconditions.check_argument(len(path) > 0, "Path must not be empty!")
+        Preconditions.check_argument(shards >= 1, "At least one shard is required!")
+        Preconditions.check_argument(
+            memory_limit >= 0, "A specified memory limit has to be at least 0!"
+        )
+        Preconditions.check_argument(
+            output_limit >= 0, "A specified output limit has to be at least 0!"
+        )
         self._project_name = project_name
         self._path = path
+        self._time_limit = time_limit
+        self._venv_path = venv_path
+        self._venv_pool = venv_pool
+        self._base_layers = base_layers
+        self._wheelhouse = wheelhouse
+        self._output_dir = output_dir
+        self._tail_size = tail_size
+        self._junit_xml_file = junit_xml_file
+        self._coverage_mode = coverage_mode
+        self._shards = shards
+        self._test_durations = test_durations
+        self._test_modules = test_modules
+        self._memory_limit = memory_limit
+        self._allocator = allocator
+        self._allocation: Optional[Allocation] = None
+        if allocator is not None:
+            Preconditions.check_argument(
+                cores is None or isinstance(cores, int),
+                "Only a number of cores can be allocated!",
+            )
+            self._core_count = cores if isinstance(cores, int) else shards
+            self._cores = None
+        else:
+            self._cores = _resolve_cores(cores)
+        self._output_limit = output_limit
+        self._resource_measurements: Optional[ResourceMeasurements] = None
 
-    @abstractmethod
     def run(self) -> Optional[Tuple[str, str]]:
         """Runs the tests using the test runners.
 
         The result is a tuple of normal output and error output, if created
         """
+        if self._selects_nothing():
+            return None
+        with self.prepare_environment() as env:
+            return self.run_in_environment(env)
+
+    @contextlib.contextmanager
+    def prepare_environment(
+        self, install: bool = False
+    ) -> Iterator[ManagedEnvironment]:
+        """
+        Sets up the venv for running the tests.
+
+        :param install: Whether the requirements and tooling are installed
+        before the venv is yielded, otherwise this happens on the first run
+        :return: A context yielding the venv, which is removed or returned to
+        the pool afterwards
+        """
+        packages = self._extract_necessary_packages()
+        with self._environment(packages, self._tooling_packages()) as env:
+            if install:
+                env.install(cwd=self._path)
+            yield env
+
+    def run_in_environment(self, env: ManagedEnvironment) -> Optional[Tuple[str, str]]:
+        """
+        Runs the tests in a venv created by `prepare_environment`.
+
+        :param env: The venv for the run
+        :return: A tuple of normal output and error output, if created, both
+        as `CapturedOutput` holding the tails of the outputs
+        """
+        if self._selects_nothing():
+            return None
+        output_log = os.path.join(self._path, "output.log")
+        self._prepare_run(env)
+        with self._capture("stdout") as out, self._capture("stderr") as err:
+            self._acquire_resources()
+            try:
+                env.run_commands_into(self._run_commands(), out, err, self._path)
+            finally:
+                self._release_resources()
+            self._resource_measurements = read_measurements(out.file)
+            self._finish_run()
+            out.append_file(output_log)
+            return out.finish(), err.finish()
+
+    def _capture(self, stream: str) -> OutputCapture:
+        spill_path = None
+        if self._output_dir is not None:
+            handle, spill_path = tempfile.mkstemp(
+                prefix="{}-".format(self._project_name),
+                suffix=".{}.log".format(stream),
+                dir=self._output_dir,
+            )
+            os.close(handle)
+        return OutputCapture(spill_path, self._tail_size)
+
+    async def run_async(self) -> AsyncIterator[OutputLine]:
+        """
+        Runs the tests and yields the output lines as they arrive.
+
+        The lines of the test output, which `run` appends to the normal
+        output, are yielded on the `log` stream.  Cancelling the consuming
+        task kills the test processes.  The venv is set up and removed in the
+        default executor of the event loop.
+
+        :return: An asynchronous iterator over the output lines
+        """
+        if self._selects_nothing():
+            return
+        loop = asyncio.get_running_loop()
+        context = self.prepare_environment()
+        env = await loop.run_in_executor(None, context.__enter__)
+        try:
+            async for line in self.run_in_environment_async(env):
+                yield line
+        finally:
+            await loop.run_in_executor(None, context.__exit__, None, None, None)
+
+    async def run_in_environment_async(
+        self, env: ManagedEnvironment
+    ) -> AsyncIterator[OutputLine]:
+        """
+        Runs the tests in a venv created by `prepare_environment` and yields
+        the output lines as they arrive.
+
+        :param env: The venv for the run
+        :return: An asynchronous iterator over the output lines
+        """
+        if self._selects_nothing():
+            return
+        output_log = os.path.join(self._path, "output.log")
+        self._prepare_run(env)
+        measurement_lines = []
+        loop = asyncio.get_running_loop()
+        acquisition = loop.run_in_executor(None, self._acquire_resources)
+        try:
+            await asyncio.shield(acquisition)
+        except asyncio.CancelledError:
+            # The executor still completes the allocation, which is released
+            # as soon as it is done
+            acquisition.add_done_callback(lambda _: self._release_resources())
+            raise
+        try:
+            async for line in env.stream_commands(
+                self._run_commands(), cwd=self._path, follow=output_log
+            ):
+                if line.stream == STDOUT and "=" in line.text:
+                    measurement_lines.append(line.text)
+                yield line
+        finally:
+            self._release_resources()
+        self._resource_measurements = parse_measurements(measurement_lines)
+        self._finish_run()
 
     @abstractmethod
     def get_run_result(self, log: str) -> RunResult:
         """Generates a run result for a log string"""
 
+    def get_test_results(
+        self, max_message_length: int = DEFAULT_MAX_MESSAGE_LENGTH
+    ) -> Iterator[TestCaseResult]:
+        """
+        Reads the results of the single test cases of the last run.
+
+        :param max_message_length: The maximum length of failure messages
+        :return: An iterator over the test case results, which is empty if
+        the test tool did not write a JUnit-like XML file
+        """
+        if not os.path.isfile(self._junit_xml_path()):
+            return iter(())
+        return read_junit_xml(self._junit_xml_path(), max_message_length)
+
+    def configuration(self) -> Dict[str, Any]:
+        """
+        Describes the options of the runner that determine the results.
+
+        :return: A JSON-serializable description of the runner type, the
+        commands, the limits, and the venv, which has the same value for runs
+        that give the same results on the same code
+        """
+        return {
+            "runner": type(self).__name__,
+            "commands": [self._test_command()] + self._after_test_commands(),
+            "environment": VirtualEnvironmentPool.environment_key(
+                self._extract_necessary_packages(), self._tooling_packages()
+            ),
+            "time_limit": self._time_limit,
+            "memory_limit": self._memory_limit,
+            "output_limit": self._output_limit,
+            "coverage_mode": self._coverage_mode.name,
+            "shards": self._shards,
+        }
+
+    def get_resource_measurements(self) -> Optional[ResourceMeasurements]:
+        """
+        Gives the resources the last run used, as measured by runexec.
+
+        :return: The measurements, None if runexec did not report any
+        """
+        return self._resource_measurements
+
+    def get_shard_plan(self) -> Optional[ShardPlan]:
+        """
+        Gives the shard plan of the last run.
+
+        :return: The plan with the predicted and, once the run finished, the
+        actual durations of the shards; None if the run was not sharded
+        """
+        return None
+
+    def get_coverage(self) -> Optional[CoverageData]:
+        """
+        Reads the coverage data of the last run.
+
+        :return: The coverage data, None if the run did not measure coverage
+        """
+        return read_coverage_report(self._coverage_report_path())
+
+    def _coverage_values(self) -> Dict[str, Union[int, float]]:
+        """Gives the coverage values of the last run for a `RunResult`"""
+        data = self.get_coverage()
+        if data is None:
+            return {}
+        return {
+            "statements": data.statements,
+            "missing": data.missing,
+            "coverage": display_percent(data.coverage),
+        }
+
+    def _selects_nothing(self) -> bool:
+        return self._test_modules is not None and len(self._test_modules) == 0
+
+    def _selected_modules(self) -> str:
+        """Gives the selected test modules as arguments for the test command"""
+        if self._test_modules is None:
+            return ""
+        return "".join(" " + shlex.quote(path) for path in self._test_modules)
+
+    def _measures_coverage(self) -> bool:
+        return self._coverage_mode != CoverageMode.OFF
+
+    def _coverage_report_path(self) -> str:
+        return os.path.join(os.path.abspath(self._path), COVERAGE_REPORT_FILE)
+
+    def _junit_xml_path(self) -> str:
+        if self._junit_xml_file is not None:
+            return os.fspath(self._junit_xml_file)
+        return os.path.join(os.path.abspath(self._path), JUNIT_XML_FILE)
+
+    def _prepare_run(self, env: ManagedEnvironment) -> None:
+        """Prepares the venv and the project directly before each run"""
+        # The results of the run are read from these files, which must not
+        # be left over from an earlier run.  The coverage data is removed as
+        # well, since the report would be exported from stale data if a run
+        # died before writing it.
+        stale_files = [
+            os.path.join(self._path, "output.log"),
+            self._coverage_report_path(),
+            os.path.join(os.path.abspath(self._path), COVERAGE_DATA_FILE),
+        ]
+        if self._junit_xml_file is None:
+            stale_files.append(self._junit_xml_path())
+        for path in stale_files:
+            if os.path.isfile(path):
+                os.remove(path)
+
+    def _acquire_resources(self) -> None:
+        """Allocates the cores and memory for a run, if there is an allocator"""
+        if self._allocator is not None:
+            self._allocation = self._allocator.acquire(
+                self._core_count, self._memory_limit
+            )
+
+    def _release_resources(self) -> None:
+        if self._allocator is not None and self._allocation is not None:
+            self._allocator.release(self._allocation)
+        self._allocation = None
+
+    def _finish_run(self) -> None:
+        """Processes the files written by a run directly after the run"""
+
+    def _tooling_packages(self) -> List[str]:
+        """Gives the packages the runner needs in the venv to run the tests"""
+        return ["benchexec"]
+
+    @abstractmethod
+    def _test_command(self) -> str:
+        """Gives the command that runs the tests inside the project folder"""
+
+    def _after_test_commands(self) -> List[str]:
+        """Gives commands that are run in the venv after the tests"""
+        return []
+
+    def _runexec_options(self) -> List[str]:
+        """Gives additional options for runexec"""
+        return []
+
+    def _run_commands(self) -> List[str]:
+        return [self._create_command()] + self._after_test_commands()
+
+    def _create_command(self) -> str:
+        return self._runexec_command(self._test_command())
+
+    def _runexec_command(
+        self, test_command: str, *options: str, share: Tuple[int, int] = (0, 1)
+    ) -> str:
+        """
+        Gives the runexec command for a test command.
+
+        :param test_command: The command that runs the tests
+        :param options: Further options for runexec
+        :param share: The index of the process and the number of processes
+        running in parallel, which split the memory limit and the cores
+        :return: The shell command
+        """
+        index, count = share
+        command = ["runexec"] + self._runexec_options() + list(options)
+        if self._time_limit > 0:
+            command.append("--timelimit={}s".format(self._time_limit))
+        if self._memory_limit > 0:
+            command.append("--memlimit={}".format(self._memory_limit // count))
+        cores = self._cores
+        if self._allocation is not None:
+            cores = self._allocation.cores
+        if cores is not None:
+            command.append("--cores={}".format(_cpu_list(_share(cores, index, count))))
+        if self._allocation is not None:
+            command.append(
+                "--memoryNodes={}".format(_cpu_list(self._allocation.memory_nodes))
+            )
+        if self._output_limit > 0:
+            command.append("--maxOutputSize={}".format(self._output_limit))
+        command.append("--")
+        if self._coverage_mode == CoverageMode.LINES:
+            command.append("env COVERAGE_CORE=sysmon")
+        command.append(test_command)
+        return " ".join(command)
+
+    @contextlib.contextmanager
+    def _environment(
+        self, packages: List[str], tooling: List[str]
+    ) -> Iterator[ManagedEnvironment]:
+        context: ContextManager[ManagedEnvironment]
+        if self._venv_pool is not None:
+            context = self._venv_pool.lease(self._project_name, packages, tooling)
+        else:
+            context = temporary_environment(self._project_name, self._venv_path)
+        with context as env:
+            if self._wheelhouse is not None:
+                env.use_wheelhouse(self._wheelhouse)
+            if self._venv_pool is None:
+                env.add_packages_for_installation(packages)
+                env.add_packages_for_installation(tooling)
+            if self._base_layers is not None:
+                self._base_layers.apply(env, tooling)
+            yield env
+
     def _extract_necessary_packages(self) -> List[str]:
         packages: List[str] = []
         file_names = [
@@ -116,3 +585,41 @@ class AbstractRunner(metaclass=ABCMeta):
 
     def __repr__(self) -> str:
         return self.__str__()
+
+
+def _resolve_cores(cores: Union[int, Sequence[int], None]) -> Optional[List[int]]:
+    """Gives the explicit set of cores for a number or a set of cores"""
+    if cores is None:
+        return None
+    if isinstance(cores, int):
+        available = sorted(_available_cores())
+        Preconditions.check_argument(
+            0 < cores <= len(available),
+            "The number of cores has to be between 1 and {}!".format(len(available)),
+        )
+        return available[:cores]
+    Preconditions.check_argument(len(cores) > 0, "The set of cores must not be empty!")
+    Preconditions.check_argument(
+        all(core >= 0 for core in cores), "Cores must not be negative!"
+    )
+    return sorted(set(cores))
+
+
+def _share(cores: Sequence[int], index: int, count: int) -> Sequence[int]:
+    """Gives the disjoint part of the cores for one of several processes"""
+    if len(cores) < count:
+        # There are not enough cores for each process to have its own
+        return [cores[index % len(cores)]]
+    start = index * len(cores) // count
+    stop = (index + 1) * len(cores) // count
+    return cores[start:stop]
+
+
+def _cpu_list(ids: Sequence[int]) -> str:
+    return ",".join(map(str, ids))
+
+
+def _available_cores() -> Sequence[int]:
+    if hasattr(os, "sched_getaffinity"):
+        return list(os.sched_getaffinity(0))
+    return range(os.cpu_count() or 1)
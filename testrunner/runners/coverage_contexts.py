@@ -0,0 +1,318 @@
+"""
+Test runner is a library for running unit tests on Python code.
+
+It offers the opinion to automatically detect the correct run settings for
+the tests and gives information about the test results and coverage information.
+
+Test-Runner is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Test-Runner is distributed in the hope that it will be useful
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Test-Runner.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import json
+import os
+import sqlite3
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+COVERAGE_DATA_FILE = ".coverage"
+
+# Suffixes pytest-cov appends to the test id of a context
+_PHASES = ("|setup", "|run", "|teardown")
+
+# Sorted line numbers, offsets into the postings, and the sorted test
+# indices covering each line
+_FileIndex = Tuple[array, array, array]
+
+
+class CoverageContextIndex:
+    """
+    An inverted index from covered lines to the tests covering them.
+
+    For every file the index holds three integer arrays: the sorted covered
+    line numbers, the offsets of their postings, and the postings, which are
+    the sorted indices of the tests covering each line.  A line is looked up
+    by binary search.
+    """
+
+    def __init__(self) -> None:
+        """Creates a new, empty index"""
+        self._tests: List[str] = []
+        self._test_indices: Dict[str, int] = {}
+        self._files: Dict[str, _FileIndex] = {}
+
+    @classmethod
+    def from_lines(
+        cls, covered: Mapping[str, Mapping[int, Iterable[str]]]
+    ) -> "CoverageContextIndex":
+        """
+        Creates an index from the covered lines.
+
+        :param covered: The test ids covering each line, by file and line
+        :return: The index
+        """
+        index = cls()
+        for path, lines in covered.items():
+            index._files[path] = _file_index(
+                {
+                    line: {index._test_index(test) for test in tests}
+                    for line, tests in lines.items()
+                }
+            )
+        return index
+
+    @property
+    def test_ids(self) -> List[str]:
+        """Gives the ids of the tests in the index"""
+        return list(self._tests)
+
+    @property
+    def files(self) -> List[str]:
+        """Gives the paths of the covered files"""
+        return sorted(self._files)
+
+    def covered_lines(self, path: str) -> Dict[int, List[str]]:
+        """
+        Gives the tests covering each covered line of a file.
+
+        :param path: The path of the file
+        :return: The ids of the covering tests by line number, empty if the
+        file is not covered
+        """
+        file_index = self._files.get(path)
+        if file_index is None:
+            return {}
+        lines, offsets, postings = file_index
+        return {
+            line: [
+                self._tests[test]
+                for test in postings[offsets[position] : offsets[position + 1]]
+            ]
+            for position, line in enumerate(lines)
+        }
+
+    def tests_for_line(self, path: str, line: int) -> List[str]:
+        """
+        Gives the tests covering a line.
+
+        :param path: The path of the file
+        :param line: The line number
+        :return: The ids of the covering tests, empty if the line is not
+        covered
+        """
+        return [self._tests[test] for test in self._postings(path, line)]
+
+    def tests_for_lines(self, path: str, lines: Iterable[int]) -> List[str]:
+        """
+        Gives the tests covering any of several lines, e.g., of a function.
+
+        :param path: The path of the file
+        :param lines: The line numbers
+        :return: The sorted ids of the covering tests
+        """
+        tests: Set[int] = set()
+        for line in lines:
+            tests.update(self._postings(path, line))
+        return sorted(self._tests[test] for test in tests)
+
+    def _postings(self, path: str, line: int) -> memoryview:
+        file_index = self._files.get(path)
+        if file_index is None:
+            return memoryview(b"")
+        lines, offsets, postings = file_index
+        position = bisect_left(lines, line)
+        if position == len(lines) or lines[position] != line:
+            return memoryview(b"")
+        return memoryview(postings)[offsets[position] : offsets[position + 1]]
+
+    def _test_index(self, test: str) -> int:
+        index = self._test_indices.get(test)
+        if index is None:
+            index = len(self._tests)
+            self._tests.append(test)
+            self._test_indices[test] = index
+        return index
+
+    def update(self, newer: "CoverageContextIndex") -> None:
+        """
+        Replaces the coverage of the tests of a newer index, e.g., from a
+        partial rerun.
+
+        The postings of the rerun tests are replaced in the files they
+        covered before or cover now, all other files are kept as they are.
+
+        :param newer: The index of the rerun tests
+        """
+        rerun = {self._test_index(test) for test in newer.test_ids}
+        newer_files = set(newer.files)
+        for path in set(self._files) | newer_files:
+            covered: Dict[int, Set[int]] = {}
+            changed = path in newer_files
+            if path in self._files:
+                lines, offsets, postings = self._files[path]
+                if not changed and rerun.isdisjoint(postings):
+                    continue
+                for position, line in enumerate(lines):
+                    tests = postings[offsets[position] : offsets[position + 1]]
+                    kept = {test for test in tests if test not in rerun}
+                    if kept:
+                        covered[line] = kept
+            if changed:
+                for line, test_ids in newer.covered_lines(path).items():
+                    covered.setdefault(line, set()).update(
+                        self._test_index(test) for test in test_ids
+                    )
+            if covered:
+                self._files[path] = _file_index(covered)
+            else:
+                del self._files[path]
+
+    def save(self, path: str) -> None:
+        """
+        Saves the index to a file.
+
+        :param path: The path of the file
+        """
+        with open(path, "w") as index_file:
+            json.dump(
+                {
+                    "tests": self._tests,
+                    "files": {
+                        file_path: [column.tolist() for column in file_index]
+                        for file_path, file_index in self._files.items()
+                    },
+                },
+                index_file,
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "CoverageContextIndex":
+        """
+        Loads a saved index.
+
+        :param path: The path of the file
+        :return: The index
+        """
+        with open(path) as index_file:
+            content = json.load(index_file)
+        index = cls()
+        for test in content["tests"]:
+            index._test_index(test)
+        for file_path, (lines, offsets, postings) in content["files"].items():
+            index._files[file_path] = (
+                array("I", lines),
+                array("I", offsets),
+                array("I", postings),
+            )
+        return index
+
+
+def _file_index(covered: Dict[int, Set[int]]) -> _FileIndex:
+    lines = array("I", sorted(covered))
+    offsets = array("I", [0])
+    postings = array("I")
+    for line in lines:
+        postings.extend(sorted(covered[line]))
+        offsets.append(len(postings))
+    return lines, offsets, postings
+
+
+def read_coverage_contexts(
+    data_file: str, root: Optional[str] = None
+) -> CoverageContextIndex:
+    """
+    Reads the covered lines per test from a coverage.py data file.
+
+    The data file has to be recorded with test contexts, e.g., by
+    pytest-cov's `--cov-context=test`.  Lines covered outside of a test
+    context, such as during imports, are not indexed.  Both line and branch
+    data are supported.
+
+    :param data_file: The path of the SQLite data file of coverage.py
+    :param root: An optional directory the file paths are made relative to
+    :return: The index of the covered lines
+    """
+    connection = sqlite3.connect(
+        "file:{}?mode=ro".format(os.path.abspath(data_file)), uri=True
+    )
+    try:
+        tables = {
+            name
+            for (name,) in connection.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table'"
+            )
+        }
+        files = {
+            file_id: _relative_path(path, root)
+            for file_id, path in connection.execute("SELECT id, path FROM file")
+        }
+        tests = {
+            context_id: _test_id(context)
+            for context_id, context in connection.execute(
+                "SELECT id, context FROM context"
+            )
+        }
+        covered: Dict[str, Dict[int, Set[str]]] = {}
+
+        def add(file_id: int, context_id: int, lines: Iterable[int]) -> None:
+            test = tests.get(context_id)
+            if not test:
+                return
+            file_lines = covered.setdefault(files[file_id], {})
+            for line in lines:
+                file_lines.setdefault(line, set()).add(test)
+
+        if "line_bits" in tables:
+            for file_id, context_id, numbits in connection.execute(
+                "SELECT file_id, context_id, numbits FROM line_bits"
+            ):
+                add(file_id, context_id, numbits_to_lines(numbits))
+        if "arc" in tables:
+            for file_id, context_id, start, end in connection.execute(
+                "SELECT file_id, context_id, fromno, tono FROM arc"
+            ):
+                add(file_id, context_id, [line for line in (start, end) if line > 0])
+    finally:
+        connection.close()
+    return CoverageContextIndex.from_lines(covered)
+
+
+def numbits_to_lines(numbits: bytes) -> List[int]:
+    """
+    Decodes coverage.py's numbits, a bitmap of line numbers.
+
+    :param numbits: The bitmap, bit n of byte i stands for line 8 * i + n
+    :return: The line numbers
+    """
+    return [
+        index * 8 + bit
+        for index, byte in enumerate(numbits)
+        if byte
+        for bit in range(8)
+        if byte & (1 << bit)
+    ]
+
+
+def _test_id(context: str) -> str:
+    for phase in _PHASES:
+        if context.endswith(phase):
+            return context[: -len(phase)]
+    return context
+
+
+def _relative_path(path: str, root: Optional[str]) -> str:
+    if root is None or not os.path.isabs(path):
+        return path
+    root = os.path.abspath(root)
+    if os.path.commonpath([root, path]) != root:
+        return path
+    return os.path.relpath(path, root).replace(os.sep, "/")
@@ -0,0 +1,114 @@
+"""
+Test runner is a library for running unit tests on Python code.
+
+It offers the opinion to automatically detect the correct run settings for
+the tests and gives information about the test results and coverage information.
+
+Test-Runner is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Test-Runner is distributed in the hope that it will be useful
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Test-Runner.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import json
+import shlex
+from array import array
+from typing import Dict, Optional
+
+import attr
+
+COVERAGE_REPORT_FILE = ".testrunner-coverage.json"
+
+
+# pylint: disable=too-few-public-methods
+@attr.s(frozen=True)
+class FileCoverage:
+    """The coverage of a single source file"""
+
+    statements: int = attr.ib()
+    missing: int = attr.ib()
+    coverage: float = attr.ib()
+    executed_lines: array = attr.ib(factory=lambda: array("I"))
+    missing_lines: array = attr.ib(factory=lambda: array("I"))
+
+
+# pylint: disable=too-few-public-methods
+@attr.s(frozen=True)
+class CoverageData:
+    """The coverage of a run, in total and per source file"""
+
+    statements: int = attr.ib()
+    missing: int = attr.ib()
+    coverage: float = attr.ib()
+    """The unrounded percentage of covered statements"""
+    files: Dict[str, FileCoverage] = attr.ib(factory=dict)
+
+
+def display_percent(percent: float) -> float:
+    """
+    Rounds a coverage percentage like the TOTAL line of coverage.py's report.
+
+    The percentage is rounded to an integer, except that partial coverage is
+    never shown as 0% or 100%.
+
+    :param percent: The unrounded percentage
+    :return: The percentage as shown in the report
+    """
+    if 0 < percent < 1:
+        return 1.0
+    if 99 < percent < 100:
+        return 99.0
+    return float(round(percent))
+
+
+def coverage_report_command(path: str) -> str:
+    """
+    Gives the command that exports the coverage data of a run.
+
+    The command reads the `.coverage` data file in the working directory and
+    writes the JSON report of coverage.py, which needs at least version 5.0.
+
+    :param path: The path of the JSON report
+    :return: The shell command
+    """
+    return "coverage json -o {} > /dev/null 2>&1".format(shlex.quote(path))
+
+
+def read_coverage_report(path: str) -> Optional[CoverageData]:
+    """
+    Reads a JSON report of coverage.py.
+
+    :param path: The path of the JSON report
+    :return: The coverage data, None if the report is missing or malformed
+    """
+    try:
+        with open(path) as report_file:
+            report = json.load(report_file)
+        files = {name: _file_coverage(data) for name, data in report["files"].items()}
+        totals = report["totals"]
+        return CoverageData(
+            totals["num_statements"],
+            totals["missing_lines"],
+            float(totals["percent_covered"]),
+            files,
+        )
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def _file_coverage(data: Dict) -> FileCoverage:
+    summary = data["summary"]
+    return FileCoverage(
+        summary["num_statements"],
+        summary["missing_lines"],
+        float(summary["percent_covered"]),
+        array("I", data.get("executed_lines", [])),
+        array("I", data.get("missing_lines", [])),
+    )
@@ -0,0 +1,95 @@
+"""
+Test runner is a library for running unit tests on Python code.
+
+It offers the opinion to automatically detect the correct run settings for
+the tests and gives information about the test results and coverage information.
+
+Test-Runner is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Test-Runner is distributed in the hope that it will be useful
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Test-Runner.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import xml.etree.ElementTree as ElementTree
+from typing import Iterator, List, Optional
+
+import attr
+
+PASSED = "passed"
+FAILED = "failed"
+ERROR = "error"
+SKIPPED = "skipped"
+
+DEFAULT_MAX_MESSAGE_LENGTH = 1024
+
+# Child elements of a test case that determine its outcome, by priority
+_OUTCOME_TAGS = (("error", ERROR), ("failure", FAILED), ("skipped", SKIPPED))
+
+
+# pylint: disable=too-few-public-methods
+@attr.s(frozen=True)
+class TestCaseResult:
+    """The result of a single test case"""
+
+    __test__ = False
+
+    node_id: str = attr.ib()
+    outcome: str = attr.ib()
+    duration: float = attr.ib(default=0.0)
+    message: Optional[str] = attr.ib(default=None)
+
+
+def read_junit_xml(
+    path: str, max_message_length: int = DEFAULT_MAX_MESSAGE_LENGTH
+) -> Iterator[TestCaseResult]:
+    """
+    Reads the test cases from a JUnit-like XML file.
+
+    The file is parsed incrementally and every test case element is
+    discarded after it was read, thus the memory does not grow with the
+    number of test cases.
+
+    :param path: The path to the XML file, as written by pytest's
+    `--junitxml`, nose's xunit or nose2's junit-xml plugin
+    :param max_message_length: The maximum length of failure messages
+    :return: An iterator over the results of the test cases
+    """
+    parents: List[ElementTree.Element] = []
+    for event, element in ElementTree.iterparse(path, events=("start", "end")):
+        if event == "start":
+            parents.append(element)
+            continue
+        parents.pop()
+        if element.tag != "testcase":
+            continue
+        yield _test_case_result(element, max_message_length)
+        element.clear()
+        if parents:
+            parents[-1].remove(element)
+
+
+def _test_case_result(
+    element: ElementTree.Element, max_message_length: int
+) -> TestCaseResult:
+    name = element.get("name", "")
+    class_name = element.get("classname")
+    node_id = "{}::{}".format(class_name, name) if class_name else name
+    try:
+        duration = float(element.get("time", "0"))
+    except ValueError:
+        duration = 0.0
+    for tag, outcome in _OUTCOME_TAGS:
+        child = element.find(tag)
+        if child is not None:
+            message = child.get("message") or child.text or ""
+            return TestCaseResult(
+                node_id, outcome, duration, message[:max_message_length]
+            )
+    return TestCaseResult(node_id, PASSED, duration)
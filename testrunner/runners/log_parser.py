@@ -0,0 +1,220 @@
+"""
+Test runner is a library for running unit tests on Python code.
+
+It offers the opinion to automatically detect the correct run settings for
+the tests and gives information about the test results and coverage information.
+
+Test-Runner is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Test-Runner is distributed in the hope that it will be useful
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Test-Runner.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import mmap
+import re
+from typing import Any, Callable, Dict, Match, Optional, Pattern, Sequence, Union
+
+import attr
+from pytesting_utils import Preconditions
+
+from testrunner.environments.capture import CapturedOutput
+from testrunner.runners.abstract_runner import RunResult
+from testrunner.runners.measurements import ResourceMeasurements
+
+Value = Union[int, float]
+_Buffer = Union[str, bytes, mmap.mmap]
+
+_WINDOW_SIZE = 1024 * 1024
+
+
+def _compile(pattern: Union[str, Pattern[str]]) -> Pattern[str]:
+    return re.compile(pattern)
+
+
+# pylint: disable=too-few-public-methods
+@attr.s(frozen=True)
+class LogPattern:
+    """
+    A declarative pattern for a summary line of a log.
+
+    The named groups of the regular expression give the values extracted
+    from the line; groups named like a field of `RunResult` are converted to
+    the field's type, all others to int.  The literal `keyword` is part of
+    every matching line and used to skip the parts of the log that cannot
+    match.  If the pattern does not match, the optional `fallback` pattern
+    is tried.
+    """
+
+    keyword: str = attr.ib()
+    regex: Pattern[str] = attr.ib(converter=_compile)
+    fallback: Optional["LogPattern"] = attr.ib(default=None)
+
+    @keyword.validator
+    def _check_keyword(self, _, value: str) -> None:
+        Preconditions.check_argument(len(value) > 0, "The keyword must not be empty!")
+
+
+class LogParser:
+    """
+    Extracts the values of summary lines from a log.
+
+    The summary lines of the test tools are at the end of a log, hence each
+    pattern is searched backwards from the end of the log, in windows ending
+    at the last occurrence of its keyword.  The last line that matches wins,
+    and the first match within that line.  For truncated captured outputs,
+    patterns that do not match in the tail are searched in the
+    memory-mapped spill file.
+    """
+
+    def __init__(self, patterns: Sequence[LogPattern]) -> None:
+        """
+        Creates a new parser.
+
+        :param patterns: The patterns for the summary lines
+        """
+        self._patterns = list(patterns)
+
+    def parse(self, log: str) -> Dict[str, Value]:
+        """
+        Parses a log.
+
+        :param log: The log, which may be a `CapturedOutput`
+        :return: The values of the named groups of all matching patterns
+        """
+        values: Dict[str, Value] = {}
+        missing = self._parse_buffer(log, self._patterns, values)
+        spill_path = _spill_path(log)
+        if missing and spill_path is not None:
+            self._parse_mapped(spill_path, missing, values)
+        return values
+
+    def parse_file(self, path: str) -> Dict[str, Value]:
+        """
+        Parses a log file, which is memory mapped for that.
+
+        :param path: The path to the log file
+        :return: The values of the named groups of all matching patterns
+        """
+        values: Dict[str, Value] = {}
+        self._parse_mapped(path, self._patterns, values)
+        return values
+
+    def _parse_mapped(
+        self, path: str, patterns: Sequence[LogPattern], values: Dict[str, Value]
+    ) -> None:
+        with open(path, "rb") as log_file:
+            try:
+                buffer = mmap.mmap(log_file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty files cannot be mapped
+                return
+            with buffer:
+                self._parse_buffer(buffer, patterns, values)
+
+    @staticmethod
+    def _parse_buffer(
+        buffer: _Buffer, patterns: Sequence[LogPattern], values: Dict[str, Value]
+    ) -> Sequence[LogPattern]:
+        missing = []
+        for pattern in patterns:
+            current: Optional[LogPattern] = pattern
+            while current is not None:
+                match = _search_backwards(buffer, current)
+                if match is not None:
+                    values.update(_convert(match))
+                    break
+                current = current.fallback
+            else:
+                missing.append(pattern)
+        return missing
+
+
+def create_run_result(
+    values: Dict[str, Value],
+    runner: str,
+    resources: Optional[ResourceMeasurements] = None,
+) -> RunResult:
+    """
+    Creates a run result from parsed values.
+
+    :param values: The parsed values, values that do not belong to a field of
+    `RunResult` are ignored
+    :param runner: The name of the runner
+    :param resources: The resources of the run measured by runexec
+    :return: The run result, fields without a value keep their default
+    """
+    fields = {name: value for name, value in values.items() if name in _CONVERTERS}
+    return RunResult(runner=runner, resources=resources, **fields)  # type: ignore
+
+
+def count_passed(values: Dict[str, Value], ran: str, others: Sequence[str]) -> int:
+    """
+    Derives the number of passed tests from the number of run tests.
+
+    :param values: The parsed values
+    :param ran: The name of the value giving the number of run tests
+    :param others: The names of values for tests that did not pass
+    :return: The number of passed tests, -1 minus the others if the number
+    of run tests is unknown
+    """
+    passed = int(values.get(ran, -1))
+    for other in others:
+        passed -= int(values.get(other, 0))
+    return passed
+
+
+def _spill_path(log: str) -> Optional[str]:
+    if isinstance(log, CapturedOutput) and log.truncated:
+        return log.path
+    return None
+
+
+def _search_backwards(buffer: _Buffer, pattern: LogPattern) -> Optional[Match[str]]:
+    keyword: Any = pattern.keyword
+    newline: Any = "\n"
+    if not isinstance(buffer, str):
+        keyword = keyword.encode("utf-8")
+        newline = b"\n"
+    end = len(buffer)
+    while end > 0:
+        position = buffer.rfind(keyword, 0, end)
+        if position < 0:
+            return None
+        stop = buffer.find(newline, position)
+        if stop < 0:
+            stop = len(buffer)
+        start = buffer.rfind(newline, 0, max(0, position - _WINDOW_SIZE)) + 1
+        window = buffer[start:stop]
+        if not isinstance(window, str):
+            window = window.decode("utf-8", "replace")
+        match = None
+        for match in pattern.regex.finditer(window):
+            pass
+        if match is not None:
+            # Of several matches in the last matching line the first one wins
+            line_start = window.rfind("\n", 0, match.start()) + 1
+            return pattern.regex.search(window, line_start)
+        end = start
+    return None
+
+
+def _convert(match: Match[str]) -> Dict[str, Value]:
+    values: Dict[str, Value] = {}
+    for name, text in match.groupdict().items():
+        if text is not None:
+            values[name] = _CONVERTERS.get(name, int)(text)
+    return values
+
+
+_CONVERTERS: Dict[str, Callable[[str], Value]] = {
+    field.name: field.type
+    for field in attr.fields(RunResult)
+    if field.type in (int, float)
+}
@@ -0,0 +1,156 @@
+"""
+Test runner is a library for running unit tests on Python code.
+
+It offers the opinion to automatically detect the correct run settings for
+the tests and gives information about the test results and coverage information.
+
+Test-Runner is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Test-Runner is distributed in the hope that it will be useful
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Test-Runner.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import re
+from enum import Enum, auto
+from typing import Dict, IO, Iterable, Iterator, Optional
+
+import attr
+
+# A measurement line of runexec, e.g., "cputime=1.234s" or "memory=4096B"
+_MEASUREMENT = re.compile(r"^([a-z-]+)=(\S*)$")
+_UNITS = re.compile(r"(s|B)$")
+_FIELDS = {
+    "walltime": "walltime",
+    "cputime": "cputime",
+    "memory": "memory",
+    "blkio-read": "blkio_read",
+    "blkio-write": "blkio_write",
+    "returnvalue": "return_value",
+    "exitcode": "return_value",
+    "terminationreason": "termination_reason",
+}
+
+
+class RunStatus(Enum):
+    """The outcomes of a run with respect to its resource limits"""
+
+    COMPLETED = auto()
+    """The test command terminated by itself, whether the tests passed or not."""
+
+    TIMEOUT = auto()
+    """The test command was killed as it exceeded its CPU or wall time limit."""
+
+    OUT_OF_MEMORY = auto()
+    """The test command was killed as it exceeded its memory limit."""
+
+    FILES_LIMIT = auto()
+    """The test command was killed as it wrote too many or too large files."""
+
+    KILLED = auto()
+    """The test command was killed for another reason, e.g., by a signal."""
+
+
+_STATUSES = {
+    "cputime": RunStatus.TIMEOUT,
+    "cputime-soft": RunStatus.TIMEOUT,
+    "walltime": RunStatus.TIMEOUT,
+    "memory": RunStatus.OUT_OF_MEMORY,
+    "files-count": RunStatus.FILES_LIMIT,
+    "files-size": RunStatus.FILES_LIMIT,
+}
+
+
+# pylint: disable=too-few-public-methods,too-many-instance-attributes
+@attr.s(frozen=True)
+class ResourceMeasurements:
+    """The resources a run used, as measured by runexec"""
+
+    walltime: float = attr.ib(default=-1.0)
+    """The wall time in seconds"""
+    cputime: float = attr.ib(default=-1.0)
+    """The CPU time in seconds"""
+    memory: int = attr.ib(default=-1)
+    """The peak memory in bytes"""
+    blkio_read: int = attr.ib(default=-1)
+    """The bytes read from block devices"""
+    blkio_write: int = attr.ib(default=-1)
+    """The bytes written to block devices"""
+    return_value: int = attr.ib(default=-1)
+    """The raw exit status of the test command"""
+    termination_reason: Optional[str] = attr.ib(default=None)
+    """Why runexec stopped the test command, None if it terminated normally"""
+
+    @property
+    def status(self) -> RunStatus:
+        """Gives the outcome of the run with respect to its resource limits"""
+        if self.termination_reason is None:
+            return RunStatus.COMPLETED
+        return _STATUSES.get(self.termination_reason, RunStatus.KILLED)
+
+
+def parse_measurements(lines: Iterable[str]) -> Optional[ResourceMeasurements]:
+    """
+    Parses the measurements runexec prints after running a command.
+
+    If several runexec processes ran, e.g., the shards of a run, the wall
+    time and the return value are the maxima of their values, while the CPU
+    time, the memory peaks and the block I/O are summed, as the processes
+    ran in parallel.  The first termination reason is kept.
+
+    :param lines: The lines of the standard output, other lines are ignored
+    :return: The measurements, None if runexec did not report any
+    """
+    values: Dict[str, float] = {}
+    termination_reason = None
+    for line in lines:
+        match = _MEASUREMENT.match(line.strip())
+        if match is None or match.group(1) not in _FIELDS:
+            continue
+        field = _FIELDS[match.group(1)]
+        if field == "termination_reason":
+            termination_reason = termination_reason or match.group(2)
+            continue
+        try:
+            value = float(_UNITS.sub("", match.group(2)))
+        except ValueError:
+            continue
+        if field in ("walltime", "return_value"):
+            values[field] = max(value, values.get(field, value))
+        else:
+            values[field] = value + values.get(field, 0)
+    if not values and termination_reason is None:
+        return None
+    return ResourceMeasurements(
+        walltime=values.get("walltime", -1.0),
+        cputime=values.get("cputime", -1.0),
+        memory=int(values.get("memory", -1)),
+        blkio_read=int(values.get("blkio_read", -1)),
+        blkio_write=int(values.get("blkio_write", -1)),
+        return_value=int(values.get("return_value", -1)),
+        termination_reason=termination_reason,
+    )
+
+
+def read_measurements(output: IO[bytes]) -> Optional[ResourceMeasurements]:
+    """
+    Parses the runexec measurements from a captured standard output.
+
+    :param output: The binary file of the output, it is read from its start
+    :return: The measurements, None if runexec did not report any
+    """
+    output.seek(0)
+    return parse_measurements(_decoded_lines(output))
+
+
+def _decoded_lines(output: IO[bytes]) -> Iterator[str]:
+    for line in output:
+        # Measurement lines are short, longer lines are skipped undecoded
+        if len(line) < 128 and b"=" in line:
+            yield line.decode("utf-8", "replace")
@@ -17,104 +17,70 @@ GNU Lesser General Public License for more details.
 You should have received a copy of the GNU Lesser General Public License
 along with Test-Runner.  If not, see <https://www.gnu.org/licenses/>.
 """
-import os
-import re
-
-from pytesting_utils import virtualenv
+import shlex
+from typing import List
 
 from testrunner.runners.abstract_runner import AbstractRunner, RunResult
+from testrunner.runners.coverage_report import coverage_report_command
+from testrunner.runners.log_parser import (
+    LogParser,
+    LogPattern,
+    count_passed,
+    create_run_result,
+)
 
 
 class Nose2Runner(AbstractRunner):
     """Adds a runner for the nose2 test-running tool"""
 
-    def __init__(self, project_name: str, path: str, time_limit: int = 0,) -> None:
-        super().__init__(project_name, path)
-        self._time_limit = time_limit
-
-    def run(self):
-
-        with virtualenv(self._project_name) as env:
-            old_dir = os.getcwd()
-            os.chdir(self._path)
-
-            packages = self._extract_necessary_packages()
-            env.add_packages_for_installation(packages)
-            env.add_package_for_installation("nose2")
-            env.add_package_for_installation("nose2[coverage_plugin]>=0.6.5")
-            env.add_package_for_installation("benchexec")
-
-            if self._time_limit > 0:
-                command = "runexec --timelimit={}s -- ".format(self._time_limit)
-            else:
-                command = "runexec -- "
-            command += "nose2 --with-coverage --verbose"
-            out, err = env.run_commands([command])
-            if os.path.exists(
-                os.path.join(os.getcwd(), "output.log")
-            ) and os.path.isfile(os.path.join(os.getcwd(), "output.log")):
-                with open(os.path.join(os.getcwd(), "output.log")) as out_file:
-                    out += "\n".join(out_file.readlines())
-
-            os.chdir(old_dir)
-            return out, err
-
-    def get_run_result(self, log: str) -> RunResult:
-        statements = -1
-        missing = -1
-        coverage = -1.0
-        failed = -1
-        passed = -1
-        skipped = -1
-        warnings = -1
-        error = -1
-        time = -1.0
-
-        matches = re.search(r"Ran ([0-9]+) tests in ([0-9.]+)s", log)
-
-        if matches:
-            ran = int(matches.group(1)) if matches.group(1) else 0
-            time = float(matches.group(2)) if matches.group(2) else 0.0
-            passed = ran
-
-        matches = re.search(r"failures=([0-9]+)", log)
-        if matches:
-            failed = int(matches.group(1)) if matches.group(1) else 0
-            passed -= failed
-
-        matches = re.search(r"errors=([0-9]+)", log)
-        if matches:
-            error = int(matches.group(1)) if matches.group(1) else 0
-            passed -= error
-
-        matches = re.search(r"skipped=([0-9]+)", log)
-        if matches:
-            skipped = int(matches.group(1)) if matches.group(1) else 0
-            passed -= skipped
-
-        matches = re.search(r"unexpected successes=([0-9]+)", log)
-        if matches:
-            unexp_successes = int(matches.group(1)) if matches.group(1) else 0
-            passed -= unexp_successes
-
-        matches = re.search(
-            r"TOTAL\s+" r"([0-9]+)\s+" r"([0-9]+)\s +" r"([0-9]+%)+", log
+    def _tooling_packages(self) -> List[str]:
+        if not self._measures_coverage():
+            return ["nose2", "benchexec"]
+        return ["nose2", "nose2[coverage_plugin]>=0.6.5", "benchexec"]
+
+    def _after_test_commands(self) -> List[str]:
+        if not self._measures_coverage():
+            return []
+        return [coverage_report_command(self._coverage_report_path())]
+
+    def _test_command(self) -> str:
+        command = "nose2"
+        if self._measures_coverage():
+            command += " --with-coverage"
+        command += " --verbose --junit-xml --junit-xml-path={}".format(
+            shlex.quote(self._junit_xml_path())
         )
-        if matches:
-            statements = int(matches.group(1)) if matches.group(1) else 0
-            missing = int(matches.group(2)) if matches.group(1) else 0
-            coverage = float(matches.group(3)[:-1]) if matches.group(3) else 0.0
+        if self._test_modules is not None:
+            # nose2 takes the dotted names of test modules, not their paths
+            for path in self._test_modules:
+                command += " " + shlex.quote(path[: -len(".py")].replace("/", "."))
+        return command
 
-        result = RunResult(
-            statements=statements,
-            missing=missing,
-            coverage=coverage,
-            failed=failed,
-            passed=passed,
-            skipped=skipped,
-            warnings=warnings,
-            error=error,
-            time=time,
-            runner="nose2",
-        )
-        return result
+    def get_run_result(self, log: str) -> RunResult:
+        values = _LOG_PARSER.parse(log)
+        values["passed"] = count_passed(values, "ran", _NOT_PASSED)
+        values.update(self._coverage_values())
+        return create_run_result(values, "nose2", self._resource_measurements)
+
+
+_NOT_PASSED = ("failed", "error", "skipped", "unexpected_successes")
+
+_LOG_PARSER = LogParser(
+    [
+        LogPattern("Ran ", r"Ran (?P<ran>[0-9]+) tests in (?P<time>[0-9.]+)s"),
+        LogPattern("failures=", r"failures=(?P<failed>[0-9]+)"),
+        LogPattern("errors=", r"errors=(?P<error>[0-9]+)"),
+        LogPattern("skipped=", r"skipped=(?P<skipped>[0-9]+)"),
+        LogPattern(
+            "unexpected successes=",
+            r"unexpected successes=(?P<unexpected_successes>[0-9]+)",
+        ),
+        LogPattern(
+            "TOTAL",
+            r"TOTAL\s+"
+            r"(?P<statements>[0-9]+)\s+"
+            r"(?P<missing>[0-9]+)\s+"
+            r"(?P<coverage>[0-9]+)%",
+        ),
+    ]
+)
@@ -0,0 +1,128 @@
+"""
+Test runner is a library for running unit tests on Python code.
+
+It offers the opinion to automatically detect the correct run settings for
+the tests and gives information about the test results and coverage information.
+
+Test-Runner is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Test-Runner is distributed in the hope that it will be useful
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Test-Runner.  If not, see <https://www.gnu.org/licenses/>.
+
+This module is a pytest plugin that is copied into the venv of a run.  It
+must therefore only depend on the standard library and pytest.
+"""
+
+import json
+import time
+
+RESULTS_OPTION = "--testrunner-results"
+COLLECT_OPTION = "--testrunner-collect"
+SELECT_OPTION = "--testrunner-select"
+
+# The outcome categories of pytest's terminal summary
+_CATEGORIES = ("passed", "failed", "skipped", "error", "xfailed", "xpassed")
+
+
+def pytest_addoption(parser):
+    """Adds the option for the path of the results file"""
+    parser.addoption(
+        RESULTS_OPTION,
+        dest="testrunner_results",
+        default=None,
+        help="Write the test outcomes as JSON lines to the given file",
+    )
+    parser.addoption(
+        COLLECT_OPTION,
+        dest="testrunner_collect",
+        default=None,
+        help="Write the ids of the collected tests to the given file",
+    )
+    parser.addoption(
+        SELECT_OPTION,
+        dest="testrunner_select",
+        default=None,
+        help="Only run the tests whose ids are listed in the given file",
+    )
+
+
+def pytest_configure(config):
+    """Registers the result writer if a results file was requested"""
+    path = config.getoption("testrunner_results")
+    if path:
+        config.pluginmanager.register(ResultWriter(config, path), "testrunner-results")
+
+
+def pytest_collection_modifyitems(config, items):
+    """Deselects the tests that are not listed in the selection file"""
+    path = config.getoption("testrunner_select")
+    if not path:
+        return
+    with open(path) as selection:
+        selected = set(line.rstrip("\n") for line in selection)
+    deselected = [item for item in items if item.nodeid not in selected]
+    if deselected:
+        config.hook.pytest_deselected(items=deselected)
+        items[:] = [item for item in items if item.nodeid in selected]
+
+
+def pytest_collection_finish(session):
+    """Writes the ids of the collected tests if a file was requested"""
+    path = session.config.getoption("testrunner_collect")
+    if path:
+        with open(path, "w") as collected:
+            for item in session.items:
+                collected.write(item.nodeid + "\n")
+
+
+class ResultWriter:
+    """Writes a JSON line per test phase and one for the session summary"""
+
+    def __init__(self, config, path):
+        self._config = config
+        self._file = open(path, "w", buffering=1)
+        self._start = time.time()
+
+    def _write(self, record):
+        self._file.write(json.dumps(record, sort_keys=True) + "\n")
+
+    def pytest_runtest_logreport(self, report):
+        """Writes the outcome of a test phase"""
+        if report.when != "call" and report.passed:
+            return
+        self._write(
+            {
+                "type": "test",
+                "nodeid": report.nodeid,
+                "when": report.when,
+                "outcome": _outcome(report),
+                "duration": report.duration,
+            }
+        )
+
+    def pytest_sessionfinish(self, session, exitstatus):
+        """Writes the session summary and closes the results file"""
+        summary = {"type": "summary", "exitstatus": int(exitstatus)}
+        summary["duration"] = time.time() - self._start
+        reporter = self._config.pluginmanager.get_plugin("terminalreporter")
+        stats = getattr(reporter, "stats", {})
+        for category in _CATEGORIES + ("warnings",):
+            summary[category] = len(stats.get(category, []))
+        self._write(summary)
+        self._file.close()
+
+
+def _outcome(report):
+    if hasattr(report, "wasxfail"):
+        return "xpassed" if report.passed else "xfailed"
+    if report.when != "call" and report.failed:
+        return "error"
+    return report.outcome
@@ -17,14 +17,49 @@ GNU Lesser General Public License for more details.
 You should have received a copy of the GNU Lesser General Public License
 along with Test-Runner.  If not, see <https://www.gnu.org/licenses/>.
 """
+import json
 import os
-import re
-from typing import Union, Optional, Tuple
+import shlex
+import shutil
+import xml.etree.ElementTree as ElementTree
+from typing import Any, Dict, List, Mapping, Optional, Union
 
-from pytesting_utils import virtualenv
 from setuptools import find_packages  # type: ignore
 
+from testrunner.environments.managed_environment import ManagedEnvironment
 from testrunner.runners.abstract_runner import AbstractRunner, RunResult
+from testrunner.runners.coverage_contexts import (
+    COVERAGE_DATA_FILE,
+    CoverageContextIndex,
+    read_coverage_contexts,
+)
+from testrunner.runners.coverage_report import coverage_report_command
+from testrunner.runners.log_parser import (
+    LogParser,
+    LogPattern,
+    Value,
+    create_run_result,
+)
+from testrunner.runners.pytest_results_plugin import (
+    COLLECT_OPTION,
+    RESULTS_OPTION,
+    SELECT_OPTION,
+)
+from testrunner.runners.sharding import (
+    ShardPlan,
+    merge_junit_xml,
+    merge_results_files,
+    plan_shards,
+    recorded_durations,
+)
+
+RESULTS_FILE = ".testrunner-results.jsonl"
+COLLECTED_FILE = ".testrunner-collected.txt"
+
+_PLUGIN_MODULE = "testrunner_pytest_results"
+_PLUGIN_SOURCE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "pytest_results_plugin.py"
+)
 
 
 class PyTestRunner(AbstractRunner):
@@ -36,132 +71,315 @@ class PyTestRunner(AbstractRunner):
         project_name: str,
         path: str,
         time_limit: int = 0,
-        junit_xml_file: Union[str, os.PathLike] = None,
-        venv_path: Union[bytes, str, os.PathLike] = None,
+        junit_xml_file: Optional[Union[str, os.PathLike]] = None,
+        venv_path: Optional[Union[bytes, str, os.PathLike]] = None,
+        *,
+        coverage_contexts: bool = False,
+        **kwargs: Any,
     ) -> None:
-        super().__init__(project_name, path)
-        self._time_limit = time_limit
-        self._junit_xml_file = junit_xml_file
-        self._venv_path = venv_path
+        """
+        Creates a new pytest runner.
 
-    def run(self) -> Optional[Tuple[str, str]]:
-        # TODO make sure nothing goes wrong here
+        :param coverage_contexts: Whether the coverage is recorded per test,
+        see `get_coverage_contexts`; the other parameters are the ones of
+        `AbstractRunner`
+        """
+        super().__init__(
+            project_name,
+            path,
+            time_limit,
+            venv_path=venv_path,
+            junit_xml_file=junit_xml_file,
+            **kwargs,
+        )
+        self._shard_plan: Optional[ShardPlan] = None
+        self._coverage_contexts = coverage_contexts
 
-        with virtualenv(self._project_name, self._venv_path) as env:
-            old_dir = os.getcwd()
-            os.chdir(self._path)
+    def _prepare_run(self, env: ManagedEnvironment) -> None:
+        durations = self._test_durations
+        if self._shards > 1 and durations is None:
+            durations = self._previous_durations()
+        super()._prepare_run(env)
+        if os.path.isfile(self._results_file()):
+            os.remove(self._results_file())
+        shutil.copyfile(
+            _PLUGIN_SOURCE,
+            os.path.join(env.get_site_packages_dir(), _PLUGIN_MODULE + ".py"),
+        )
+        self._shard_plan = None
+        if self._shards > 1:
+            self._plan_shards(env, durations or {})
 
-            if "-" in self._project_name and os.path.exists(
-                os.path.join(os.getcwd(), self._project_name.replace("-", ""))
-            ):
-                project_name = self._project_name.replace("-", "")
-            elif "_" in self._project_name and os.path.exists(
-                os.path.join(os.getcwd(), self._project_name.replace("_", ""))
-            ):
-                project_name = self._project_name.replace("_", "")
-            elif "-" in self._project_name and os.path.exists(
-                os.path.join(os.getcwd(), self._project_name.replace("-", "_"))
-            ):
-                project_name = self._project_name.replace("-", "_")
-            elif os.path.exists(os.path.join(os.getcwd(), self._project_name)):
-                project_name = self._project_name
-            else:
-                directories = find_packages(".", exclude=["test", "tests"])
-                if len(directories) == 0 and os.path.exists(
-                    os.path.join(os.getcwd(), "src")
-                ):
-                    directories = find_packages("src", exclude=["test", "tests"])
-                project_name = directories[0] if len(directories) > 1 else "."
-
-            packages = self._extract_necessary_packages()
-            env.add_packages_for_installation(packages)
-            env.add_package_for_installation("pytest")
-            env.add_package_for_installation("pytest-cov")
-            env.add_package_for_installation("benchexec==1.22")
-
-            if self._time_limit > 0:
-                command = "runexec --no-container --timelimit={}s -- ".format(
-                    self._time_limit
+    def _previous_durations(self) -> Dict[str, float]:
+        """Reads the durations of the previous run before they are removed"""
+        try:
+            return recorded_durations(self.get_test_results())
+        except (OSError, ElementTree.ParseError):
+            return {}
+
+    def _plan_shards(
+        self, env: ManagedEnvironment, durations: Mapping[str, float]
+    ) -> None:
+        """Collects the tests and writes the selection file of each shard"""
+        collected = os.path.join(os.path.abspath(self._path), COLLECTED_FILE)
+        env.run_commands(
+            [
+                "pytest --collect-only -q -p {} {}={}{} > /dev/null 2>&1".format(
+                    _PLUGIN_MODULE,
+                    COLLECT_OPTION,
+                    shlex.quote(collected),
+                    self._selected_modules(),
                 )
-            else:
-                command = "runexec --no-container -- "
-            command += "pytest --cov={} --cov-report=term-missing".format(project_name)
-            if self._junit_xml_file is not None:
-                command += " --junitxml={}".format(self._junit_xml_file)
-
-            out, err = env.run_commands([command])
-            if os.path.exists(
-                os.path.join(os.getcwd(), "output.log")
-            ) and os.path.isfile(os.path.join(os.getcwd(), "output.log")):
-                with open(os.path.join(os.getcwd(), "output.log")) as out_file:
-                    out += "\n".join(out_file.readlines())
-            os.chdir(old_dir)
-            return out, err
+            ],
+            cwd=self._path,
+        )
+        if not os.path.isfile(collected):
+            return
+        with open(collected) as collected_file:
+            node_ids = [line.rstrip("\n") for line in collected_file if line.strip()]
+        os.remove(collected)
+        plan = plan_shards(node_ids, self._shards, durations)
+        if len(plan.shards) < 2:
+            return
+        for index, shard in enumerate(plan.shards):
+            with open(self._shard_file(index, ".txt"), "w") as selection:
+                selection.writelines(node_id + "\n" for node_id in shard)
+        self._shard_plan = plan
 
-    def get_run_result(self, log: str) -> RunResult:
-        statements = -1
-        missing = -1
-        coverage = -1.0
-        failed = -1
-        passed = -1
-        skipped = -1
-        warnings = -1
-        error = -1
-        time = -1.0
-
-        matches = re.search(
-            r"[=]+ (([0-9]+) failed, )?"
-            r"([0-9]+) passed"
-            r"(, ([0-9]+) skipped)?"
-            r"(, ([0-9]+) warnings)?"
-            r"(, ([0-9]+) error)?"
-            r" in ([0-9.]+) seconds",
-            log,
+    def get_shard_plan(self) -> Optional[ShardPlan]:
+        return self._shard_plan
+
+    def _shard_file(self, index: int, suffix: str) -> str:
+        return os.path.join(
+            os.path.abspath(self._path), ".testrunner-shard-{}{}".format(index, suffix)
         )
-        if matches:
-            failed = int(matches.group(2)) if matches.group(2) else 0
-            passed = int(matches.group(3)) if matches.group(3) else 0
-            skipped = int(matches.group(5)) if matches.group(5) else 0
-            warnings = int(matches.group(7)) if matches.group(7) else 0
-            error = int(matches.group(9)) if matches.group(9) else 0
-            time = float(matches.group(10)) if matches.group(10) else 0.0
-
-        matches = re.search(
-            r"TOTAL\s+"
-            r"([0-9]+)\s+"
-            r"([0-9]+)\s+"
-            r"(([0-9]+)\s+([0-9]+)\s+)?"
-            r"([0-9]+%)",
-            log,
+
+    def _shard_coverage_file(self, index: int) -> str:
+        return os.path.join(
+            os.path.abspath(self._path), ".coverage.testrunner-shard-{}".format(index)
         )
-        if matches:
-            statements = int(matches.group(1)) if matches.group(1) else 0
-            missing = int(matches.group(2)) if matches.group(2) else 0
-            coverage = float(matches.group(6)[:-1]) if matches.group(6) else 0.0
-        else:
-            matches = re.search(
-                r".py\s+"
-                r"([0-9]+)\s+"
-                r"([0-9]+)\s+"
-                r"(([0-9]+)\s+([0-9]+)\s+)?"
-                r"([0-9]+%)",
-                log,
+
+    def _run_commands(self) -> List[str]:
+        if self._shard_plan is None:
+            return super()._run_commands()
+        shards = range(len(self._shard_plan.shards))
+        commands = [
+            "{} &".format(
+                self._runexec_command(
+                    self._shard_test_command(index),
+                    "--output={}".format(shlex.quote(self._shard_file(index, ".log"))),
+                    share=(index, len(shards)),
+                )
+            )
+            for index in shards
+        ]
+        commands.append("wait")
+        commands.append(
+            "cat {} > output.log".format(
+                " ".join(
+                    shlex.quote(self._shard_file(index, ".log")) for index in shards
+                )
+            )
+        )
+        if self._measures_coverage():
+            commands.append(
+                "coverage combine {} > /dev/null 2>&1".format(
+                    " ".join(
+                        shlex.quote(self._shard_coverage_file(index))
+                        for index in shards
+                    )
+                )
+            )
+        return commands + self._after_test_commands()
+
+    def _shard_test_command(self, index: int) -> str:
+        command = ""
+        if self._measures_coverage():
+            command = "env COVERAGE_FILE={} ".format(
+                shlex.quote(self._shard_coverage_file(index))
+            )
+        command += self._pytest_command(
+            self._shard_file(index, ".xml"), self._shard_file(index, ".jsonl")
+        )
+        return command + " {}={}".format(
+            SELECT_OPTION, shlex.quote(self._shard_file(index, ".txt"))
+        )
+
+    def _finish_run(self) -> None:
+        """Merges the results and JUnit-like XML files of the shards"""
+        if self._shard_plan is None:
+            return
+        shards = range(len(self._shard_plan.shards))
+        self._shard_plan.actual = [
+            float(
+                read_results_summary(self._shard_file(index, ".jsonl")).get("time", -1)
             )
-            if matches:
-                statements = int(matches.group(1)) if matches.group(1) else 0
-                missing = int(matches.group(2)) if matches.group(2) else 0
-                coverage = float(matches.group(6)[:-1]) if matches.group(6) else 0.0
-
-        result = RunResult(
-            statements=statements,
-            missing=missing,
-            coverage=coverage,
-            failed=failed,
-            passed=passed,
-            skipped=skipped,
-            warnings=warnings,
-            error=error,
-            time=time,
-            runner="pytest",
+            for index in shards
+        ]
+        merge_results_files(
+            [self._shard_file(index, ".jsonl") for index in shards],
+            self._results_file(),
+        )
+        merge_junit_xml(
+            [self._shard_file(index, ".xml") for index in shards],
+            self._junit_xml_path(),
+        )
+        for index in shards:
+            for suffix in (".txt", ".log", ".jsonl", ".xml"):
+                if os.path.isfile(self._shard_file(index, suffix)):
+                    os.remove(self._shard_file(index, suffix))
+
+    def _results_file(self) -> str:
+        return os.path.join(os.path.abspath(self._path), RESULTS_FILE)
+
+    def _tooling_packages(self) -> List[str]:
+        if not self._measures_coverage():
+            return ["pytest", "benchexec==1.22"]
+        return ["pytest", "pytest-cov", "benchexec==1.22"]
+
+    def _after_test_commands(self) -> List[str]:
+        if not self._measures_coverage():
+            return []
+        return [coverage_report_command(self._coverage_report_path())]
+
+    def _runexec_options(self) -> List[str]:
+        return ["--no-container"]
+
+    def _test_command(self) -> str:
+        return self._pytest_command(self._junit_xml_path(), self._results_file())
+
+    def _pytest_command(self, junit_xml: str, results_file: str) -> str:
+        command = "pytest"
+        if self._measures_coverage():
+            command += " --cov={} --cov-report=".format(self._coverage_source())
+            if self._coverage_contexts:
+                command += " --cov-context=test"
+        command += " --junitxml={}".format(shlex.quote(junit_xml))
+        command += " -p {} {}={}".format(
+            _PLUGIN_MODULE, RESULTS_OPTION, shlex.quote(results_file)
         )
-        return result
+        return command + self._selected_modules()
+
+    def _coverage_source(self) -> str:
+        if "-" in self._project_name and os.path.exists(
+            os.path.join(self._path, self._project_name.replace("-", ""))
+        ):
+            project_name = self._project_name.replace("-", "")
+        elif "_" in self._project_name and os.path.exists(
+            os.path.join(self._path, self._project_name.replace("_", ""))
+        ):
+            project_name = self._project_name.replace("_", "")
+        elif "-" in self._project_name and os.path.exists(
+            os.path.join(self._path, self._project_name.replace("-", "_"))
+        ):
+            project_name = self._project_name.replace("-", "_")
+        elif os.path.exists(os.path.join(self._path, self._project_name)):
+            project_name = self._project_name
+        else:
+            directories = find_packages(self._path, exclude=["test", "tests"])
+            if len(directories) == 0 and os.path.exists(
+                os.path.join(self._path, "src")
+            ):
+                directories = find_packages(
+                    os.path.join(self._path, "src"), exclude=["test", "tests"]
+                )
+            project_name = directories[0] if len(directories) > 1 else "."
+        return project_name
+
+    def get_coverage_contexts(self) -> Optional[CoverageContextIndex]:
+        """
+        Reads the lines each test of the last run covered.
+
+        :return: The index from covered lines to the tests, None if the run
+        did not record the coverage per test
+        """
+        data_file = os.path.join(os.path.abspath(self._path), COVERAGE_DATA_FILE)
+        if not self._coverage_contexts or not os.path.isfile(data_file):
+            return None
+        return read_coverage_contexts(data_file, self._path)
+
+    def get_run_result(self, log: str) -> RunResult:
+        """
+        Generates a run result for a log string.
+
+        The test counts and the time are taken from the results file written
+        by the injected plugin during the last run, if it is complete; the
+        log is only scraped for them otherwise.  The coverage values are
+        taken from the coverage report, or from the log without a report.
+
+        :param log: The output of the run
+        :return: The run result
+        """
+        values = read_results_summary(self._results_file())
+        if not values:
+            values = _SUMMARY_PARSER.parse(log)
+            if "passed" in values:
+                for name in ("failed", "skipped", "warnings", "error"):
+                    values.setdefault(name, 0)
+        values.update(self._coverage_values() or _COVERAGE_PARSER.parse(log))
+        return create_run_result(values, "pytest", self._resource_measurements)
+
+
+def read_results_summary(path: str) -> Dict[str, Value]:
+    """
+    Reads the session summary from a results file of the injected plugin.
+
+    :param path: The path to the results file
+    :return: The test counts and the time as values for a `RunResult`, where
+    xpassed tests count as passed and xfailed as skipped; empty if the file
+    does not exist or is incomplete
+    """
+    summary = None
+    try:
+        with open(path) as results:
+            for line in results:
+                if '"type": "summary"' in line:
+                    summary = json.loads(line)
+    except (OSError, ValueError):
+        return {}
+    if summary is None:
+        return {}
+    return {
+        "passed": summary["passed"] + summary["xpassed"],
+        "failed": summary["failed"],
+        "skipped": summary["skipped"] + summary["xfailed"],
+        "warnings": summary["warnings"],
+        "error": summary["error"],
+        "time": summary["duration"],
+    }
+
+
+_SUMMARY_PARSER = LogParser(
+    [
+        LogPattern(
+            " passed",
+            r"[=]+ ((?P<failed>[0-9]+) failed, )?"
+            r"(?P<passed>[0-9]+) passed"
+            r"(, (?P<skipped>[0-9]+) skipped)?"
+            r"(, (?P<warnings>[0-9]+) warnings)?"
+            r"(, (?P<error>[0-9]+) error)?"
+            r" in (?P<time>[0-9.]+) seconds",
+        )
+    ]
+)
+
+_COVERAGE_PARSER = LogParser(
+    [
+        LogPattern(
+            "TOTAL",
+            r"TOTAL\s+"
+            r"(?P<statements>[0-9]+)\s+"
+            r"(?P<missing>[0-9]+)\s+"
+            r"([0-9]+\s+[0-9]+\s+)?"
+            r"(?P<coverage>[0-9]+)%",
+            fallback=LogPattern(
+                ".py",
+                r"\.py\s+"
+                r"(?P<statements>[0-9]+)\s+"
+                r"(?P<missing>[0-9]+)\s+"
+                r"([0-9]+\s+[0-9]+\s+)?"
+                r"(?P<coverage>[0-9]+)%",
+            ),
+        ),
+    ]
+)
@@ -0,0 +1,294 @@
+"""
+Test runner is a library for running unit tests on Python code.
+
+It offers the opinion to automatically detect the correct run settings for
+the tests and gives information about the test results and coverage information.
+
+Test-Runner is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Test-Runner is distributed in the hope that it will be useful
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Test-Runner.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import heapq
+import mmap
+import struct
+import sys
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import attr
+from pytesting_utils import IllegalStateException, Preconditions
+
+from testrunner.runners.junit_reader import (
+    ERROR,
+    FAILED,
+    PASSED,
+    SKIPPED,
+    TestCaseResult,
+)
+
+OUTCOMES = (PASSED, FAILED, ERROR, SKIPPED)
+
+_OUTCOME_CODES = {outcome: code for code, outcome in enumerate(OUTCOMES)}
+_MAGIC = b"TRSTORE1"
+# Magic, byte order, number of rows, number of ids, size of the string buffer
+_HEADER = struct.Struct("=8sB7xQQQ")
+_ALIGNMENT = 8
+
+
+# pylint: disable=too-few-public-methods
+@attr.s(frozen=True)
+class ModuleTotals:
+    """The aggregated results of the test cases of a module"""
+
+    tests: int = attr.ib()
+    duration: float = attr.ib()
+    outcomes: Dict[str, int] = attr.ib()
+
+
+class TestResultStore:
+    """
+    A compact, column-oriented container for the results of test cases.
+
+    The test ids are interned in a shared string buffer that is indexed by
+    an offsets table.  Each result is a row of an id index, an outcome code
+    (uint8) and a duration (float32).  A store can be saved to a file and
+    loaded back memory mapped without copying the columns; loaded stores are
+    read only.
+    """
+
+    __test__ = False
+
+    def __init__(self) -> None:
+        """Creates a new, empty store"""
+        self._id_offsets: Sequence[int] = array("Q", [0])
+        self._strings: Sequence[int] = bytearray()
+        self._id_index: Sequence[int] = array("I")
+        self._outcomes: Sequence[int] = array("B")
+        self._durations: Sequence[float] = array("f")
+        self._interned: Optional[Dict[str, int]] = {}
+        self._mapped: Optional[mmap.mmap] = None
+
+    @classmethod
+    def from_results(cls, results: Iterable[TestCaseResult]) -> "TestResultStore":
+        """
+        Creates a store from test case results.
+
+        :param results: The test case results, e.g., from `read_junit_xml`
+        :return: A store holding the results
+        """
+        store = cls()
+        for result in results:
+            store.add(result.node_id, result.outcome, result.duration)
+        return store
+
+    def add(self, node_id: str, outcome: str, duration: float) -> None:
+        """
+        Adds the result of a test case.
+
+        :param node_id: The id of the test case
+        :param outcome: The outcome, one of `OUTCOMES`
+        :param duration: The duration in seconds
+        """
+        if self._interned is None:
+            raise IllegalStateException("Cannot add results to a loaded store!")
+        Preconditions.check_argument(
+            outcome in _OUTCOME_CODES, "Unknown outcome {}!".format(outcome)
+        )
+        index = self._interned.get(node_id)
+        if index is None:
+            index = len(self._interned)
+            self._interned[node_id] = index
+            self._strings.extend(node_id.encode("utf-8"))  # type: ignore
+            self._id_offsets.append(len(self._strings))  # type: ignore
+        self._id_index.append(index)  # type: ignore
+        self._outcomes.append(_OUTCOME_CODES[outcome])  # type: ignore
+        self._durations.append(duration)  # type: ignore
+
+    def __len__(self) -> int:
+        return len(self._outcomes)
+
+    def __iter__(self) -> Iterator[TestCaseResult]:
+        for row in range(len(self)):
+            yield self[row]
+
+    def __getitem__(self, row: int) -> TestCaseResult:
+        return TestCaseResult(
+            self.node_id(row), OUTCOMES[self._outcomes[row]], self._durations[row]
+        )
+
+    def node_id(self, row: int) -> str:
+        """
+        Gives the test id of a row.
+
+        :param row: The row
+        :return: The id of the test case
+        """
+        return self._string(self._id_index[row])
+
+    def _string(self, index: int) -> str:
+        start = self._id_offsets[index]
+        end = self._id_offsets[index + 1]
+        return bytes(self._strings[start:end]).decode("utf-8")
+
+    def count_by_outcome(self) -> Dict[str, int]:
+        """
+        Counts the test cases per outcome.
+
+        :return: A dictionary from each outcome to its number of test cases
+        """
+        codes = bytes(self._outcomes)
+        return {outcome: codes.count(code) for outcome, code in _OUTCOME_CODES.items()}
+
+    def slowest(self, count: int) -> List[TestCaseResult]:
+        """
+        Gives the slowest test cases.
+
+        :param count: The maximum number of test cases
+        :return: The slowest test cases, the slowest first
+        """
+        rows = heapq.nlargest(count, range(len(self)), key=self._durations.__getitem__)
+        return [self[row] for row in rows]
+
+    def module_totals(self) -> Dict[str, ModuleTotals]:
+        """
+        Aggregates the results per module, i.e., the part of the test id in
+        front of the first `::`.
+
+        :return: A dictionary from each module to its totals
+        """
+        modules = [
+            self._string(index).split("::", 1)[0]
+            for index in range(len(self._id_offsets) - 1)
+        ]
+        tests: Dict[str, int] = {}
+        durations: Dict[str, float] = {}
+        outcomes: Dict[str, List[int]] = {}
+        for index, code, duration in zip(
+            self._id_index, self._outcomes, self._durations
+        ):
+            module = modules[index]
+            if module not in tests:
+                tests[module] = 0
+                durations[module] = 0.0
+                outcomes[module] = [0] * len(OUTCOMES)
+            tests[module] += 1
+            durations[module] += duration
+            outcomes[module][code] += 1
+        return {
+            module: ModuleTotals(
+                tests[module], durations[module], dict(zip(OUTCOMES, outcomes[module]))
+            )
+            for module in tests
+        }
+
+    def save(self, path: str) -> None:
+        """
+        Saves the store to a file, which can be memory mapped by `load`.
+
+        :param path: The path of the file
+        """
+        sections = [
+            bytes(memoryview(column).cast("B"))  # type: ignore
+            for column in (
+                self._id_offsets,
+                self._durations,
+                self._id_index,
+                self._outcomes,
+                self._strings,
+            )
+        ]
+        header = _HEADER.pack(
+            _MAGIC,
+            _byte_order(),
+            len(self),
+            len(self._id_offsets) - 1,
+            len(self._strings),
+        )
+        with open(path, "wb") as store_file:
+            store_file.write(header)
+            position = len(header)
+            for section in sections:
+                store_file.write(section)
+                position += len(section)
+                padding = -position % _ALIGNMENT
+                store_file.write(b"\0" * padding)
+                position += padding
+
+    @classmethod
+    def load(cls, path: str) -> "TestResultStore":
+        """
+        Loads a saved store by memory mapping its file.
+
+        :param path: The path of the file
+        :return: A read-only store, which should be closed after use
+        """
+        with open(path, "rb") as store_file:
+            mapped = mmap.mmap(store_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, byte_order, rows, ids, string_size = _HEADER.unpack_from(mapped)
+        if magic != _MAGIC or byte_order != _byte_order():
+            mapped.close()
+            raise IllegalStateException("{} is not a compatible store!".format(path))
+        store = cls()
+        store._interned = None
+        store._mapped = mapped
+        view = memoryview(mapped)
+        position = _HEADER.size
+        columns: List[Any] = []
+        for item_format, length in (
+            ("Q", ids + 1),
+            ("f", rows),
+            ("I", rows),
+            ("B", rows),
+            ("B", string_size),
+        ):
+            size = length * struct.calcsize(item_format)
+            column = view[position : position + size]
+            columns.append(column.cast(item_format))  # type: ignore
+            position += size + (-size % _ALIGNMENT)
+        (
+            store._id_offsets,
+            store._durations,
+            store._id_index,
+            store._outcomes,
+            store._strings,
+        ) = columns
+        return store
+
+    def close(self) -> None:
+        """Releases the memory mapping of a loaded store"""
+        if self._mapped is None:
+            return
+        for column in (
+            self._id_offsets,
+            self._durations,
+            self._id_index,
+            self._outcomes,
+            self._strings,
+        ):
+            column.release()  # type: ignore
+        self._id_offsets = array("Q", [0])
+        self._strings = bytearray()
+        self._id_index = array("I")
+        self._outcomes = array("B")
+        self._durations = array("f")
+        self._mapped.close()
+        self._mapped = None
+
+    def __enter__(self) -> "TestResultStore":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+def _byte_order() -> int:
+    return 1 if sys.byteorder == "little" else 0
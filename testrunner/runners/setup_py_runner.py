@@ -18,46 +18,46 @@ You should have received a copy of the GNU Lesser General Public License
 along with Test-Runner.  If not, see <https://www.gnu.org/licenses/>.
 """
 import os
-from typing import Optional, Tuple
-
-from pytesting_utils import virtualenv
+from typing import AsyncIterator, Optional, Tuple
 
+from testrunner.environments.managed_environment import ManagedEnvironment
+from testrunner.environments.streaming import OutputLine
 from testrunner.runners.abstract_runner import AbstractRunner, RunResult
 
 
 class SetupPyRunner(AbstractRunner):
     """Implements a runner for setup.py"""
 
-    def __init__(self, project_name: str, path: str, time_limit: int = 0,) -> None:
-        super().__init__(project_name, path)
-        self._time_limit = time_limit
-
     def run(self) -> Optional[Tuple[str, str]]:
-        setup_py = os.path.join(self._path, "setup.py")
-        if not os.path.exists(setup_py) and not os.path.isfile(setup_py):
+        if not self._has_setup_py():
             return None
+        return super().run()
+
+    def run_in_environment(self, env: ManagedEnvironment) -> Optional[Tuple[str, str]]:
+        if not self._has_setup_py():
+            return None
+        return super().run_in_environment(env)
+
+    async def run_async(self) -> AsyncIterator[OutputLine]:
+        if not self._has_setup_py():
+            return
+        async for line in super().run_async():
+            yield line
+
+    async def run_in_environment_async(
+        self, env: ManagedEnvironment
+    ) -> AsyncIterator[OutputLine]:
+        if not self._has_setup_py():
+            return
+        async for line in super().run_in_environment_async(env):
+            yield line
+
+    def _has_setup_py(self) -> bool:
+        setup_py = os.path.join(self._path, "setup.py")
+        return os.path.exists(setup_py) or os.path.isfile(setup_py)
 
-        with virtualenv(self._project_name) as env:
-            old_dir = os.getcwd()
-            os.chdir(self._path)
-            packages = self._extract_necessary_packages()
-            env.add_packages_for_installation(packages)
-            env.add_package_for_installation("benchexec")
-
-            if self._time_limit > 0:
-                command = "runexec --timelimit={}s -- ".format(self._time_limit)
-            else:
-                command = "runexec -- "
-            command += "python setup.py test"
-            out, err = env.run_commands([command])
-            if os.path.exists(
-                os.path.join(os.getcwd(), "output.log")
-            ) and os.path.isfile(os.path.join(os.getcwd(), "output.log")):
-                with open(os.path.join(os.getcwd(), "output.log")) as out_file:
-                    out += "\n".join(out_file.readlines())
-
-            os.chdir(old_dir)
-            return out, err
+    def _test_command(self) -> str:
+        return "python setup.py test"
 
     def get_run_result(self, log: str) -> RunResult:
         raise NotImplementedError("Implement me!")
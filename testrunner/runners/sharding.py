@@ -0,0 +1,216 @@
+"""
+Test runner is a library for running unit tests on Python code.
+
+It offers the opinion to automatically detect the correct run settings for
+the tests and gives information about the test results and coverage information.
+
+Test-Runner is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Test-Runner is distributed in the hope that it will be useful
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Test-Runner.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import heapq
+import json
+import re
+import statistics
+import xml.etree.ElementTree as ElementTree
+from typing import Any, Dict, Iterable, List, Mapping, Tuple
+
+import attr
+
+from testrunner.runners.junit_reader import TestCaseResult
+
+# The cost of a test if there are no recorded durations to derive one from
+DEFAULT_TEST_DURATION = 1.0
+
+# Summary values that are summed over the shards, the others are maximised
+_SUMMED = ("passed", "failed", "skipped", "error", "xfailed", "xpassed", "warnings")
+
+
+# pylint: disable=too-few-public-methods
+@attr.s
+class ShardPlan:
+    """The assignment of tests to shards with the predicted shard durations"""
+
+    shards: List[List[str]] = attr.ib()
+    predicted: List[float] = attr.ib()
+    actual: List[float] = attr.ib(factory=list)
+    """The durations of the shards, once the run finished"""
+
+    @property
+    def predicted_makespan(self) -> float:
+        """Gives the predicted duration of the slowest shard"""
+        return max(self.predicted, default=0.0)
+
+    @property
+    def actual_makespan(self) -> float:
+        """Gives the duration of the slowest shard, -1 before the run"""
+        return max(self.actual, default=-1.0)
+
+
+def plan_shards(
+    node_ids: List[str], shards: int, durations: Mapping[str, float]
+) -> ShardPlan:
+    """
+    Assigns tests to shards by their recorded durations.
+
+    The tests are assigned longest first, each to the shard with the
+    smallest total so far.  Tests without a recorded duration cost the
+    median of the recorded ones.  Without any recorded duration, the tests
+    are split by `split_into_shards`.
+
+    :param node_ids: The pytest ids of the collected tests
+    :param shards: The maximum number of shards
+    :param durations: The recorded durations by JUnit test id, see
+    `junit_test_id`
+    :return: The plan of the non-empty shards, each a list of test ids in
+    collection order
+    """
+    recorded = [durations.get(junit_test_id(node_id)) for node_id in node_ids]
+    known = [duration for duration in recorded if duration is not None]
+    if not known:
+        split = split_into_shards(node_ids, shards)
+        return ShardPlan(split, [len(shard) * DEFAULT_TEST_DURATION for shard in split])
+    default = statistics.median(known)
+    costs = [default if duration is None else duration for duration in recorded]
+    loads: List[Tuple[float, int]] = [(0.0, index) for index in range(max(shards, 1))]
+    assigned: List[List[int]] = [[] for _ in loads]
+    for test in sorted(range(len(node_ids)), key=costs.__getitem__, reverse=True):
+        load, shard = heapq.heappop(loads)
+        assigned[shard].append(test)
+        heapq.heappush(loads, (load + costs[test], shard))
+    totals = {shard: load for load, shard in loads}
+    plan = ShardPlan([], [])
+    for shard, tests in enumerate(assigned):
+        if tests:
+            plan.shards.append([node_ids[test] for test in sorted(tests)])
+            plan.predicted.append(totals[shard])
+    return plan
+
+
+def junit_test_id(node_id: str) -> str:
+    """
+    Converts a pytest test id to the id the test has in pytest's JUnit-like
+    XML files and thus in `TestCaseResult`.
+
+    :param node_id: The pytest test id, e.g., `tests/test_a.py::Test::test_b`
+    :return: The JUnit test id, e.g., `tests.test_a.Test::test_b`
+    """
+    path, bracket, parameters = node_id.partition("[")
+    names = path.split("::")
+    names[0] = re.sub(r"\.py$", "", names[0].replace("/", "."))
+    names[-1] += bracket + parameters
+    if len(names) == 1:
+        return names[0]
+    return "{}::{}".format(".".join(names[:-1]), names[-1])
+
+
+def recorded_durations(results: Iterable[TestCaseResult]) -> Dict[str, float]:
+    """
+    Gives the mean recorded duration of each test.
+
+    :param results: The results of previous runs, e.g., from
+    `read_junit_xml` or a `TestResultStore`
+    :return: The mean duration by JUnit test id
+    """
+    totals: Dict[str, List[float]] = {}
+    for result in results:
+        total = totals.setdefault(result.node_id, [0.0, 0])
+        total[0] += result.duration
+        total[1] += 1
+    return {node_id: total / count for node_id, (total, count) in totals.items()}
+
+
+def split_into_shards(node_ids: List[str], shards: int) -> List[List[str]]:
+    """
+    Splits test ids into shards of similar size.
+
+    The tests of a module stay in one shard, such that module-scoped
+    fixtures are only set up once.  The modules are assigned by decreasing
+    size, each to the shard with the fewest tests so far.
+
+    :param node_ids: The ids of the collected tests
+    :param shards: The maximum number of shards
+    :return: The non-empty shards, each a list of test ids in collection
+    order
+    """
+    modules: Dict[str, List[str]] = {}
+    for node_id in node_ids:
+        modules.setdefault(node_id.split("::", 1)[0], []).append(node_id)
+    assigned: List[List[str]] = [[] for _ in range(max(shards, 1))]
+    for tests in sorted(modules.values(), key=len, reverse=True):
+        min(assigned, key=len).extend(tests)
+    order = {node_id: index for index, node_id in enumerate(node_ids)}
+    return [
+        sorted(shard, key=order.__getitem__) for shard in assigned if len(shard) > 0
+    ]
+
+
+def merge_results_files(paths: List[str], target: str) -> None:
+    """
+    Merges the results files of the shards of a run into one.
+
+    The test records are copied and the summaries are combined: the counts
+    are summed, while the duration and the exit status are the maxima over
+    the shards, as the shards run in parallel.  No summary is written if a
+    shard did not finish its session.
+
+    :param paths: The results files of the shards
+    :param target: The path of the merged results file
+    """
+    summary: Dict[str, Any] = {"type": "summary"}
+    complete = True
+    with open(target, "w") as merged:
+        for path in paths:
+            shard_summary = None
+            try:
+                with open(path) as results:
+                    for line in results:
+                        if '"type": "summary"' in line:
+                            shard_summary = json.loads(line)
+                        else:
+                            merged.write(line)
+            except (OSError, ValueError):
+                pass
+            if shard_summary is None:
+                complete = False
+                continue
+            for key, value in shard_summary.items():
+                if key == "type":
+                    continue
+                if key in _SUMMED:
+                    summary[key] = summary.get(key, 0) + value
+                else:
+                    summary[key] = max(summary.get(key, value), value)
+        if complete:
+            merged.write(json.dumps(summary, sort_keys=True) + "\n")
+
+
+def merge_junit_xml(paths: List[str], target: str) -> None:
+    """
+    Merges the JUnit-like XML files of the shards of a run into one file
+    with a test suite per shard.
+
+    :param paths: The XML files of the shards, missing or broken files are
+    skipped
+    :param target: The path of the merged file
+    """
+    with open(target, "wb") as merged:
+        merged.write(b'<?xml version="1.0" encoding="utf-8"?><testsuites>')
+        for path in paths:
+            try:
+                for _, element in ElementTree.iterparse(path):
+                    if element.tag == "testsuite":
+                        merged.write(ElementTree.tostring(element))
+                        element.clear()
+            except (OSError, ElementTree.ParseError):
+                continue
+        merged.write(b"</testsuites>")
@@ -0,0 +1,513 @@
+"""
+Test runner is a library for running unit tests on Python code.
+
+It offers the opinion to automatically detect the correct run settings for
+the tests and gives information about the test results and coverage information.
+
+Test-Runner is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Test-Runner is distributed in the hope that it will be useful
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Test-Runner.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import ast
+import configparser
+import fnmatch
+import hashlib
+import json
+import os
+import re
+import tempfile
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import attr
+from plumbum import local, CommandNotFound  # type: ignore
+from pytesting_utils import IllegalStateException
+
+from testrunner.detection import DEFAULT_SKIP_DIRECTORIES
+from testrunner.runner_type import RunnerType
+
+FULL_RUN_PATTERNS = (
+    "setup.py",
+    "setup.cfg",
+    "pyproject.toml",
+    "*requirements*.txt",
+    "Pipfile",
+    "Pipfile.lock",
+    "tox.ini",
+    "pytest.ini",
+    "conftest.py",
+    ".coveragerc",
+)
+"""Names of files whose changes make all tests run by default"""
+
+TEST_MODULE_PATTERNS = ("test_*.py", "*_test.py")
+"""Names of the files that are test modules by default, as for pytest"""
+
+# nose's default testMatch, see nose.config
+_NOSE_TEST_MATCH = r"(?:^|[\b_\./-])[Tt]est"
+# unittest's default discovery pattern, which nose2 and `setup.py test` use
+_UNITTEST_PATTERN = "test*.py"
+# Files pytest reads its configuration from, by precedence, with the section
+_PYTEST_CONFIG_FILES = (
+    ("pytest.ini", "pytest"),
+    ("pyproject.toml", "tool.pytest.ini_options"),
+    ("tox.ini", "pytest"),
+    ("setup.cfg", "tool:pytest"),
+)
+
+# Modification time in ns, size, and the imported module names of a file
+_CacheEntry = Tuple[int, int, List[str]]
+
+
+# pylint: disable=too-few-public-methods
+@attr.s(frozen=True)
+class TestSelection:
+    """The test modules a change affects"""
+
+    __test__ = False
+
+    test_modules: List[str] = attr.ib()
+    """Paths of the affected test modules relative to the project"""
+    run_all: bool = attr.ib(default=False)
+    """Whether all tests have to run, the test modules are empty then"""
+    reason: str = attr.ib(default="")
+
+
+class ImportGraphCache:
+    """
+    An on-disk cache for the imports of the modules of repositories.
+
+    Every entry is a JSON file in the cache directory that holds the imports
+    of the modules of one repository, together with the modification times
+    and sizes of the module files, such that only changed modules are parsed
+    again.
+    """
+
+    def __init__(self, cache_dir: str) -> None:
+        """
+        Creates a new import-graph cache.
+
+        :param cache_dir: The directory holding the cache entries, it is
+        created if it does not exist
+        """
+        os.makedirs(cache_dir, exist_ok=True)
+        self._cache_dir = cache_dir
+
+    def get(self, repo_path: str) -> Dict[str, _CacheEntry]:
+        """
+        Gives the cached imports of the modules of a repository.
+
+        :param repo_path: Path to the project's source code
+        :return: The entries by module path relative to the project, empty if
+        there is no valid entry
+        """
+        try:
+            with open(self._entry_path(repo_path)) as entry_file:
+                entry = json.load(entry_file)
+            if entry["repo_path"] != os.path.abspath(repo_path):
+                return {}
+            return {
+                path: (mtime, size, imports)
+                for path, (mtime, size, imports) in entry["modules"].items()
+            }
+        except (OSError, ValueError, KeyError, TypeError):
+            return {}
+
+    def put(self, repo_path: str, modules: Dict[str, _CacheEntry]) -> None:
+        """
+        Stores the imports of the modules of a repository.
+
+        :param repo_path: Path to the project's source code
+        :param modules: The entries by module path relative to the project
+        """
+        entry = {"repo_path": os.path.abspath(repo_path), "modules": modules}
+        handle, tmp_path = tempfile.mkstemp(dir=self._cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(handle, "w") as entry_file:
+                json.dump(entry, entry_file)
+            os.replace(tmp_path, self._entry_path(repo_path))
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    def _entry_path(self, repo_path: str) -> str:
+        digest = hashlib.sha256(os.path.abspath(repo_path).encode("utf-8")).hexdigest()
+        return os.path.join(self._cache_dir, "{}.json".format(digest))
+
+
+class ImportGraph:
+    """
+    The static import graph of the modules of a project.
+
+    The imports are read from the syntax trees of the modules, the modules
+    are never imported.  A module is known by its dotted path from the
+    project root and by every suffix of it, such that modules imported from
+    `src` layouts or from directories on the test path are found.  Imports
+    that match several modules depend on all of them, which may select more
+    tests than necessary but never misses one.
+    """
+
+    def __init__(self, imports: Dict[str, List[str]]) -> None:
+        """
+        Creates an import graph.
+
+        :param imports: The imported module names by module path relative to
+        the project
+        """
+        self._imports = imports
+        self._importers: Dict[str, Set[str]] = {}
+        for path, names in imports.items():
+            for name in names:
+                self._importers.setdefault(name, set()).add(path)
+
+    @classmethod
+    def build(
+        cls,
+        repo_path: str,
+        cache: Optional[ImportGraphCache] = None,
+        skip_directories: Iterable[str] = DEFAULT_SKIP_DIRECTORIES,
+    ) -> "ImportGraph":
+        """
+        Builds the import graph of a project.
+
+        :param repo_path: Path to the project's source code
+        :param cache: An optional cache of the imports, only the modules that
+        changed since they were cached are parsed
+        :param skip_directories: Names of directories that are not scanned
+        :return: The import graph
+        """
+        skipped = frozenset(skip_directories)
+        cached = cache.get(repo_path) if cache is not None else {}
+        modules: Dict[str, _CacheEntry] = {}
+        for directory, directories, files in os.walk(repo_path):
+            directories[:] = [name for name in directories if name not in skipped]
+            for file_name in files:
+                if not file_name.endswith(".py"):
+                    continue
+                full_path = os.path.join(directory, file_name)
+                path = os.path.relpath(full_path, repo_path).replace(os.sep, "/")
+                try:
+                    stat = os.stat(full_path)
+                except OSError:
+                    continue
+                entry = cached.get(path)
+                if entry is None or entry[:2] != (stat.st_mtime_ns, stat.st_size):
+                    entry = (
+                        stat.st_mtime_ns,
+                        stat.st_size,
+                        _read_imports(full_path, path),
+                    )
+                modules[path] = entry
+        if cache is not None and modules != cached:
+            cache.put(repo_path, modules)
+        return cls({path: entry[2] for path, entry in modules.items()})
+
+    def __contains__(self, path: object) -> bool:
+        return path in self._imports
+
+    def modules(self) -> List[str]:
+        """
+        Gives the modules of the project.
+
+        :return: The paths of the modules relative to the project, sorted
+        """
+        return sorted(self._imports)
+
+    def imports(self, path: str) -> List[str]:
+        """
+        Gives the names of the modules a module imports.
+
+        :param path: The path of the module relative to the project
+        :return: The imported module names, including their parent packages
+        """
+        return self._imports.get(path, [])
+
+    def affected(self, paths: Iterable[str]) -> Set[str]:
+        """
+        Gives the modules that transitively import any of the given modules.
+
+        :param paths: Paths of changed modules relative to the project, which
+        may no longer exist
+        :return: The paths of the given and the affected modules
+        """
+        affected = set(paths)
+        pending = deque(affected)
+        while pending:
+            path = pending.popleft()
+            for name in module_names(path):
+                for importer in self._importers.get(name, ()):
+                    if importer not in affected:
+                        affected.add(importer)
+                        pending.append(importer)
+        return affected
+
+
+def module_names(path: str) -> List[str]:
+    """
+    Gives the names a module may be imported by.
+
+    :param path: The path of the module relative to the project
+    :return: The dotted path and all its suffixes, longest first
+    """
+    parts = path[: -len(".py")].split("/")
+    if parts[-1] == "__init__":
+        parts.pop()
+    return [".".join(parts[index:]) for index in range(len(parts))]
+
+
+def _read_imports(full_path: str, path: str) -> List[str]:
+    try:
+        with open(full_path, "rb") as module_file:
+            tree = ast.parse(module_file.read(), full_path)
+    except (OSError, SyntaxError, ValueError):
+        return []
+    package = module_names(path)[0].split(".")
+    if not path.endswith("__init__.py"):
+        package = package[:-1]
+    names: Set[str] = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                _add_with_parents(names, alias.name)
+        elif isinstance(node, ast.ImportFrom):
+            module = node.module or ""
+            if node.level > 0:
+                base = package[: len(package) - node.level + 1]
+                module = ".".join(base + ([module] if module else []))
+            if module:
+                _add_with_parents(names, module)
+            for alias in node.names:
+                if alias.name != "*":
+                    names.add("{}.{}".format(module, alias.name).lstrip("."))
+    return sorted(names)
+
+
+def _add_with_parents(names: Set[str], module: str) -> None:
+    parts = module.split(".")
+    for index in range(1, len(parts) + 1):
+        names.add(".".join(parts[:index]))
+
+
+def changed_files(repo_path: str, base: str) -> List[str]:
+    """
+    Gives the files that changed in a project since a git revision.
+
+    Committed, uncommitted and untracked files are included, renamed files
+    appear with their old and new paths.
+
+    :param repo_path: Path to the project's source code inside a git
+    repository
+    :param base: The git revision to compare with
+    :return: The paths of the changed files relative to the project
+    """
+    try:
+        git = local["git"]
+    except CommandNotFound as exc:
+        raise IllegalStateException("git is required to find changed files!") from exc
+    commands = (
+        ["diff", "--name-only", "--no-renames", "--relative", "-z", base, "--"],
+        ["ls-files", "--others", "--exclude-standard", "-z"],
+    )
+    changed: Set[str] = set()
+    for arguments in commands:
+        retcode, out, err = git["-C", repo_path][arguments].run(retcode=None)
+        if retcode != 0:
+            raise IllegalStateException(
+                "Could not find the changed files: {}".format(err.strip())
+            )
+        changed.update(path for path in out.split("\0") if path)
+    return sorted(changed)
+
+
+def configured_test_patterns(repo_path: str, runner_type: RunnerType) -> List[str]:
+    """
+    Gives the patterns of the test modules the test tool of a project runs.
+
+    The patterns are taken from the project's configuration of the tool:
+    pytest's `python_files`, nose's `testMatch` in `setup.cfg`, or nose2's
+    `test-file-pattern`; the tool's default is used if the project does not
+    configure one.  `pyproject.toml` is only read if the interpreter ships
+    `tomllib`.
+
+    :param repo_path: Path to the project's source code
+    :param runner_type: The runner type of the project
+    :return: Regular expressions that are searched in the file names of
+    modules without their `.py` suffix
+    """
+    if runner_type == RunnerType.NOSE:
+        return [_nose_test_match(repo_path)]
+    if runner_type in (RunnerType.NOSE2, RunnerType.SETUP_PY):
+        pattern = None
+        if runner_type == RunnerType.NOSE2:
+            pattern = _config_value(
+                repo_path, "unittest.cfg", "unittest", "test-file-pattern"
+            ) or _config_value(repo_path, "nose2.cfg", "unittest", "test-file-pattern")
+        return [_glob_pattern(pattern or _UNITTEST_PATTERN)]
+    for file_name, section in _PYTEST_CONFIG_FILES:
+        config = _read_config(os.path.join(repo_path, file_name))
+        if config is None or not (file_name == "pytest.ini" or section in config):
+            continue
+        globs = config.get(section, {}).get("python_files", "").split()
+        return [_glob_pattern(glob) for glob in globs or TEST_MODULE_PATTERNS]
+    return [_glob_pattern(glob) for glob in TEST_MODULE_PATTERNS]
+
+
+def _nose_test_match(repo_path: str) -> str:
+    match = _config_value(
+        repo_path, "setup.cfg", "nosetests", "testmatch"
+    ) or _config_value(repo_path, "setup.cfg", "nosetests", "match")
+    if match is None:
+        return _NOSE_TEST_MATCH
+    try:
+        return re.compile(match).pattern
+    except re.error:
+        return _NOSE_TEST_MATCH
+
+
+def _glob_pattern(glob: str) -> str:
+    """Converts a glob of module file names to a test module pattern"""
+    if glob.endswith(".py"):
+        glob = glob[: -len(".py")]
+    return "^" + fnmatch.translate(glob)
+
+
+def _config_value(
+    repo_path: str, file_name: str, section: str, option: str
+) -> Optional[str]:
+    config = _read_config(os.path.join(repo_path, file_name))
+    if config is None:
+        return None
+    value = config.get(section, {}).get(option)
+    return value.strip() if value else None
+
+
+def _read_config(path: str) -> Optional[Dict[str, Dict[str, str]]]:
+    """Reads the sections of an INI or a TOML file, None if it is unreadable"""
+    if not os.path.isfile(path):
+        return None
+    if path.endswith(".toml"):
+        return _read_toml(path)
+    parser = configparser.ConfigParser(interpolation=None)
+    try:
+        parser.read(path)
+    except (configparser.Error, UnicodeDecodeError):
+        return None
+    return {name: dict(parser[name]) for name in parser.sections()}
+
+
+def _read_toml(path: str) -> Optional[Dict[str, Dict[str, str]]]:
+    try:
+        import tomllib  # type: ignore # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return None
+    try:
+        with open(path, "rb") as toml_file:
+            document = tomllib.load(toml_file)
+    except (OSError, ValueError):
+        return None
+    options = document.get("tool", {}).get("pytest", {}).get("ini_options")
+    if not isinstance(options, dict):
+        return {}
+    python_files = options.get("python_files", "")
+    if isinstance(python_files, list):
+        python_files = " ".join(python_files)
+    return {"tool.pytest.ini_options": {"python_files": str(python_files)}}
+
+
+def select_tests(
+    repo_path: str,
+    base: str,
+    cache: Optional[ImportGraphCache] = None,
+    full_run_patterns: Sequence[str] = FULL_RUN_PATTERNS,
+    test_patterns: Optional[Sequence[str]] = None,
+) -> TestSelection:
+    """
+    Selects the test modules a change since a git revision may affect.
+
+    Python modules affect the test modules that import them transitively;
+    if a changed module affects no test module, all tests are run, as the
+    tests using it may not be recognised as test modules.  Other files,
+    e.g., test data or templates, affect all test modules in their
+    directory and its subdirectories; if there are none, all tests are run,
+    as the file's users are unknown.
+
+    :param repo_path: Path to the project's source code inside a git
+    repository
+    :param base: The git revision to compare with
+    :param cache: An optional cache for the import graph
+    :param full_run_patterns: Names of files whose changes make all tests
+    run
+    :param test_patterns: The patterns of the test modules, see
+    `configured_test_patterns`; pytest's defaults if not given
+    :return: The affected test modules, or all tests if a file matching the
+    full-run patterns, a module without affected test modules, or a file
+    without test modules next to it changed
+    """
+    if test_patterns is None:
+        test_patterns = [_glob_pattern(glob) for glob in TEST_MODULE_PATTERNS]
+    changed = changed_files(repo_path, base)
+    for path in changed:
+        if _matches(path, full_run_patterns):
+            return TestSelection([], True, "{} changed".format(path))
+    if not changed:
+        return TestSelection([], reason="no file changed")
+    python_files = [path for path in changed if path.endswith(".py")]
+    other_files = [path for path in changed if not path.endswith(".py")]
+    graph = ImportGraph.build(repo_path, cache)
+    test_modules: Set[str] = set()
+    for path in python_files:
+        affected = {
+            module
+            for module in graph.affected([path])
+            if module in graph and _is_test_module(module, test_patterns)
+        }
+        if not affected:
+            return TestSelection(
+                [], True, "{} changed without test modules using it".format(path)
+            )
+        test_modules.update(affected)
+    for path in other_files:
+        nearby = _test_modules_below(graph, path.rpartition("/")[0], test_patterns)
+        if not nearby:
+            return TestSelection(
+                [], True, "{} changed without test modules next to it".format(path)
+            )
+        test_modules.update(nearby)
+    return TestSelection(
+        sorted(test_modules),
+        reason="{} changed Python files and {} other files affect {} test "
+        "modules".format(len(python_files), len(other_files), len(test_modules)),
+    )
+
+
+def _test_modules_below(
+    graph: ImportGraph, directory: str, test_patterns: Sequence[str]
+) -> List[str]:
+    """Gives the test modules in a directory and its subdirectories"""
+    if not directory:
+        # Files in the project root may be used by any test
+        return []
+    return [
+        path
+        for path in graph.modules()
+        if path.startswith(directory + "/") and _is_test_module(path, test_patterns)
+    ]
+
+
+def _is_test_module(path: str, test_patterns: Sequence[str]) -> bool:
+    name = path.rsplit("/", 1)[-1][: -len(".py")]
+    return any(re.search(pattern, name) for pattern in test_patterns)
+
+
+def _matches(path: str, patterns: Sequence[str]) -> bool:
+    name = path.rsplit("/", 1)[-1]
+    return any(fnmatch.fnmatch(name, pattern) for pattern in patterns)
@@ -0,0 +1,98 @@
+"""
+Test runner is a library for running unit tests on Python code.
+
+It offers the opinion to automatically detect the correct run settings for
+the tests and gives information about the test results and coverage information.
+
+Test-Runner is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Test-Runner is distributed in the hope that it will be useful
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Test-Runner.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+from unittest import mock
+
+from testrunner.environments.base_layer import ToolingBaseLayers
+from testrunner.environments.managed_environment import ManagedEnvironment
+from tests.environments.test_managed_environment import create_fake_environment
+
+
+def create_fake_tooling_environment(env_dir: str) -> None:
+    """Creates a fake venv that additionally holds a pytest console script"""
+    create_fake_environment(env_dir)
+    script = os.path.join(env_dir, "bin", "pytest")
+    with open(script, "w") as f:
+        f.write("#!{}\nimport pytest\n".format(os.path.join(env_dir, "bin", "python")))
+    os.chmod(script, os.stat(script).st_mode | stat.S_IEXEC)
+    with open(os.path.join(env_dir, "bin", "pip3"), "w") as f:
+        f.write("#!/usr/bin/python\n")
+
+
+@mock.patch(
+    "testrunner.environments.managed_environment.virtualenv.create_environment",
+    side_effect=create_fake_tooling_environment,
+)
+class ToolingBaseLayersTest(unittest.TestCase):
+    def setUp(self):
+        self._root = tempfile.mkdtemp()
+        self._layers = ToolingBaseLayers(os.path.join(self._root, "layers"))
+
+    def tearDown(self):
+        shutil.rmtree(self._root)
+
+    def test_layer_key(self, _):
+        self.assertEqual(
+            ToolingBaseLayers.layer_key(["pytest", "pytest_cov"]),
+            ToolingBaseLayers.layer_key(["pytest-cov", "pytest"]),
+        )
+        self.assertNotEqual(
+            ToolingBaseLayers.layer_key(["pytest"]),
+            ToolingBaseLayers.layer_key(["nose"]),
+        )
+
+    def test_builds_layer_once(self, create_mock):
+        first = self._layers.get(["pytest", "benchexec"])
+        second = self._layers.get(["benchexec", "pytest"])
+        self.assertEqual(first.get_env_dir(), second.get_env_dir())
+        self.assertEqual({"pytest", "benchexec"}, second.installed_packages())
+        create_mock.assert_called_once()
+
+    def test_apply(self, _):
+        env_dir = os.path.join(self._root, "env")
+        create_fake_environment(env_dir)
+        env = ManagedEnvironment("foo", env_dir)
+        self._layers.apply(env, ["pytest"])
+        base = self._layers.get(["pytest"])
+
+        with open(
+            os.path.join(env.get_site_packages_dir(), "_testrunner_base_layer.pth")
+        ) as f:
+            self.assertEqual(base.get_site_packages_dir() + "\n", f.read())
+        with open(os.path.join(env_dir, "bin", "pytest")) as f:
+            self.assertEqual(
+                "#!{}\nimport pytest\n".format(os.path.join(env_dir, "bin", "python")),
+                f.read(),
+            )
+        self.assertTrue(os.access(os.path.join(env_dir, "bin", "pytest"), os.X_OK))
+        self.assertFalse(os.path.exists(os.path.join(env_dir, "bin", "pip3")))
+
+        env.add_packages_for_installation(["foo", "pytest"])
+        env.run_commands(["true"])
+        with open(os.path.join(env_dir, "pip.log")) as f:
+            self.assertEqual(["installed install foo"], f.read().splitlines())
+
+
+if __name__ == "__main__":
+    unittest.main()
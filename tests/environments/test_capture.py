@@ -0,0 +1,74 @@
+"""
+Test runner is a library for running unit tests on Python code.
+
+It offers the opinion to automatically detect the correct run settings for
+the tests and gives information about the test results and coverage information.
+
+Test-Runner is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Test-Runner is distributed in the hope that it will be useful
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Test-Runner.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import os
+import pickle
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+from testrunner.environments.capture import CapturedOutput, OutputCapture
+
+
+class OutputCaptureTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self._tmp_dir)
+
+    def test_small_output(self):
+        with OutputCapture() as capture:
+            capture.write(b"foo\nbar\n")
+            output = capture.finish()
+        self.assertEqual("foo\nbar\n", output)
+        self.assertFalse(output.truncated)
+        self.assertIsNone(output.path)
+
+    def test_tail_starts_at_line(self):
+        with OutputCapture(tail_size=10) as capture:
+            capture.write(b"".join(b"line %d\n" % i for i in range(100)))
+            output = capture.finish()
+        self.assertEqual("line 99\n", output)
+        self.assertTrue(output.truncated)
+        self.assertEqual(790, output.size)
+
+    def test_spill_file(self):
+        spill_path = os.path.join(self._tmp_dir, "out.log")
+        log = os.path.join(self._tmp_dir, "output.log")
+        with open(log, "w") as f:
+            f.write("a\nb\n")
+        with OutputCapture(spill_path, tail_size=4) as capture:
+            subprocess.call("echo subprocess", shell=True, stdout=capture.file)
+            capture.append_file(log)
+            capture.append_file(os.path.join(self._tmp_dir, "missing.log"))
+            output = capture.finish()
+        self.assertEqual("b\n", output)
+        self.assertEqual(spill_path, output.path)
+        with open(spill_path) as f:
+            self.assertEqual("subprocess\na\nb\n", f.read())
+
+    def test_pickle(self):
+        output = CapturedOutput("tail", "/foo/bar", 100)
+        copy = pickle.loads(pickle.dumps(output))
+        self.assertEqual("tail", copy)
+        self.assertEqual("/foo/bar", copy.path)
+        self.assertEqual(100, copy.size)
+        self.assertTrue(copy.truncated)
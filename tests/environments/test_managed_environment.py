@@ -0,0 +1,140 @@
+"""
+Test runner is a library for running unit tests on Python code.
+
+It offers the opinion to automatically detect the correct run settings for
+the tests and gives information about the test results and coverage information.
+
+Test-Runner is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Test-Runner is distributed in the hope that it will be useful
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Test-Runner.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+from unittest import mock
+
+from pytesting_utils import IllegalArgumentException
+
+from testrunner.environments.managed_environment import (
+    ManagedEnvironment,
+    is_installable_requirement,
+    is_local_requirement,
+    temporary_environment,
+)
+
+
+def create_fake_environment(env_dir: str) -> None:
+    """Creates a fake venv whose pip fails for packages starting with 'bad'"""
+    bin_dir = os.path.join(env_dir, "bin")
+    os.makedirs(bin_dir, exist_ok=True)
+    with open(os.path.join(bin_dir, "activate"), "w") as f:
+        f.write('PATH="{}:$PATH"\n'.format(bin_dir))
+    pip = os.path.join(bin_dir, "pip")
+    with open(pip, "w") as f:
+        f.write(
+            '#!/bin/sh\ncase "$2" in bad*) exit 1;; esac\n'
+            'echo "installed $*" >> "{}"\n'.format(os.path.join(env_dir, "pip.log"))
+        )
+    os.chmod(pip, os.stat(pip).st_mode | stat.S_IEXEC)
+
+
+class ManagedEnvironmentTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.mkdtemp()
+        create_fake_environment(self._tmp_dir)
+        self._env = ManagedEnvironment("foo", self._tmp_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self._tmp_dir)
+
+    def _pip_log(self):
+        with open(os.path.join(self._tmp_dir, "pip.log")) as f:
+            return f.read().splitlines()
+
+    def test_empty_name(self):
+        with self.assertRaises(IllegalArgumentException):
+            ManagedEnvironment("", self._tmp_dir)
+
+    def test_requirement_kinds(self):
+        self.assertTrue(is_local_requirement("-e ."))
+        self.assertTrue(is_local_requirement("./foo"))
+        self.assertFalse(is_local_requirement("foo>=1.0"))
+        self.assertFalse(is_installable_requirement("  "))
+        self.assertFalse(is_installable_requirement("# comment"))
+        self.assertTrue(is_installable_requirement("foo"))
+
+    def test_create_keeps_existing_environment(self):
+        with mock.patch(
+            "testrunner.environments.managed_environment.virtualenv"
+        ) as venv_mock:
+            self._env.create()
+            venv_mock.create_environment.assert_not_called()
+
+    def test_run_commands_in_directory(self):
+        work_dir = os.path.join(self._tmp_dir, "work")
+        os.mkdir(work_dir)
+        out, err = self._env.run_commands(["pwd"], cwd=work_dir)
+        self.assertEqual(work_dir, out.splitlines()[-1])
+
+    def test_installs_packages_once(self):
+        self._env.add_packages_for_installation(["foo>=1.0", "", "# comment"])
+        self._env.add_package_for_installation("-e .")
+        self._env.run_commands(["true"])
+        self.assertEqual({"foo>=1.0"}, self._env.installed_packages())
+
+        self._env.add_packages_for_installation(["foo>=1.0", "-e ."])
+        self._env.run_commands(["true"])
+        self.assertEqual(
+            [
+                "installed install foo>=1.0",
+                "installed install -e .",
+                "installed install -e .",
+            ],
+            self._pip_log(),
+        )
+
+    def test_failed_installation_is_retried(self):
+        self._env.add_packages_for_installation(["bad", "good"])
+        self._env.run_commands(["true"])
+        self.assertEqual({"good"}, self._env.installed_packages())
+        self._env.add_packages_for_installation(["bad", "good"])
+        self._env.run_commands(["true"])
+        self.assertEqual(["installed install good"], self._pip_log())
+
+    def test_string_representation(self):
+        self.assertEqual(
+            "ManagedEnvironment foo in directory {}".format(self._tmp_dir),
+            str(self._env),
+        )
+
+
+class TemporaryEnvironmentTest(unittest.TestCase):
+    def test_removes_environment(self):
+        root = tempfile.mkdtemp()
+        try:
+            with mock.patch(
+                "testrunner.environments.managed_environment.virtualenv"
+            ) as venv_mock:
+                venv_mock.create_environment.side_effect = create_fake_environment
+                with temporary_environment("foo", root) as env:
+                    env_dir = env.get_env_dir()
+                    self.assertTrue(env_dir.startswith(root))
+                    self.assertTrue(os.path.isdir(env_dir))
+            self.assertFalse(os.path.exists(env_dir))
+        finally:
+            shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    unittest.main()
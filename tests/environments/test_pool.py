@@ -0,0 +1,136 @@
+"""
+Test runner is a library for running unit tests on Python code.
+
+It offers the opinion to automatically detect the correct run settings for
+the tests and gives information about the test results and coverage information.
+
+Test-Runner is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Test-Runner is distributed in the hope that it will be useful
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Test-Runner.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from pytesting_utils import IllegalArgumentException
+
+from testrunner.environments.pool import (
+    VirtualEnvironmentPool,
+    interpreter_version,
+    normalize_requirement,
+)
+from tests.environments.test_managed_environment import create_fake_environment
+
+
+@mock.patch("testrunner.environments.managed_environment.virtualenv")
+class VirtualEnvironmentPoolTest(unittest.TestCase):
+    def setUp(self):
+        self._root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self._root)
+
+    def _environments(self):
+        return sorted(
+            os.path.join(key, slot)
+            for key in os.listdir(self._root)
+            if os.path.isdir(os.path.join(self._root, key))
+            for slot in os.listdir(os.path.join(self._root, key))
+        )
+
+    def test_illegal_bounds(self, _):
+        with self.assertRaises(IllegalArgumentException):
+            VirtualEnvironmentPool(self._root, max_environments=0)
+        with self.assertRaises(IllegalArgumentException):
+            VirtualEnvironmentPool(self._root, max_size=-1)
+
+    def test_normalize_requirement(self, _):
+        self.assertEqual(
+            "zope-interface>=4.0", normalize_requirement(" Zope.Interface >= 4.0")
+        )
+        self.assertEqual("-e .", normalize_requirement("-e . "))
+
+    def test_environment_key(self, _):
+        key = VirtualEnvironmentPool.environment_key(["Foo_Bar", "baz", ""], ["pytest"])
+        self.assertEqual(
+            key, VirtualEnvironmentPool.environment_key(["baz", "foo-bar"], ["pytest"])
+        )
+        self.assertNotEqual(
+            key, VirtualEnvironmentPool.environment_key(["baz", "foo-bar"], ["nose"])
+        )
+        with mock.patch(
+            "testrunner.environments.pool.interpreter_version", return_value="other"
+        ):
+            self.assertNotEqual(
+                key,
+                VirtualEnvironmentPool.environment_key(["baz", "foo-bar"], ["pytest"]),
+            )
+        self.assertIn(sys.executable, interpreter_version())
+
+    def test_reuses_released_environment(self, venv_mock):
+        venv_mock.create_environment.side_effect = create_fake_environment
+        pool = VirtualEnvironmentPool(self._root)
+        with pool.lease("foo", ["bar"], ["pytest"]) as env:
+            first = env.get_env_dir()
+            env.run_commands(["true"])
+        with pool.lease("foo", ["bar"], ["pytest"]) as env:
+            self.assertEqual(first, env.get_env_dir())
+            self.assertEqual({"bar", "pytest"}, env.installed_packages())
+        venv_mock.create_environment.assert_called_once()
+
+    def test_concurrent_leases_do_not_share(self, venv_mock):
+        venv_mock.create_environment.side_effect = create_fake_environment
+        pool = VirtualEnvironmentPool(self._root)
+        with pool.lease("foo", ["bar"], []) as first:
+            with pool.lease("foo", ["bar"], []) as second:
+                self.assertNotEqual(first.get_env_dir(), second.get_env_dir())
+        self.assertEqual(2, len(self._environments()))
+
+    def test_evicts_least_recently_used(self, venv_mock):
+        venv_mock.create_environment.side_effect = create_fake_environment
+        pool = VirtualEnvironmentPool(self._root, max_environments=2)
+        for packages in (["a"], ["b"], ["a"], ["c"]):
+            with pool.lease("foo", packages, []):
+                pass
+        remaining = self._environments()
+        self.assertEqual(2, len(remaining))
+        keys = {os.path.dirname(env) for env in remaining}
+        self.assertEqual(
+            {
+                VirtualEnvironmentPool.environment_key(["a"], []),
+                VirtualEnvironmentPool.environment_key(["c"], []),
+            },
+            keys,
+        )
+
+    def test_does_not_evict_leased_environment(self, venv_mock):
+        venv_mock.create_environment.side_effect = create_fake_environment
+        pool = VirtualEnvironmentPool(self._root, max_environments=1)
+        with pool.lease("foo", ["a"], []) as env:
+            with pool.lease("foo", ["b"], []):
+                pass
+            pool.evict()
+            self.assertTrue(os.path.isdir(env.get_env_dir()))
+
+    def test_evicts_by_size(self, venv_mock):
+        venv_mock.create_environment.side_effect = create_fake_environment
+        pool = VirtualEnvironmentPool(self._root, max_size=1)
+        with pool.lease("foo", ["a"], []):
+            pass
+        self.assertEqual([], self._environments())
+
+
+if __name__ == "__main__":
+    unittest.main()
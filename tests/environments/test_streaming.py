@@ -0,0 +1,107 @@
+"""
+Test runner is a library for running unit tests on Python code.
+
+It offers the opinion to automatically detect the correct run settings for
+the tests and gives information about the test results and coverage information.
+
+Test-Runner is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Test-Runner is distributed in the hope that it will be useful
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Test-Runner.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from testrunner.environments.streaming import LOG, STDERR, STDOUT, stream_shell
+
+
+def _process_alive(pid):
+    try:
+        with open("/proc/{}/stat".format(pid)) as f:
+            return f.read().split(")")[-1].split()[0] != "Z"
+    except OSError:
+        return False
+
+
+class StreamShellTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.mkdtemp()
+        self._loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self._loop.close()
+        shutil.rmtree(self._tmp_dir)
+
+    def _collect(self, script, **kwargs):
+        async def collect():
+            return [line async for line in stream_shell(script, **kwargs)]
+
+        return self._loop.run_until_complete(collect())
+
+    def test_streams(self):
+        lines = self._collect("echo a; echo b >&2; echo c", cwd=self._tmp_dir)
+        self.assertEqual(
+            ["a", "c"], [line.text for line in lines if line.stream == STDOUT]
+        )
+        self.assertEqual(["b"], [line.text for line in lines if line.stream == STDERR])
+
+    def test_working_directory(self):
+        lines = self._collect("pwd", cwd=self._tmp_dir)
+        self.assertEqual(os.path.realpath(self._tmp_dir), lines[0].text)
+
+    def test_follow_file(self):
+        log = os.path.join(self._tmp_dir, "output.log")
+        script = "echo x > output.log; sleep 0.2; echo y >> output.log; printf z >> output.log"
+        lines = self._collect(script, cwd=self._tmp_dir, follow=log, poll_interval=0.05)
+        self.assertEqual(["x", "y", "z"], [line.text for line in lines])
+        self.assertTrue(all(line.stream == LOG for line in lines))
+
+    def test_lines_arrive_while_running(self):
+        async def first_line():
+            start = time.monotonic()
+            lines = stream_shell("echo first; sleep 5", kill_timeout=1)
+            line = await lines.__anext__()
+            elapsed = time.monotonic() - start
+            await lines.aclose()
+            return line.text, elapsed
+
+        text, elapsed = self._loop.run_until_complete(first_line())
+        self.assertEqual("first", text)
+        self.assertLess(elapsed, 4)
+
+    def test_cancel_kills_process_group(self):
+        pid_file = os.path.join(self._tmp_dir, "pid")
+        script = "sleep 30 & echo $! > {}; echo started; wait".format(pid_file)
+
+        async def consume():
+            async for _ in stream_shell(script, kill_timeout=1):
+                pass
+
+        async def cancel():
+            task = asyncio.ensure_future(consume())
+            while not os.path.exists(pid_file) or os.path.getsize(pid_file) == 0:
+                await asyncio.sleep(0.05)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        self._loop.run_until_complete(cancel())
+        with open(pid_file) as f:
+            pid = int(f.read())
+        for _ in range(50):
+            if not _process_alive(pid):
+                break
+            time.sleep(0.05)
+        self.assertFalse(_process_alive(pid))
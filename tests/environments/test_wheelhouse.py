@@ -0,0 +1,170 @@
+"""
+Test runner is a library for running unit tests on Python code.
+
+It offers the opinion to automatically detect the correct run settings for
+the tests and gives information about the test results and coverage information.
+
+Test-Runner is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Test-Runner is distributed in the hope that it will be useful
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Test-Runner.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import os
+import shutil
+import stat
+import tempfile
+import time
+import unittest
+
+from pytesting_utils import IllegalArgumentException
+
+from testrunner.environments.managed_environment import ManagedEnvironment
+from testrunner.environments.wheelhouse import Wheelhouse
+from tests.environments.test_managed_environment import create_fake_environment
+
+FAKE_PIP = """#!/bin/sh
+command=$1
+shift
+links=""
+while [ $# -gt 0 ]; do
+    case "$1" in
+        --find-links) links="$links $2"; shift 2;;
+        -w) out=$2; shift 2;;
+        --no-index) shift;;
+        *) package=$1; shift;;
+    esac
+done
+echo "$command $package" >> "{log}"
+if [ "$command" = wheel ]; then
+    echo "$package" > "$out/$package-1.0-py3-none-any.whl"
+    exit 0
+fi
+for link in $links; do
+    [ -e "$link/$package-1.0-py3-none-any.whl" ] && exit 0
+done
+exit 1
+"""
+
+
+class WheelhouseTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.mkdtemp()
+        self._wheelhouse = Wheelhouse(os.path.join(self._tmp_dir, "wheels"))
+
+    def tearDown(self):
+        shutil.rmtree(self._tmp_dir)
+
+    def _stage(self, wheelhouse: Wheelhouse, wheels) -> str:
+        staging_dir = wheelhouse.create_staging_dir()
+        for name, content in wheels.items():
+            with open(os.path.join(staging_dir, name), "w") as f:
+                f.write(content)
+        return staging_dir
+
+    def test_illegal_size(self):
+        with self.assertRaises(IllegalArgumentException):
+            Wheelhouse(self._tmp_dir, max_size=-1)
+
+    def test_install_command_online(self):
+        links = self._wheelhouse.get_find_links_dir()
+        self.assertEqual(
+            "pip install --no-index --find-links {0} foo || "
+            "{{ pip wheel --find-links {0} -w /s foo && "
+            "pip install --no-index --find-links {0} --find-links /s foo; }}".format(
+                links
+            ),
+            self._wheelhouse.install_command("foo", "/s"),
+        )
+        self.assertEqual(
+            "pip install --find-links {} -e .".format(links),
+            self._wheelhouse.install_command("-e .", "/s", local=True),
+        )
+
+    def test_install_command_offline(self):
+        wheelhouse = Wheelhouse(self._tmp_dir, offline=True)
+        links = wheelhouse.get_find_links_dir()
+        self.assertTrue(wheelhouse.offline)
+        self.assertEqual(
+            "pip install --no-index --find-links {} foo".format(links),
+            wheelhouse.install_command("foo", "/s"),
+        )
+        self.assertEqual(
+            "pip install --no-index --find-links {} -e .".format(links),
+            wheelhouse.install_command("-e .", "/s", local=True),
+        )
+
+    def test_ingest_is_content_addressed(self):
+        staging_dir = self._stage(
+            self._wheelhouse,
+            {"a-1.0-py3-none-any.whl": "same", "b-1.0-py3-none-any.whl": "same"},
+        )
+        self._wheelhouse.ingest(staging_dir)
+        self.assertFalse(os.path.exists(staging_dir))
+        links = self._wheelhouse.get_find_links_dir()
+        self.assertEqual(
+            ["a-1.0-py3-none-any.whl", "b-1.0-py3-none-any.whl"],
+            sorted(os.listdir(links)),
+        )
+        self.assertEqual(
+            1, len(os.listdir(os.path.join(self._tmp_dir, "wheels", "blobs")))
+        )
+        with open(os.path.join(links, "b-1.0-py3-none-any.whl")) as f:
+            self.assertEqual("same", f.read())
+
+    def test_evicts_least_recently_used(self):
+        wheelhouse = Wheelhouse(os.path.join(self._tmp_dir, "wheels"), max_size=8)
+        wheelhouse.ingest(
+            self._stage(wheelhouse, {"old_pkg-1.0-py3-none-any.whl": "1234"})
+        )
+        wheelhouse.ingest(self._stage(wheelhouse, {"new-1.0-py3-none-any.whl": "5678"}))
+        past = time.time() - 100
+        for name in os.listdir(wheelhouse.get_find_links_dir()):
+            os.utime(os.path.join(wheelhouse.get_find_links_dir(), name), (past, past))
+        wheelhouse.mark_used(["Old.Pkg>=1.0"])
+        wheelhouse.ingest(
+            self._stage(wheelhouse, {"third-1.0-py3-none-any.whl": "9abc"})
+        )
+        self.assertEqual(
+            ["old_pkg-1.0-py3-none-any.whl", "third-1.0-py3-none-any.whl"],
+            sorted(os.listdir(wheelhouse.get_find_links_dir())),
+        )
+
+    def test_environment_fills_and_uses_wheelhouse(self):
+        env_dir = os.path.join(self._tmp_dir, "env")
+        create_fake_environment(env_dir)
+        log = os.path.join(self._tmp_dir, "pip.log")
+        with open(os.path.join(env_dir, "bin", "pip"), "w") as f:
+            f.write(FAKE_PIP.format(log=log))
+        os.chmod(
+            os.path.join(env_dir, "bin", "pip"),
+            os.stat(os.path.join(env_dir, "bin", "pip")).st_mode | stat.S_IEXEC,
+        )
+
+        for _ in range(2):
+            env = ManagedEnvironment("foo", env_dir)
+            env.use_wheelhouse(self._wheelhouse)
+            env.add_package_for_installation("bar")
+            env.run_commands(["true"])
+            os.remove(os.path.join(env_dir, ".testrunner-installed"))
+
+        with open(log) as f:
+            self.assertEqual(
+                ["install bar", "wheel bar", "install bar", "install bar"],
+                f.read().splitlines(),
+            )
+        self.assertEqual(
+            ["bar-1.0-py3-none-any.whl"],
+            os.listdir(self._wheelhouse.get_find_links_dir()),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -17,15 +17,36 @@ GNU Lesser General Public License for more details.
 You should have received a copy of the GNU Lesser General Public License
 along with Test-Runner.  If not, see <https://www.gnu.org/licenses/>.
 """
+import asyncio
 import os
 import shutil
+import stat
 import tempfile
 import unittest
-from unittest.mock import patch
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
 
 from pytesting_utils import IllegalArgumentException
 
-from testrunner.runners.abstract_runner import AbstractRunner
+from testrunner.allocation import HostTopology, ResourceAllocator
+from testrunner.coverage_mode import CoverageMode
+from testrunner.environments.streaming import LOG
+from testrunner.runners.abstract_runner import JUNIT_XML_FILE, AbstractRunner
+from testrunner.runners.coverage_report import COVERAGE_REPORT_FILE
+from testrunner.runners.junit_reader import FAILED
+from tests.environments.test_managed_environment import create_fake_environment
+
+
+def create_fake_runexec_environment(env_dir: str) -> None:
+    """Creates a fake venv whose runexec writes the output to output.log"""
+    create_fake_environment(env_dir)
+    runexec = os.path.join(env_dir, "bin", "runexec")
+    with open(runexec, "w") as f:
+        f.write(
+            '#!/bin/sh\nwhile [ "$1" != "--" ]; do shift; done\nshift\n'
+            'sh -c "$*" > output.log 2>&1\n'
+        )
+    os.chmod(runexec, os.stat(runexec).st_mode | stat.S_IEXEC)
 
 
 class AbstractRunnerTest(unittest.TestCase):
@@ -140,6 +161,270 @@ sphinx = "<=1.5.5"
         result = runner._extract_packages_from_pipfile()
         self.assertListEqual(["mock", "sphinx", "flake8", "pipenv"], result)
 
+    @patch.multiple(AbstractRunner, __abstractmethods__=set())
+    def test_run_leases_from_pool(self):
+        pool = MagicMock()
+        env = pool.lease.return_value.__enter__.return_value
+
+        def run_commands_into(commands, out, err, cwd):
+            out.write(b"out")
+            err.write(b"err")
+            return 0
+
+        env.run_commands_into.side_effect = run_commands_into
+        runner = AbstractRunner("foo", self._tmp_dir, time_limit=3, venv_pool=pool)
+        with patch.object(AbstractRunner, "_test_command", return_value="true"):
+            out, err = runner.run()
+        self.assertEqual(("out", "err"), (out, err))
+        pool.lease.assert_called_once()
+        name, packages, tooling = pool.lease.call_args[0]
+        self.assertEqual("foo", name)
+        self.assertTrue("foo" in packages)
+        self.assertEqual(["benchexec"], tooling)
+        commands, _, _, cwd = env.run_commands_into.call_args[0]
+        self.assertEqual(["runexec --timelimit=3s -- true"], commands)
+        self.assertEqual(self._tmp_dir, cwd)
+
+    @patch.multiple(AbstractRunner, __abstractmethods__=set())
+    @patch("testrunner.environments.managed_environment.virtualenv")
+    def test_concurrent_runs_in_threads(self, venv_mock):
+        venv_mock.create_environment.side_effect = create_fake_runexec_environment
+        old_dir = os.getcwd()
+        projects = []
+        for i in range(48):
+            project_dir = os.path.join(self._tmp_dir, "project{}".format(i))
+            os.mkdir(project_dir)
+            projects.append(project_dir)
+        venv_dir = os.path.join(self._tmp_dir, "venvs")
+        os.mkdir(venv_dir)
+
+        def run(project_dir):
+            runner = AbstractRunner(
+                os.path.basename(project_dir), project_dir, venv_path=venv_dir
+            )
+            return runner.run()
+
+        with patch.object(AbstractRunner, "_test_command", return_value="pwd"):
+            with ThreadPoolExecutor(max_workers=16) as executor:
+                results = list(executor.map(run, projects))
+
+        self.assertEqual(old_dir, os.getcwd())
+        self.assertEqual([], os.listdir(venv_dir))
+        for project_dir, (out, _) in zip(projects, results):
+            with open(os.path.join(project_dir, "output.log")) as f:
+                self.assertEqual(os.path.realpath(project_dir), f.read().strip())
+            self.assertTrue(out.endswith(os.path.realpath(project_dir) + "\n"))
+
+    @patch.multiple(AbstractRunner, __abstractmethods__=set())
+    @patch("testrunner.environments.managed_environment.virtualenv")
+    def test_run_spills_output(self, venv_mock):
+        venv_mock.create_environment.side_effect = create_fake_runexec_environment
+        output_dir = os.path.join(self._tmp_dir, "outputs")
+        os.mkdir(output_dir)
+        runner = AbstractRunner(
+            "foo", self._tmp_dir, output_dir=output_dir, tail_size=16
+        )
+        with patch.object(AbstractRunner, "_test_command", return_value="seq 1000"):
+            out, err = runner.run()
+        self.assertTrue(out.truncated)
+        self.assertEqual("998\n999\n1000\n", out)
+        with open(out.path) as f:
+            content = f.read()
+        self.assertTrue(content.endswith("\n".join(map(str, range(1, 1001))) + "\n"))
+        self.assertEqual(output_dir, os.path.dirname(err.path))
+
+    @patch.multiple(AbstractRunner, __abstractmethods__=set())
+    @patch("testrunner.environments.managed_environment.virtualenv")
+    def test_run_measures_resources(self, venv_mock):
+        venv_mock.create_environment.side_effect = create_fake_runexec_environment
+        runner = AbstractRunner("foo", self._tmp_dir)
+        self.assertIsNone(runner.get_resource_measurements())
+        report = 'printf "walltime=2.5s\\ncputime=1.5s\\nmemory=1024B\\n"'
+        with patch.object(AbstractRunner, "_test_command", return_value="seq 3"):
+            with patch.object(
+                AbstractRunner, "_after_test_commands", return_value=[report]
+            ):
+                runner.run()
+        measurements = runner.get_resource_measurements()
+        self.assertEqual(2.5, measurements.walltime)
+        self.assertEqual(1.5, measurements.cputime)
+        self.assertEqual(1024, measurements.memory)
+
+    @patch.multiple(AbstractRunner, __abstractmethods__=set())
+    def test_get_test_results(self):
+        runner = AbstractRunner("foo", self._tmp_dir)
+        self.assertEqual([], list(runner.get_test_results()))
+        junit_xml = os.path.join(self._tmp_dir, JUNIT_XML_FILE)
+        with open(junit_xml, "w") as f:
+            f.write(
+                '<testsuite><testcase classname="a" name="b">'
+                '<failure message="boom"/></testcase></testsuite>'
+            )
+        results = list(runner.get_test_results())
+        self.assertEqual(1, len(results))
+        self.assertEqual("a::b", results[0].node_id)
+        self.assertEqual(FAILED, results[0].outcome)
+        coverage_report = os.path.join(self._tmp_dir, COVERAGE_REPORT_FILE)
+        open(coverage_report, "w").close()
+        self.assertIsNone(runner.get_coverage())
+        runner._prepare_run(MagicMock())
+        self.assertFalse(os.path.exists(junit_xml))
+        self.assertFalse(os.path.exists(coverage_report))
+
+    @patch.multiple(AbstractRunner, __abstractmethods__=set())
+    def test_prepare_run_keeps_given_junit_xml(self):
+        junit_xml = os.path.join(self._tmp_dir, "junit.xml")
+        open(junit_xml, "w").close()
+        runner = AbstractRunner("foo", self._tmp_dir, junit_xml_file=junit_xml)
+        runner._prepare_run(MagicMock())
+        self.assertTrue(os.path.exists(junit_xml))
+
+    @patch.multiple(AbstractRunner, __abstractmethods__=set())
+    def test_lines_coverage_uses_sysmon_core(self):
+        runner = AbstractRunner(
+            "foo", self._tmp_dir, time_limit=5, coverage_mode=CoverageMode.LINES
+        )
+        runner._test_command = lambda: "pytest"
+        self.assertEqual(
+            "runexec --timelimit=5s -- env COVERAGE_CORE=sysmon pytest",
+            runner._create_command(),
+        )
+        runner._coverage_mode = CoverageMode.FULL
+        self.assertEqual("runexec --timelimit=5s -- pytest", runner._create_command())
+
+    @patch.multiple(AbstractRunner, __abstractmethods__=set())
+    def test_configuration(self):
+        with open(os.path.join(self._tmp_dir, "requirements.txt"), "w") as f:
+            f.write("six\n")
+        with patch.object(AbstractRunner, "_test_command", return_value="pytest"):
+            configuration = AbstractRunner("foo", self._tmp_dir).configuration()
+            self.assertEqual(["pytest"], configuration["commands"])
+            self.assertEqual(
+                configuration, AbstractRunner("bar", self._tmp_dir).configuration()
+            )
+            self.assertNotEqual(
+                configuration,
+                AbstractRunner("foo", self._tmp_dir, time_limit=5).configuration(),
+            )
+            with open(os.path.join(self._tmp_dir, "requirements.txt"), "a") as f:
+                f.write("attrs\n")
+            self.assertNotEqual(
+                configuration, AbstractRunner("foo", self._tmp_dir).configuration()
+            )
+
+    @patch.multiple(AbstractRunner, __abstractmethods__=set())
+    def test_resource_limits(self):
+        runner = AbstractRunner(
+            "foo",
+            self._tmp_dir,
+            time_limit=5,
+            memory_limit=1024 * 1024 * 1024,
+            cores=[3, 1, 2],
+            output_limit=4096,
+        )
+        runner._test_command = lambda: "pytest"
+        self.assertEqual(
+            "runexec --timelimit=5s --memlimit=1073741824 --cores=1,2,3 "
+            "--maxOutputSize=4096 -- pytest",
+            runner._create_command(),
+        )
+
+    @patch.multiple(AbstractRunner, __abstractmethods__=set())
+    @patch("testrunner.runners.abstract_runner._available_cores")
+    def test_core_count(self, cores_mock):
+        cores_mock.return_value = {4, 2, 6, 8}
+        runner = AbstractRunner("foo", self._tmp_dir, cores=2)
+        runner._test_command = lambda: "pytest"
+        self.assertEqual("runexec --cores=2,4 -- pytest", runner._create_command())
+        with self.assertRaises(IllegalArgumentException):
+            AbstractRunner("foo", self._tmp_dir, cores=5)
+        with self.assertRaises(IllegalArgumentException):
+            AbstractRunner("foo", self._tmp_dir, cores=[])
+        with self.assertRaises(IllegalArgumentException):
+            AbstractRunner("foo", self._tmp_dir, memory_limit=-1)
+
+    @patch.multiple(AbstractRunner, __abstractmethods__=set())
+    def test_allocated_cores(self):
+        topology = HostTopology([(0, 2), (1, 3)], {0: 0, 1: 1, 2: 0, 3: 1}, 100)
+        allocator = ResourceAllocator(
+            os.path.join(self._tmp_dir, "allocator"), topology
+        )
+        runner = AbstractRunner(
+            "foo", self._tmp_dir, memory_limit=50, shards=2, allocator=allocator
+        )
+        runner._test_command = lambda: "pytest"
+        runner._acquire_resources()
+        self.assertEqual(
+            "runexec --memlimit=50 --cores=0,2 --memoryNodes=0 -- pytest",
+            runner._create_command(),
+        )
+        self.assertEqual(50, allocator.utilization().memory_used)
+        runner._release_resources()
+        self.assertEqual(0, allocator.utilization().cores_used)
+        self.assertEqual("runexec --memlimit=50 -- pytest", runner._create_command())
+        with self.assertRaises(IllegalArgumentException):
+            AbstractRunner("foo", self._tmp_dir, cores=[0], allocator=allocator)
+
+    @patch.multiple(AbstractRunner, __abstractmethods__=set())
+    @patch("testrunner.environments.managed_environment.virtualenv")
+    def test_run_async(self, venv_mock):
+        venv_mock.create_environment.side_effect = create_fake_runexec_environment
+        venv_dir = os.path.join(self._tmp_dir, "venvs")
+        os.mkdir(venv_dir)
+        runner = AbstractRunner("foo", self._tmp_dir, venv_path=venv_dir)
+
+        async def collect():
+            return [line async for line in runner.run_async()]
+
+        loop = asyncio.new_event_loop()
+        try:
+            with patch.object(AbstractRunner, "_test_command", return_value="pwd"):
+                lines = loop.run_until_complete(collect())
+        finally:
+            loop.close()
+        log_lines = [line.text for line in lines if line.stream == LOG]
+        self.assertEqual([os.path.realpath(self._tmp_dir)], log_lines)
+        self.assertEqual([], os.listdir(venv_dir))
+
+    @patch.multiple(AbstractRunner, __abstractmethods__=set())
+    def test_cancelled_acquisition_released(self):
+        allocator_dir = os.path.join(self._tmp_dir, "allocator")
+        topology = HostTopology([(0,)], {0: 0}, 100)
+        blocker = ResourceAllocator(allocator_dir, topology)
+        blocking = blocker.acquire(1)
+        allocator = ResourceAllocator(allocator_dir, topology, poll_interval=0.01)
+        runner = AbstractRunner("foo", self._tmp_dir, allocator=allocator)
+
+        async def consume():
+            async for _ in runner.run_in_environment_async(MagicMock()):
+                pass
+
+        loop = asyncio.new_event_loop()
+        try:
+            task = loop.create_task(consume())
+            loop.run_until_complete(asyncio.sleep(0.1))
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                loop.run_until_complete(task)
+            blocker.release(blocking)
+            loop.run_until_complete(asyncio.sleep(0.3))
+        finally:
+            loop.close()
+        self.assertEqual(0, allocator.utilization().cores_used)
+        self.assertEqual(0, allocator.utilization().jobs)
+
+    @patch.multiple(AbstractRunner, __abstractmethods__=set())
+    @patch("testrunner.environments.managed_environment.virtualenv")
+    def test_run_removes_stale_output_log(self, venv_mock):
+        venv_mock.create_environment.side_effect = create_fake_runexec_environment
+        with open(os.path.join(self._tmp_dir, "output.log"), "w") as f:
+            f.write("stale\n")
+        runner = AbstractRunner("foo", self._tmp_dir)
+        with patch.object(AbstractRunner, "_run_commands", return_value=["true"]):
+            out, _ = runner.run()
+        self.assertNotIn("stale", out)
+        self.assertFalse(os.path.exists(os.path.join(self._tmp_dir, "output.log")))
+
 
 if __name__ == "__main__":
     unittest.main()
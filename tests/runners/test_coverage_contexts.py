@@ -0,0 +1,147 @@
+"""
+Test runner is a library for running unit tests on Python code.
+
+It offers the opinion to automatically detect the correct run settings for
+the tests and gives information about the test results and coverage information.
+
+Test-Runner is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Test-Runner is distributed in the hope that it will be useful
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Test-Runner.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from testrunner.runners.coverage_contexts import (
+    COVERAGE_DATA_FILE,
+    CoverageContextIndex,
+    numbits_to_lines,
+    read_coverage_contexts,
+)
+from testrunner.runners.pytest_runner import PyTestRunner
+
+
+def nums_to_numbits(lines):
+    numbits = bytearray(max(lines) // 8 + 1)
+    for line in lines:
+        numbits[line // 8] |= 1 << (line % 8)
+    return bytes(numbits)
+
+
+class CoverageContextsTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.mkdtemp()
+        self._data_file = os.path.join(self._tmp_dir, COVERAGE_DATA_FILE)
+
+    def tearDown(self):
+        shutil.rmtree(self._tmp_dir)
+
+    def _write_data_file(self, line_bits, arcs=()):
+        connection = sqlite3.connect(self._data_file)
+        connection.executescript(
+            "CREATE TABLE file (id INTEGER PRIMARY KEY, path TEXT);"
+            "CREATE TABLE context (id INTEGER PRIMARY KEY, context TEXT);"
+            "CREATE TABLE line_bits (file_id INTEGER, context_id INTEGER, "
+            "numbits BLOB);"
+            "CREATE TABLE arc (file_id INTEGER, context_id INTEGER, "
+            "fromno INTEGER, tono INTEGER);"
+        )
+        connection.executemany(
+            "INSERT INTO file VALUES (?, ?)",
+            [(1, os.path.join(self._tmp_dir, "pkg", "core.py")), (2, "/other/x.py")],
+        )
+        connection.executemany(
+            "INSERT INTO context VALUES (?, ?)",
+            [
+                (1, ""),
+                (2, "tests/test_a.py::test_one|run"),
+                (3, "test_b.py::test|setup"),
+            ],
+        )
+        connection.executemany(
+            "INSERT INTO line_bits VALUES (?, ?, ?)",
+            [(f, c, nums_to_numbits(lines)) for f, c, lines in line_bits],
+        )
+        connection.executemany("INSERT INTO arc VALUES (?, ?, ?, ?)", arcs)
+        connection.commit()
+        connection.close()
+
+    def test_numbits_to_lines(self):
+        self.assertEqual(
+            [1, 7, 8, 100], numbits_to_lines(nums_to_numbits([1, 7, 8, 100]))
+        )
+
+    def test_read_coverage_contexts(self):
+        self._write_data_file(
+            [(1, 1, [1, 2, 3]), (1, 2, [3, 10]), (1, 3, [10, 11]), (2, 2, [5])],
+            arcs=[(2, 3, -1, 7), (2, 3, 7, 8)],
+        )
+        index = read_coverage_contexts(self._data_file, self._tmp_dir)
+        self.assertEqual(["/other/x.py", "pkg/core.py"], index.files)
+        self.assertEqual(
+            ["tests/test_a.py::test_one"], index.tests_for_line("pkg/core.py", 3)
+        )
+        self.assertEqual([], index.tests_for_line("pkg/core.py", 1))
+        self.assertEqual(
+            ["test_b.py::test", "tests/test_a.py::test_one"],
+            index.tests_for_lines("pkg/core.py", range(1, 12)),
+        )
+        self.assertEqual(["test_b.py::test"], index.tests_for_line("/other/x.py", 8))
+        self.assertEqual([], index.tests_for_line("missing.py", 1))
+
+    def test_covered_lines(self):
+        index = CoverageContextIndex.from_lines({"a.py": {1: ["t1", "t2"], 4: ["t2"]}})
+        self.assertEqual({1: ["t1", "t2"], 4: ["t2"]}, index.covered_lines("a.py"))
+        self.assertEqual({}, index.covered_lines("missing.py"))
+
+    def test_update(self):
+        index = CoverageContextIndex.from_lines(
+            {
+                "a.py": {1: ["t1", "t2"], 2: ["t2"]},
+                "b.py": {1: ["t1"]},
+                "c.py": {5: ["t2"]},
+            }
+        )
+        index.update(CoverageContextIndex.from_lines({"a.py": {3: ["t2", "t3"]}}))
+        self.assertEqual(["t1"], index.tests_for_line("a.py", 1))
+        self.assertEqual([], index.tests_for_line("a.py", 2))
+        self.assertEqual(["t2", "t3"], index.tests_for_line("a.py", 3))
+        self.assertEqual(["t1"], index.tests_for_line("b.py", 1))
+        self.assertEqual(["a.py", "b.py"], index.files)
+
+    def test_save_load(self):
+        index = CoverageContextIndex.from_lines({"a.py": {1: ["t1", "t2"], 4: ["t2"]}})
+        path = os.path.join(self._tmp_dir, "index.json")
+        index.save(path)
+        loaded = CoverageContextIndex.load(path)
+        self.assertEqual(index.test_ids, loaded.test_ids)
+        self.assertEqual(["t1", "t2"], loaded.tests_for_line("a.py", 1))
+        self.assertEqual(["t2"], loaded.tests_for_line("a.py", 4))
+
+    def test_pytest_runner(self):
+        runner = PyTestRunner("pkg", self._tmp_dir, coverage_contexts=True)
+        self.assertIn(" --cov-context=test ", runner._test_command())
+        self.assertIsNone(runner.get_coverage_contexts())
+        self._write_data_file([(1, 2, [3])])
+        index = runner.get_coverage_contexts()
+        self.assertEqual(
+            ["tests/test_a.py::test_one"], index.tests_for_line("pkg/core.py", 3)
+        )
+        self.assertNotIn(
+            "--cov-context", PyTestRunner("pkg", self._tmp_dir)._test_command()
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+"""
+Test runner is a library for running unit tests on Python code.
+
+It offers the opinion to automatically detect the correct run settings for
+the tests and gives information about the test results and coverage information.
+
+Test-Runner is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Test-Runner is distributed in the hope that it will be useful
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Test-Runner.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from array import array
+
+from testrunner.runners.coverage_report import (
+    coverage_report_command,
+    display_percent,
+    read_coverage_report,
+)
+
+REPORT = {
+    "meta": {"version": "5.0"},
+    "files": {
+        "pkg/foo.py": {
+            "executed_lines": [1, 2, 4],
+            "missing_lines": [3],
+            "excluded_lines": [],
+            "summary": {
+                "covered_lines": 3,
+                "num_statements": 4,
+                "percent_covered": 75.0,
+                "missing_lines": 1,
+                "excluded_lines": 0,
+            },
+        }
+    },
+    "totals": {
+        "covered_lines": 3,
+        "num_statements": 4,
+        "percent_covered": 75.0,
+        "missing_lines": 1,
+        "excluded_lines": 0,
+    },
+}
+
+
+class CoverageReportTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.mkdtemp()
+        self._path = os.path.join(self._tmp_dir, "coverage.json")
+
+    def tearDown(self):
+        shutil.rmtree(self._tmp_dir)
+
+    def test_read_report(self):
+        with open(self._path, "w") as f:
+            json.dump(REPORT, f)
+        data = read_coverage_report(self._path)
+        self.assertEqual(4, data.statements)
+        self.assertEqual(1, data.missing)
+        self.assertEqual(75.0, data.coverage)
+        foo = data.files["pkg/foo.py"]
+        self.assertEqual(array("I", [1, 2, 4]), foo.executed_lines)
+        self.assertEqual(array("I", [3]), foo.missing_lines)
+        self.assertEqual(75.0, foo.coverage)
+
+    def test_display_percent(self):
+        self.assertEqual(87.0, display_percent(87.4))
+        self.assertEqual(88.0, display_percent(87.6))
+        self.assertEqual(1.0, display_percent(0.2))
+        self.assertEqual(99.0, display_percent(99.8))
+        self.assertEqual(100.0, display_percent(100.0))
+        self.assertEqual(0.0, display_percent(0.0))
+
+    def test_missing_or_malformed_report(self):
+        self.assertIsNone(read_coverage_report(self._path))
+        with open(self._path, "w") as f:
+            f.write('{"files": {}}')
+        self.assertIsNone(read_coverage_report(self._path))
+        with open(self._path, "w") as f:
+            f.write("{")
+        self.assertIsNone(read_coverage_report(self._path))
+
+    def test_command(self):
+        self.assertEqual(
+            "coverage json -o '/tmp/a b.json' > /dev/null 2>&1",
+            coverage_report_command("/tmp/a b.json"),
+        )
@@ -0,0 +1,139 @@
+"""
+Test runner is a library for running unit tests on Python code.
+
+It offers the opinion to automatically detect the correct run settings for
+the tests and gives information about the test results and coverage information.
+
+Test-Runner is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Test-Runner is distributed in the hope that it will be useful
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Test-Runner.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+import unittest
+
+from testrunner.runners.junit_reader import (
+    ERROR,
+    FAILED,
+    PASSED,
+    SKIPPED,
+    TestCaseResult,
+    read_junit_xml,
+)
+
+PYTEST_XML = """<?xml version="1.0" encoding="utf-8"?>
+<testsuites><testsuite name="pytest" errors="1" failures="1" skipped="1" tests="4">
+<testcase classname="tests.test_foo" name="test_pass" time="0.5"/>
+<testcase classname="tests.test_foo" name="test_fail" time="1.5">
+<failure message="assert False">long traceback</failure>
+<system-out>output</system-out>
+</testcase>
+<testcase classname="tests.test_foo" name="test_skip" time="0">
+<skipped type="pytest.skip" message="not today"/>
+</testcase>
+<testcase classname="tests.test_foo" name="test_error" time="0.1">
+<error>setup failed</error>
+</testcase>
+</testsuite></testsuites>
+"""
+
+XUNIT_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<testsuite name="nosetests" tests="2" errors="0" failures="1" skip="0">
+<testcase classname="test_bar.BarTest" name="test_ok" time="0.001"></testcase>
+<testcase classname="test_bar.BarTest" name="test_bad" time="0.002">
+<failure type="AssertionError" message="1 != 2"><![CDATA[Traceback]]></failure>
+</testcase>
+</testsuite>
+"""
+
+
+class JUnitReaderTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.mkdtemp()
+        self._path = os.path.join(self._tmp_dir, "junit.xml")
+
+    def tearDown(self):
+        shutil.rmtree(self._tmp_dir)
+
+    def _write(self, content):
+        with open(self._path, "w") as f:
+            f.write(content)
+
+    def test_pytest_xml(self):
+        self._write(PYTEST_XML)
+        self.assertEqual(
+            [
+                TestCaseResult("tests.test_foo::test_pass", PASSED, 0.5),
+                TestCaseResult("tests.test_foo::test_fail", FAILED, 1.5, "asser"),
+                TestCaseResult("tests.test_foo::test_skip", SKIPPED, 0.0, "not t"),
+                TestCaseResult("tests.test_foo::test_error", ERROR, 0.1, "setup"),
+            ],
+            list(read_junit_xml(self._path, max_message_length=5)),
+        )
+
+    def test_xunit_xml(self):
+        self._write(XUNIT_XML)
+        results = list(read_junit_xml(self._path))
+        self.assertEqual(PASSED, results[0].outcome)
+        self.assertEqual("test_bar.BarTest::test_bad", results[1].node_id)
+        self.assertEqual("1 != 2", results[1].message)
+
+    def test_pytest_junitxml_output(self):
+        with open(os.path.join(self._tmp_dir, "test_sample.py"), "w") as f:
+            f.write(
+                "def test_ok():\n    pass\n\n\ndef test_bad():\n    assert 1 == 2\n"
+            )
+        subprocess.call(
+            [
+                sys.executable,
+                "-m",
+                "pytest",
+                "-p",
+                "no:cacheprovider",
+                "--junitxml={}".format(self._path),
+                "test_sample.py",
+            ],
+            cwd=self._tmp_dir,
+            stdout=subprocess.DEVNULL,
+        )
+        outcomes = {
+            result.node_id: result.outcome for result in read_junit_xml(self._path)
+        }
+        self.assertEqual(
+            {"test_sample::test_ok": PASSED, "test_sample::test_bad": FAILED},
+            outcomes,
+        )
+
+    def test_memory_stays_flat(self):
+        count = 50000
+        with open(self._path, "w") as f:
+            f.write('<testsuites><testsuite name="big">\n')
+            for i in range(count):
+                f.write(
+                    '<testcase classname="c" name="t{}" time="0.1">'
+                    '<failure message="m">{}</failure></testcase>\n'.format(
+                        i, "x" * 100
+                    )
+                )
+            f.write("</testsuite></testsuites>\n")
+        tracemalloc.start()
+        try:
+            read = sum(1 for _ in read_junit_xml(self._path))
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(count, read)
+        self.assertLess(peak, 4 * 1024 * 1024)
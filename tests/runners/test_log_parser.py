@@ -0,0 +1,112 @@
+"""
+Test runner is a library for running unit tests on Python code.
+
+It offers the opinion to automatically detect the correct run settings for
+the tests and gives information about the test results and coverage information.
+
+Test-Runner is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Test-Runner is distributed in the hope that it will be useful
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Test-Runner.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from pytesting_utils import IllegalArgumentException
+
+from testrunner.environments.capture import CapturedOutput
+from testrunner.runners.log_parser import (
+    LogParser,
+    LogPattern,
+    count_passed,
+    create_run_result,
+)
+
+
+class LogParserTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.mkdtemp()
+        self._parser = LogParser(
+            [
+                LogPattern("Ran ", r"Ran (?P<ran>[0-9]+) tests in (?P<time>[0-9.]+)s"),
+                LogPattern(
+                    "TOTAL",
+                    r"TOTAL\s+(?P<statements>[0-9]+)\s+(?P<coverage>[0-9]+)%",
+                    fallback=LogPattern(
+                        "SUM", r"SUM\s+(?P<statements>[0-9]+)\s+(?P<coverage>[0-9]+)%"
+                    ),
+                ),
+            ]
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self._tmp_dir)
+
+    def test_empty_keyword(self):
+        with self.assertRaises(IllegalArgumentException):
+            LogPattern("", r"foo")
+
+    def test_last_match_wins(self):
+        values = self._parser.parse(
+            "Ran 1 tests in 1.0s\nTOTAL 1 1%\nRan 2 tests in 2.5s\nTOTAL 2 2%"
+        )
+        self.assertEqual(
+            {"ran": 2, "time": 2.5, "statements": 2, "coverage": 2.0}, values
+        )
+        self.assertIsInstance(values["ran"], int)
+        self.assertIsInstance(values["coverage"], float)
+
+    def test_keyword_without_match(self):
+        values = self._parser.parse("TOTAL 3 3%\nRan 4 tests in 1s\nTOTAL of nothing")
+        self.assertEqual(3, values["statements"])
+
+    def test_fallback(self):
+        values = self._parser.parse("SUM 5 50%\nRan 4 tests")
+        self.assertEqual({"statements": 5, "coverage": 50.0}, values)
+
+    def test_no_match(self):
+        self.assertEqual({}, self._parser.parse(""))
+        self.assertEqual({}, self._parser.parse("foo\nbar"))
+
+    def test_parse_file(self):
+        path = os.path.join(self._tmp_dir, "output.log")
+        with open(path, "w") as f:
+            f.write("TOTAL 7 70%\n")
+            f.write("noise\n" * 1000)
+            f.write("Ran 3 tests in 0.5s\n")
+        values = self._parser.parse_file(path)
+        self.assertEqual(
+            {"ran": 3, "time": 0.5, "statements": 7, "coverage": 70.0}, values
+        )
+        open(path, "w").close()
+        self.assertEqual({}, self._parser.parse_file(path))
+
+    def test_captured_output_falls_back_to_spill_file(self):
+        path = os.path.join(self._tmp_dir, "output.log")
+        with open(path, "w") as f:
+            f.write("TOTAL 7 70%\nRan 3 tests in 0.5s\n")
+        tail = CapturedOutput("Ran 3 tests in 0.5s\n", path, 32)
+        self.assertEqual(70.0, self._parser.parse(tail)["coverage"])
+        complete = CapturedOutput("Ran 3 tests in 0.5s\n", path)
+        self.assertNotIn("coverage", self._parser.parse(complete))
+
+    def test_create_run_result(self):
+        values = {"ran": 10, "failed": 2, "skipped": 1, "time": 1.5}
+        values["passed"] = count_passed(values, "ran", ("failed", "skipped"))
+        result = create_run_result(values, "foo")
+        self.assertEqual(7, result.passed)
+        self.assertEqual(2, result.failed)
+        self.assertEqual(1.5, result.time)
+        self.assertEqual(-1, result.statements)
+        self.assertEqual("foo", result.runner)
+        self.assertEqual(-3, count_passed({"failed": 2}, "ran", ("failed",)))
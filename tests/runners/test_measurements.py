@@ -0,0 +1,103 @@
+"""
+Test runner is a library for running unit tests on Python code.
+
+It offers the opinion to automatically detect the correct run settings for
+the tests and gives information about the test results and coverage information.
+
+Test-Runner is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Test-Runner is distributed in the hope that it will be useful
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Test-Runner.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import io
+import unittest
+
+from testrunner.runners.log_parser import create_run_result
+from testrunner.runners.measurements import (
+    ResourceMeasurements,
+    RunStatus,
+    parse_measurements,
+    read_measurements,
+)
+
+RUNEXEC_OUTPUT = """Collecting six
+starttime=2020-04-01T12:00:00.000000+02:00
+returnvalue=256
+walltime=12.5s
+cputime=10.25s
+cputime-cpu0=10.25s
+memory=52428800B
+blkio-read=4096B
+blkio-write=0B
+"""
+
+
+class MeasurementsTest(unittest.TestCase):
+    def test_parse(self):
+        measurements = parse_measurements(RUNEXEC_OUTPUT.splitlines())
+        self.assertEqual(
+            ResourceMeasurements(
+                walltime=12.5,
+                cputime=10.25,
+                memory=52428800,
+                blkio_read=4096,
+                blkio_write=0,
+                return_value=256,
+            ),
+            measurements,
+        )
+
+    def test_parse_shards(self):
+        lines = RUNEXEC_OUTPUT.splitlines() + [
+            "returnvalue=0",
+            "walltime=20.0s",
+            "cputime=1.75s",
+            "memory=1000B",
+            "terminationreason=walltime",
+        ]
+        measurements = parse_measurements(lines)
+        self.assertEqual(20.0, measurements.walltime)
+        self.assertEqual(12.0, measurements.cputime)
+        self.assertEqual(52429800, measurements.memory)
+        self.assertEqual(256, measurements.return_value)
+        self.assertEqual("walltime", measurements.termination_reason)
+
+    def test_parse_without_measurements(self):
+        self.assertIsNone(parse_measurements(["foo=bar", "walltime=unknown"]))
+
+    def test_read_measurements(self):
+        output = io.BytesIO(RUNEXEC_OUTPUT.encode() + b"x" * 1000 + b"=\n")
+        output.seek(0, io.SEEK_END)
+        self.assertEqual(12.5, read_measurements(output).walltime)
+
+    def test_status(self):
+        self.assertEqual(RunStatus.COMPLETED, ResourceMeasurements().status)
+        self.assertEqual(
+            RunStatus.TIMEOUT, ResourceMeasurements(termination_reason="cputime").status
+        )
+        self.assertEqual(
+            RunStatus.OUT_OF_MEMORY,
+            ResourceMeasurements(termination_reason="memory").status,
+        )
+        self.assertEqual(
+            RunStatus.KILLED, ResourceMeasurements(termination_reason="killed").status
+        )
+
+    def test_run_result(self):
+        measurements = ResourceMeasurements(walltime=1.0)
+        result = create_run_result({"passed": 3}, "pytest", measurements)
+        self.assertEqual(measurements, result.resources)
+        self.assertEqual(RunStatus.COMPLETED, result.status)
+        self.assertIsNone(create_run_result({}, "pytest").resources)
+
+
+if __name__ == "__main__":
+    unittest.main()
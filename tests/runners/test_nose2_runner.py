@@ -24,6 +24,7 @@ from unittest import skip
 
 from git import Repo
 
+from testrunner.coverage_mode import CoverageMode
 from testrunner.runners.nose2_runner import Nose2Runner
 
 
@@ -128,6 +129,18 @@ FAILED (errors=2, skipped=3, expected failures=4, unexpected successes=5)
         result = runner.get_run_result("Ran 10 tests in 42.424s\nFAILED (errors=1)")
         self.assertEqual(1, result.error)
 
+    def test_command_writes_junit_xml(self):
+        runner = Nose2Runner("test", self._tmp_dir, junit_xml_file="/tmp/my junit.xml")
+        self.assertIn(
+            "--junit-xml --junit-xml-path='/tmp/my junit.xml'", runner._test_command()
+        )
+
+    def test_coverage_off(self):
+        runner = Nose2Runner("test", self._tmp_dir, coverage_mode=CoverageMode.OFF)
+        self.assertNotIn("--with-coverage", runner._test_command())
+        self.assertEqual(["nose2", "benchexec"], runner._tooling_packages())
+        self.assertEqual([], runner._after_test_commands())
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -17,6 +17,7 @@ GNU Lesser General Public License for more details.
 You should have received a copy of the GNU Lesser General Public License
 along with Test-Runner.  If not, see <https://www.gnu.org/licenses/>.
 """
+import os
 import shutil
 import tempfile
 import unittest
@@ -24,6 +25,8 @@ from unittest import skip
 
 from git import Repo
 
+from testrunner.coverage_mode import CoverageMode
+from testrunner.runners.coverage_report import COVERAGE_REPORT_FILE
 from testrunner.runners.nose_runner import NoseRunner
 
 
@@ -126,6 +129,39 @@ FAILED (DEPRECATED=1, errors=2, failures=3, SKIP=4, TODO=5)
         result = runner.get_run_result("Ran 10 tests in 42.424s\nFAILED (errors=1)")
         self.assertEqual(1, result.error)
 
+    def test_coverage_from_report(self):
+        with open(os.path.join(self._tmp_dir, COVERAGE_REPORT_FILE), "w") as f:
+            f.write(
+                '{"files": {}, "totals": {"num_statements": 48, '
+                '"missing_lines": 5, "percent_covered": 89.58333333333333}}'
+            )
+        runner = NoseRunner("test", self._tmp_dir)
+        result = runner.get_run_result("TOTAL 47 21 42%\nRan 2 tests in 1.0s")
+        self.assertEqual(48, result.statements)
+        self.assertEqual(5, result.missing)
+        self.assertEqual(90.0, result.coverage)
+        self.assertEqual(2, result.passed)
+        self.assertEqual(
+            [
+                "coverage json -o {} > /dev/null 2>&1".format(
+                    os.path.join(self._tmp_dir, COVERAGE_REPORT_FILE)
+                )
+            ],
+            runner._after_test_commands(),
+        )
+
+    def test_command_writes_junit_xml(self):
+        runner = NoseRunner("test", self._tmp_dir, junit_xml_file="/tmp/my junit.xml")
+        self.assertIn(
+            "--with-xunit --xunit-file='/tmp/my junit.xml'", runner._test_command()
+        )
+
+    def test_coverage_off(self):
+        runner = NoseRunner("test", self._tmp_dir, coverage_mode=CoverageMode.OFF)
+        self.assertNotIn("--with-coverage", runner._test_command())
+        self.assertNotIn("coverage", runner._tooling_packages())
+        self.assertEqual([], runner._after_test_commands())
+
 
 if __name__ == "__main__":
     unittest.main()
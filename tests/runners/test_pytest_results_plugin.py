@@ -0,0 +1,149 @@
+"""
+Test runner is a library for running unit tests on Python code.
+
+It offers the opinion to automatically detect the correct run settings for
+the tests and gives information about the test results and coverage information.
+
+Test-Runner is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Test-Runner is distributed in the hope that it will be useful
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Test-Runner.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from testrunner.runners.pytest_runner import read_results_summary
+
+TESTS = """
+import warnings
+
+import pytest
+
+
+@pytest.fixture
+def broken():
+    raise RuntimeError("broken fixture")
+
+
+def test_pass():
+    warnings.warn(UserWarning("careful"))
+
+
+def test_pass_too():
+    pass
+
+
+def test_fail():
+    assert False
+
+
+@pytest.mark.skip(reason="skipped")
+def test_skip():
+    pass
+
+
+@pytest.mark.xfail
+def test_xfail():
+    assert False
+
+
+def test_error(broken):
+    pass
+"""
+
+
+class PyTestResultsPluginTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.mkdtemp()
+        with open(os.path.join(self._tmp_dir, "test_sample.py"), "w") as f:
+            f.write(TESTS)
+        self._results = os.path.join(self._tmp_dir, "results.jsonl")
+
+    def tearDown(self):
+        shutil.rmtree(self._tmp_dir)
+
+    def _run_pytest(self, *options):
+        root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+        subprocess.call(
+            [
+                sys.executable,
+                "-m",
+                "pytest",
+                "-p",
+                "testrunner.runners.pytest_results_plugin",
+                "--testrunner-results={}".format(self._results),
+                "-p",
+                "no:cacheprovider",
+                "test_sample.py",
+                *options,
+            ],
+            cwd=self._tmp_dir,
+            env=dict(os.environ, PYTHONPATH=os.path.abspath(root)),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+
+    def test_results_file(self):
+        self._run_pytest()
+        with open(self._results) as f:
+            records = [json.loads(line) for line in f]
+        tests = {
+            record["nodeid"].split("::")[1]: record["outcome"]
+            for record in records
+            if record["type"] == "test"
+        }
+        self.assertEqual(
+            {
+                "test_pass": "passed",
+                "test_pass_too": "passed",
+                "test_fail": "failed",
+                "test_skip": "skipped",
+                "test_xfail": "xfailed",
+                "test_error": "error",
+            },
+            tests,
+        )
+        self.assertEqual("summary", records[-1]["type"])
+        summary = read_results_summary(self._results)
+        self.assertEqual(2, summary["passed"])
+        self.assertEqual(1, summary["failed"])
+        self.assertEqual(2, summary["skipped"])
+        self.assertEqual(1, summary["error"])
+        self.assertEqual(1, summary["warnings"])
+        self.assertGreater(summary["time"], 0)
+
+    def test_collect_and_select(self):
+        collected = os.path.join(self._tmp_dir, "collected.txt")
+        self._run_pytest("--collect-only", "--testrunner-collect={}".format(collected))
+        with open(collected) as f:
+            node_ids = f.read().splitlines()
+        self.assertEqual(6, len(node_ids))
+        self.assertEqual("test_sample.py::test_pass", node_ids[0])
+
+        selection = os.path.join(self._tmp_dir, "selection.txt")
+        with open(selection, "w") as f:
+            f.write("test_sample.py::test_pass_too\ntest_sample.py::test_fail\n")
+        self._run_pytest("--testrunner-select={}".format(selection))
+        summary = read_results_summary(self._results)
+        self.assertEqual(1, summary["passed"])
+        self.assertEqual(1, summary["failed"])
+        self.assertEqual(0, summary["skipped"])
+
+    def test_incomplete_results_file(self):
+        self.assertEqual({}, read_results_summary(self._results))
+        with open(self._results, "w") as f:
+            f.write('{"type": "test", "outcome": "passed"}\n')
+        self.assertEqual({}, read_results_summary(self._results))
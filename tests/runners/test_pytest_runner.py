@@ -27,8 +27,15 @@ from unittest.mock import MagicMock
 
 from git import Repo
 
+from testrunner.runners import pytest_runner
 from testrunner.runners.abstract_runner import RunResult
-from testrunner.runners.pytest_runner import PyTestRunner
+from testrunner.runners.coverage_contexts import COVERAGE_DATA_FILE
+from testrunner.runners.coverage_report import COVERAGE_REPORT_FILE
+from testrunner.runners.pytest_runner import (
+    RESULTS_FILE,
+    PyTestRunner,
+    read_results_summary,
+)
 
 
 class VenvMock(MagicMock):
@@ -41,9 +48,14 @@ class VenvMock(MagicMock):
     def add_package_for_installation(self, package: str) -> None:
         pass
 
-    def run_commands(self, commands: List[str]) -> Tuple[str, str]:
+    def run_commands(self, commands: List[str], cwd: str = None) -> Tuple[str, str]:
         return "out", "err"
 
+    def run_commands_into(self, commands: List[str], out, err, cwd=None) -> int:
+        out.write(b"out")
+        err.write(b"err")
+        return 0
+
 
 class PyTestRunnerTest(unittest.TestCase):
     def setUp(self):
@@ -79,7 +91,7 @@ TOTAL                              39      5    87%
         self.assertFalse("error" in err.lower())
         self.assertTrue("passed" in out.lower())
 
-    @mock.patch("testrunner.runners.pytest_runner.virtualenv")
+    @mock.patch("testrunner.runners.abstract_runner.temporary_environment")
     def test_run_with_minus(self, venv_mock: MagicMock):
         def create_mock(project_name: str):
             return VenvMock(project_name)
@@ -94,7 +106,7 @@ TOTAL                              39      5    87%
         self.assertEqual("out", o)
         self.assertEqual("err", e)
 
-    @mock.patch("testrunner.runners.pytest_runner.virtualenv")
+    @mock.patch("testrunner.runners.abstract_runner.temporary_environment")
     def test_run_with_underscore(self, venv_mock: MagicMock):
         def create_mock(project_name: str):
             return VenvMock(project_name)
@@ -109,7 +121,7 @@ TOTAL                              39      5    87%
         self.assertEqual("out", o)
         self.assertEqual("err", e)
 
-    @mock.patch("testrunner.runners.pytest_runner.virtualenv")
+    @mock.patch("testrunner.runners.abstract_runner.temporary_environment")
     def test_run_with_underscore_to_minus(self, venv_mock: MagicMock):
         def create_mock(project_name: str):
             return VenvMock(project_name)
@@ -124,6 +136,178 @@ TOTAL                              39      5    87%
         self.assertEqual("out", o)
         self.assertEqual("err", e)
 
+    def test_command_independent_of_working_directory(self):
+        os.mkdir(os.path.join(self._dummy_dir, "testfoo"))
+        r = PyTestRunner("test-foo", self._dummy_dir)
+        self.assertTrue(r._test_command().startswith("pytest --cov=testfoo "))
+
+    def test_prepare_run_injects_plugin(self):
+        site_packages = os.path.join(self._dummy_dir, "site-packages")
+        os.mkdir(site_packages)
+        results = os.path.join(self._dummy_dir, RESULTS_FILE)
+        open(results, "w").close()
+        env = MagicMock()
+        env.get_site_packages_dir.return_value = site_packages
+        r = PyTestRunner("test", self._dummy_dir)
+        r._prepare_run(env)
+        self.assertFalse(os.path.exists(results))
+        self.assertTrue(
+            os.path.isfile(os.path.join(site_packages, "testrunner_pytest_results.py"))
+        )
+        self.assertIn(
+            "-p testrunner_pytest_results --testrunner-results={}".format(results),
+            r._test_command(),
+        )
+
+    def test_sharded_run(self):
+        def collect(commands, cwd):
+            with open(os.path.join(cwd, ".testrunner-collected.txt"), "w") as f:
+                f.write("test_a.py::test_1\ntest_a.py::test_2\ntest_b.py::test_1\n")
+
+        env = MagicMock()
+        env.get_site_packages_dir.return_value = self._dummy_dir
+        env.run_commands.side_effect = collect
+        r = PyTestRunner("test", self._dummy_dir, shards=2)
+        r._prepare_run(env)
+        with open(os.path.join(self._dummy_dir, ".testrunner-shard-1.txt")) as f:
+            self.assertEqual("test_b.py::test_1\n", f.read())
+
+        commands = r._run_commands()
+        shard = os.path.join(self._dummy_dir, ".testrunner-shard-0")
+        self.assertTrue(commands[0].startswith("runexec --no-container "))
+        self.assertIn(
+            "--output={}.log -- env COVERAGE_FILE=".format(shard), commands[0]
+        )
+        self.assertTrue(
+            commands[0].endswith("--testrunner-select={}.txt &".format(shard))
+        )
+        self.assertEqual("wait", commands[2])
+        self.assertTrue(commands[3].endswith("> output.log"))
+        self.assertTrue(commands[4].startswith("coverage combine "))
+        self.assertTrue(commands[5].startswith("coverage json "))
+
+        with open(shard + ".jsonl", "w") as f:
+            f.write(
+                '{"duration": 1.5, "error": 0, "exitstatus": 0, "failed": 0, '
+                '"passed": 2, "skipped": 0, "type": "summary", "warnings": 0, '
+                '"xfailed": 0, "xpassed": 0}\n'
+            )
+        r._finish_run()
+        self.assertFalse(os.path.exists(shard + ".txt"))
+        self.assertFalse(os.path.exists(shard + ".jsonl"))
+        self.assertEqual({}, read_results_summary(r._results_file()))
+        plan = r.get_shard_plan()
+        self.assertEqual([2.0, 1.0], plan.predicted)
+        self.assertEqual([1.5, -1.0], plan.actual)
+
+    def test_sharded_run_splits_limits(self):
+        def collect(commands, cwd):
+            with open(os.path.join(cwd, ".testrunner-collected.txt"), "w") as f:
+                f.write("test_a.py::test_1\ntest_b.py::test_1\ntest_c.py::test_1\n")
+
+        env = MagicMock()
+        env.get_site_packages_dir.return_value = self._dummy_dir
+        env.run_commands.side_effect = collect
+        r = PyTestRunner(
+            "test", self._dummy_dir, shards=3, memory_limit=3000, cores=[0, 1, 2, 3]
+        )
+        r._prepare_run(env)
+        commands = r._run_commands()
+        self.assertIn("--memlimit=1000 --cores=0 --", commands[0])
+        self.assertIn("--memlimit=1000 --cores=1 --", commands[1])
+        self.assertIn("--memlimit=1000 --cores=2,3 --", commands[2])
+
+        r = PyTestRunner(
+            "test", self._dummy_dir, shards=3, memory_limit=3000, cores=[4, 5]
+        )
+        r._prepare_run(env)
+        commands = r._run_commands()
+        self.assertIn("--cores=4 --", commands[0])
+        self.assertIn("--cores=5 --", commands[1])
+        self.assertIn("--cores=4 --", commands[2])
+
+    def test_sharded_run_balanced_by_previous_run(self):
+        def collect(commands, cwd):
+            with open(os.path.join(cwd, ".testrunner-collected.txt"), "w") as f:
+                f.write("test_a.py::test_1\ntest_a.py::test_2\ntest_b.py::test_1\n")
+
+        with open(os.path.join(self._dummy_dir, ".testrunner-junit.xml"), "w") as f:
+            f.write('<testsuite><testcase classname="test_a" name="test_1" time="9"/>')
+            f.write("</testsuite>")
+        env = MagicMock()
+        env.get_site_packages_dir.return_value = self._dummy_dir
+        env.run_commands.side_effect = collect
+        r = PyTestRunner("test", self._dummy_dir, shards=2)
+        r._prepare_run(env)
+        self.assertEqual(
+            [["test_a.py::test_1", "test_b.py::test_1"], ["test_a.py::test_2"]],
+            r.get_shard_plan().shards,
+        )
+        self.assertEqual(18.0, r.get_shard_plan().predicted_makespan)
+
+    def test_get_result_from_results_file(self):
+        with open(os.path.join(self._dummy_dir, RESULTS_FILE), "w") as f:
+            f.write(
+                '{"duration": 1.5, "error": 1, "exitstatus": 1, "failed": 2, '
+                '"passed": 3, "skipped": 4, "type": "summary", "warnings": 5, '
+                '"xfailed": 1, "xpassed": 0}\n'
+            )
+        r = PyTestRunner("test", self._dummy_dir)
+        result = r.get_run_result(self._output)
+        self.assertEqual(3, result.passed)
+        self.assertEqual(2, result.failed)
+        self.assertEqual(5, result.skipped)
+        self.assertEqual(5, result.warnings)
+        self.assertEqual(1, result.error)
+        self.assertEqual(1.5, result.time)
+        self.assertEqual(87.0, result.coverage)
+
+    def test_results_file_replaces_log_summary(self):
+        with open(os.path.join(self._dummy_dir, RESULTS_FILE), "w") as f:
+            f.write(
+                '{"duration": 1.5, "error": 0, "exitstatus": 0, "failed": 0, '
+                '"passed": 3, "skipped": 0, "type": "summary", "warnings": 0, '
+                '"xfailed": 0, "xpassed": 0}\n'
+            )
+        r = PyTestRunner("test", self._dummy_dir)
+        with mock.patch.object(pytest_runner._SUMMARY_PARSER, "parse") as parse:
+            result = r.get_run_result(self._output)
+        parse.assert_not_called()
+        self.assertEqual(3, result.passed)
+        self.assertEqual(87.0, result.coverage)
+
+    def test_stale_files_not_in_result(self):
+        site_packages = os.path.join(self._dummy_dir, "site-packages")
+        os.mkdir(site_packages)
+        with open(os.path.join(self._dummy_dir, RESULTS_FILE), "w") as f:
+            f.write(
+                '{"duration": 1.5, "error": 0, "exitstatus": 0, "failed": 0, '
+                '"passed": 3, "skipped": 0, "type": "summary", "warnings": 0, '
+                '"xfailed": 0, "xpassed": 0}\n'
+            )
+        with open(os.path.join(self._dummy_dir, COVERAGE_REPORT_FILE), "w") as f:
+            f.write(
+                '{"files": {}, "totals": {"num_statements": 10, '
+                '"missing_lines": 0, "percent_covered": 100.0}}'
+            )
+        open(os.path.join(self._dummy_dir, COVERAGE_DATA_FILE), "w").close()
+        env = MagicMock()
+        env.get_site_packages_dir.return_value = site_packages
+        r = PyTestRunner("test", self._dummy_dir)
+        self.assertEqual(10, r.get_run_result(self._output).statements)
+        r._prepare_run(env)
+        self.assertEqual(["site-packages"], os.listdir(self._dummy_dir))
+        result = r.get_run_result(self._output)
+        self.assertEqual(13, result.passed)
+        self.assertEqual(39, result.statements)
+        self.assertEqual(87.0, result.coverage)
+
+    def test_get_result_without_results_file(self):
+        r = PyTestRunner("test", self._dummy_dir)
+        result = r.get_run_result(self._output)
+        self.assertEqual(13, result.passed)
+        self.assertEqual(0.06, result.time)
+
     def test_get_total_result(self):
         result = self._dummy_runner.get_run_result(self._output)
         self.assertEqual(39, result.statements)
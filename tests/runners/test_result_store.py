@@ -0,0 +1,113 @@
+"""
+Test runner is a library for running unit tests on Python code.
+
+It offers the opinion to automatically detect the correct run settings for
+the tests and gives information about the test results and coverage information.
+
+Test-Runner is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Test-Runner is distributed in the hope that it will be useful
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Test-Runner.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from pytesting_utils import IllegalArgumentException, IllegalStateException
+
+from testrunner.runners.junit_reader import (
+    ERROR,
+    FAILED,
+    PASSED,
+    SKIPPED,
+    TestCaseResult,
+)
+from testrunner.runners.result_store import ModuleTotals, TestResultStore
+
+
+class TestResultStoreTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.mkdtemp()
+        self._store = TestResultStore.from_results(
+            [
+                TestCaseResult("tests.a::test_1", PASSED, 0.5),
+                TestCaseResult("tests.a::test_2", FAILED, 2.0, "boom"),
+                TestCaseResult("tests.b::test_1", SKIPPED, 0.0),
+                TestCaseResult("tests.b::test_2", ERROR, 1.0),
+                TestCaseResult("tests.a::test_1", PASSED, 0.25),
+            ]
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self._tmp_dir)
+
+    def _check_store(self, store):
+        self.assertEqual(5, len(store))
+        self.assertEqual(TestCaseResult("tests.a::test_2", FAILED, 2.0), store[1])
+        self.assertEqual("tests.a::test_1", store.node_id(4))
+        self.assertEqual(
+            {PASSED: 2, FAILED: 1, ERROR: 1, SKIPPED: 1}, store.count_by_outcome()
+        )
+        self.assertEqual(
+            ["tests.a::test_2", "tests.b::test_2"],
+            [result.node_id for result in store.slowest(2)],
+        )
+        self.assertEqual(
+            {
+                "tests.a": ModuleTotals(
+                    3, 2.75, {PASSED: 2, FAILED: 1, ERROR: 0, SKIPPED: 0}
+                ),
+                "tests.b": ModuleTotals(
+                    2, 1.0, {PASSED: 0, FAILED: 0, ERROR: 1, SKIPPED: 1}
+                ),
+            },
+            store.module_totals(),
+        )
+
+    def test_aggregations(self):
+        self._check_store(self._store)
+
+    def test_ids_interned(self):
+        self.assertEqual(
+            len("tests.a::test_1tests.a::test_2tests.b::test_1tests.b::test_2"),
+            len(self._store._strings),
+        )
+
+    def test_unknown_outcome(self):
+        with self.assertRaises(IllegalArgumentException):
+            self._store.add("foo", "unknown", 1.0)
+
+    def test_save_and_load(self):
+        path = os.path.join(self._tmp_dir, "results.store")
+        self._store.save(path)
+        with TestResultStore.load(path) as store:
+            self._check_store(store)
+            self.assertIsInstance(store._outcomes, memoryview)
+            with self.assertRaises(IllegalStateException):
+                store.add("foo", PASSED, 1.0)
+        self.assertEqual(0, len(store))
+
+    def test_load_incompatible_file(self):
+        path = os.path.join(self._tmp_dir, "results.store")
+        with open(path, "wb") as f:
+            f.write(b"\0" * 64)
+        with self.assertRaises(IllegalStateException):
+            TestResultStore.load(path)
+
+    def test_empty_store(self):
+        store = TestResultStore()
+        path = os.path.join(self._tmp_dir, "empty.store")
+        store.save(path)
+        with TestResultStore.load(path) as loaded:
+            self.assertEqual(0, len(loaded))
+            self.assertEqual([], loaded.slowest(3))
+            self.assertEqual({}, loaded.module_totals())
@@ -0,0 +1,171 @@
+"""
+Test runner is a library for running unit tests on Python code.
+
+It offers the opinion to automatically detect the correct run settings for
+the tests and gives information about the test results and coverage information.
+
+Test-Runner is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Test-Runner is distributed in the hope that it will be useful
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Test-Runner.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from testrunner.runners.junit_reader import FAILED, PASSED, read_junit_xml
+from testrunner.runners.pytest_runner import read_results_summary
+from testrunner.runners.result_store import TestResultStore
+from testrunner.runners.sharding import (
+    junit_test_id,
+    merge_junit_xml,
+    merge_results_files,
+    plan_shards,
+    recorded_durations,
+    split_into_shards,
+)
+
+
+class SplitIntoShardsTest(unittest.TestCase):
+    def test_keeps_modules_together(self):
+        node_ids = [
+            "test_a.py::test_1",
+            "test_a.py::test_2",
+            "test_a.py::test_3",
+            "test_b.py::test_1",
+            "test_b.py::test_2",
+            "test_c.py::test_1",
+        ]
+        shards = split_into_shards(node_ids, 2)
+        self.assertEqual(
+            [
+                ["test_a.py::test_1", "test_a.py::test_2", "test_a.py::test_3"],
+                ["test_b.py::test_1", "test_b.py::test_2", "test_c.py::test_1"],
+            ],
+            shards,
+        )
+
+    def test_drops_empty_shards(self):
+        self.assertEqual(
+            [["test_a.py::test_1"]], split_into_shards(["test_a.py::test_1"], 4)
+        )
+        self.assertEqual([], split_into_shards([], 4))
+
+
+class PlanShardsTest(unittest.TestCase):
+    def test_longest_first(self):
+        node_ids = ["t.py::a", "t.py::b", "t.py::c", "t.py::d", "t.py::e"]
+        durations = {"t::a": 2.0, "t::b": 7.0, "t::c": 3.0, "t::d": 5.0}
+        plan = plan_shards(node_ids, 2, durations)
+        # b and d go to separate shards, the unknown e costs the median 4.0
+        self.assertEqual(
+            [["t.py::b", "t.py::c"], ["t.py::a", "t.py::d", "t.py::e"]], plan.shards
+        )
+        self.assertEqual([10.0, 11.0], plan.predicted)
+        self.assertEqual(11.0, plan.predicted_makespan)
+        self.assertEqual(-1.0, plan.actual_makespan)
+
+    def test_without_durations(self):
+        plan = plan_shards(["a.py::t", "a.py::u", "b.py::t"], 2, {})
+        self.assertEqual([["a.py::t", "a.py::u"], ["b.py::t"]], plan.shards)
+        self.assertEqual([2.0, 1.0], plan.predicted)
+
+    def test_junit_test_id(self):
+        self.assertEqual(
+            "tests.test_a::test_b", junit_test_id("tests/test_a.py::test_b")
+        )
+        self.assertEqual(
+            "tests.test_a.Test::test_b[x/y::z]",
+            junit_test_id("tests/test_a.py::Test::test_b[x/y::z]"),
+        )
+        self.assertEqual("tests.test_a", junit_test_id("tests/test_a.py"))
+
+    def test_recorded_durations(self):
+        store = TestResultStore()
+        store.add("t::a", PASSED, 1.0)
+        store.add("t::a", FAILED, 3.0)
+        store.add("t::b", PASSED, 0.5)
+        self.assertEqual({"t::a": 2.0, "t::b": 0.5}, recorded_durations(store))
+
+
+class MergeTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self._tmp_dir)
+
+    def _write(self, name, content):
+        path = os.path.join(self._tmp_dir, name)
+        with open(path, "w") as f:
+            f.write(content)
+        return path
+
+    def _summary(self, passed, duration):
+        return json.dumps(
+            {
+                "type": "summary",
+                "exitstatus": 0,
+                "duration": duration,
+                "passed": passed,
+                "failed": 1,
+                "skipped": 0,
+                "error": 0,
+                "xfailed": 0,
+                "xpassed": 0,
+                "warnings": 2,
+            }
+        )
+
+    def test_merge_results_files(self):
+        first = self._write(
+            "0.jsonl", '{"type": "test"}\n' + self._summary(3, 2.0) + "\n"
+        )
+        second = self._write("1.jsonl", self._summary(4, 5.0) + "\n")
+        target = os.path.join(self._tmp_dir, "merged.jsonl")
+        merge_results_files([first, second], target)
+        summary = read_results_summary(target)
+        self.assertEqual(7, summary["passed"])
+        self.assertEqual(2, summary["failed"])
+        self.assertEqual(4, summary["warnings"])
+        self.assertEqual(5.0, summary["time"])
+        with open(target) as f:
+            self.assertEqual('{"type": "test"}\n', f.readline())
+
+    def test_merge_incomplete_results_files(self):
+        first = self._write("0.jsonl", self._summary(3, 2.0) + "\n")
+        target = os.path.join(self._tmp_dir, "merged.jsonl")
+        merge_results_files([first, os.path.join(self._tmp_dir, "missing")], target)
+        self.assertEqual({}, read_results_summary(target))
+
+    def test_merge_junit_xml(self):
+        first = self._write(
+            "0.xml",
+            '<testsuites><testsuite name="pytest">'
+            '<testcase classname="a" name="test_1"/></testsuite></testsuites>',
+        )
+        second = self._write(
+            "1.xml",
+            '<testsuite name="pytest"><testcase classname="b" name="test_2">'
+            '<failure message="boom"/></testcase></testsuite>',
+        )
+        broken = self._write("2.xml", "<testsuite")
+        target = os.path.join(self._tmp_dir, "merged.xml")
+        merge_junit_xml([first, second, broken], target)
+        results = list(read_junit_xml(target))
+        self.assertEqual(["a::test_1", "b::test_2"], [r.node_id for r in results])
+        self.assertEqual([PASSED, FAILED], [r.outcome for r in results])
+
+
+if __name__ == "__main__":
+    unittest.main()
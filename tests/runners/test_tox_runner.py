@@ -22,6 +22,7 @@ import tempfile
 import unittest
 
 from git import Repo
+from pytesting_utils import IllegalStateException
 
 from testrunner.runners.tox_runner import ToxRunner
 
@@ -33,6 +34,11 @@ class ToxRunnerTest(unittest.TestCase):
     def tearDown(self):
         shutil.rmtree(self._tmp_dir)
 
+    def test_not_supported(self):
+        with self.assertRaises(IllegalStateException) as context:
+            ToxRunner("zula", self._tmp_dir)
+        self.assertEqual("Running tox is not supported yet!", str(context.exception))
+
     @unittest.skip("Skip test until runner is implemented")
     def test_integration_zula(self):
         url = "https://github.com/efe/zula"
@@ -0,0 +1,133 @@
+"""
+Test runner is a library for running unit tests on Python code.
+
+It offers the opinion to automatically detect the correct run settings for
+the tests and gives information about the test results and coverage information.
+
+Test-Runner is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Test-Runner is distributed in the hope that it will be useful
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Test-Runner.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from pytesting_utils import IllegalArgumentException
+
+from testrunner.allocation import (
+    HostTopology,
+    ResourceAllocator,
+    Utilization,
+    parse_cpu_list,
+)
+
+# Two NUMA nodes with two physical cores of two hyperthreads each
+TOPOLOGY = HostTopology(
+    [(0, 4), (1, 5), (2, 6), (3, 7)],
+    {0: 0, 4: 0, 1: 0, 5: 0, 2: 1, 6: 1, 3: 1, 7: 1},
+    1000,
+)
+
+
+class AllocationTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self._tmp_dir)
+
+    def _allocator(self, **kwargs):
+        return ResourceAllocator(self._tmp_dir, TOPOLOGY, poll_interval=0.01, **kwargs)
+
+    def test_parse_cpu_list(self):
+        self.assertEqual([0, 1, 2, 3, 8, 10, 11], parse_cpu_list("0-3,8,10-11\n"))
+        self.assertEqual([], parse_cpu_list(""))
+
+    def test_siblings_and_nodes(self):
+        allocator = self._allocator()
+        first = allocator.acquire(1)
+        self.assertEqual([0, 4], first.cores)
+        self.assertEqual([0], first.memory_nodes)
+        second = allocator.acquire(3)
+        self.assertEqual([2, 3, 6, 7], second.cores)
+        self.assertEqual([1], second.memory_nodes)
+        third = allocator.acquire(2)
+        self.assertEqual([1, 5], third.cores)
+        self.assertIsNone(allocator.try_acquire(1))
+        allocator.release(second)
+        spanning = allocator.try_acquire(4)
+        self.assertEqual([2, 3, 6, 7], spanning.cores)
+
+    def test_spans_nodes(self):
+        allocator = self._allocator()
+        allocator.acquire(1)
+        allocation = allocator.acquire(6)
+        self.assertEqual([1, 2, 3, 5, 6, 7], allocation.cores)
+        self.assertEqual([0, 1], allocation.memory_nodes)
+
+    def test_disjoint_across_allocators(self):
+        with self._allocator().lease(4) as first:
+            with self._allocator().lease(4) as second:
+                self.assertFalse(set(first.cores) & set(second.cores))
+                self.assertIsNone(self._allocator().try_acquire(1))
+        self.assertEqual(Utilization(0, 8, 0, 1000, 0), self._allocator().utilization())
+
+    def test_memory_budget(self):
+        allocator = self._allocator(memory=500)
+        allocation = allocator.acquire(1, 400)
+        self.assertEqual(Utilization(2, 8, 400, 500, 1), allocator.utilization())
+        self.assertIsNone(allocator.try_acquire(1, 200))
+        allocator.release(allocation)
+        self.assertIsNotNone(allocator.try_acquire(1, 500))
+        with self.assertRaises(IllegalArgumentException):
+            allocator.acquire(1, 501)
+        with self.assertRaises(IllegalArgumentException):
+            allocator.acquire(9)
+
+    def test_timeout(self):
+        allocator = self._allocator()
+        with allocator.lease(8):
+            with self.assertRaises(TimeoutError):
+                allocator.acquire(1, timeout=0.05)
+
+    def test_budgets_of_ended_jobs_are_dropped(self):
+        with open(os.path.join(self._tmp_dir, "allocations.json"), "w") as f:
+            json.dump({"ended": 300}, f)
+        allocator = self._allocator()
+        self.assertEqual(0, allocator.utilization().memory_used)
+        self.assertIsNotNone(allocator.try_acquire(1, 1000))
+
+    def test_read_topology(self):
+        sys_dir = os.path.join(self._tmp_dir, "sys")
+        files = {
+            "devices/system/cpu/cpu0/topology/thread_siblings_list": "0,2",
+            "devices/system/cpu/cpu1/topology/thread_siblings_list": "1,3",
+            "devices/system/cpu/cpu2/topology/thread_siblings_list": "0,2",
+            "devices/system/node/node0/cpulist": "0,2",
+            "devices/system/node/node1/cpulist": "1,3",
+        }
+        for path, content in files.items():
+            os.makedirs(os.path.dirname(os.path.join(sys_dir, path)), exist_ok=True)
+            with open(os.path.join(sys_dir, path), "w") as f:
+                f.write(content)
+        with mock.patch("os.sched_getaffinity", return_value={0, 1, 2}):
+            topology = HostTopology.read(sys_dir)
+        self.assertEqual([(0, 2), (1,)], topology.units)
+        self.assertEqual({0: 0, 1: 1, 2: 0}, topology.nodes)
+        self.assertEqual(3, topology.cpu_count)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,280 @@
+"""
+Test runner is a library for running unit tests on Python code.
+
+It offers the opinion to automatically detect the correct run settings for
+the tests and gives information about the test results and coverage information.
+
+Test-Runner is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Test-Runner is distributed in the hope that it will be useful
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Test-Runner.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import contextlib
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from unittest import mock
+
+from pytesting_utils import IllegalArgumentException
+
+from testrunner.batch import BatchRunner, MemoryHistory, Project, RunPipeline
+from testrunner.runners.abstract_runner import RunResult
+from testrunner.runners.measurements import ResourceMeasurements, RunStatus
+
+
+class FakeEnvironment:
+    def __init__(self, env_dir):
+        self._env_dir = env_dir
+
+    def get_env_dir(self):
+        return self._env_dir
+
+
+class FakeRunner:
+    def __init__(self, name, root, events, size=0, fail_prepare=False, fail_run=False):
+        self.name = name
+        self._root = root
+        self._events = events
+        self._size = size
+        self._fail_prepare = fail_prepare
+        self._fail_run = fail_run
+
+    @contextlib.contextmanager
+    def prepare_environment(self, install=False):
+        assert install
+        if self._fail_prepare:
+            raise RuntimeError("prepare " + self.name)
+        env_dir = os.path.join(self._root, self.name)
+        os.makedirs(env_dir)
+        with open(os.path.join(env_dir, "blob"), "wb") as blob:
+            blob.write(b"x" * self._size)
+        self._events.append(("prepared", self.name))
+        try:
+            yield FakeEnvironment(env_dir)
+        finally:
+            shutil.rmtree(env_dir)
+            self._events.append(("removed", self.name))
+
+    def run_in_environment(self, env):
+        assert os.path.isdir(env.get_env_dir())
+        self._events.append(("run", self.name, threading.current_thread().name))
+        if self._fail_run:
+            raise RuntimeError("run " + self.name)
+        return self.name, ""
+
+
+class RunPipelineTest(unittest.TestCase):
+    def setUp(self):
+        self._root = tempfile.mkdtemp()
+        self._events = []
+
+    def tearDown(self):
+        shutil.rmtree(self._root)
+
+    def _runners(self, count, **kwargs):
+        return [
+            FakeRunner("p{}".format(i), self._root, self._events, **kwargs)
+            for i in range(count)
+        ]
+
+    def test_illegal_arguments(self):
+        with self.assertRaises(IllegalArgumentException):
+            RunPipeline([], lookahead=-1)
+        with self.assertRaises(IllegalArgumentException):
+            RunPipeline([], workers=0)
+        with self.assertRaises(IllegalArgumentException):
+            RunPipeline([], max_disk_usage=-1)
+
+    def test_results_in_order(self):
+        runners = self._runners(6)
+        results = list(RunPipeline(runners, lookahead=3, workers=3).run())
+        self.assertEqual(runners, [result.runner for result in results])
+        self.assertEqual(
+            ["p{}".format(i) for i in range(6)],
+            [result.output[0] for result in results],
+        )
+        for result in results:
+            self.assertIsNone(result.error)
+            self.assertGreaterEqual(result.preparation_time, 0)
+            self.assertGreaterEqual(result.execution_time, 0)
+        runs = [event for event in self._events if event[0] == "run"]
+        self.assertTrue(
+            all(event[2] == threading.current_thread().name for event in runs)
+        )
+
+    def test_environments_removed(self):
+        list(RunPipeline(self._runners(4)).run())
+        self.assertEqual([], os.listdir(self._root))
+        self.assertEqual(
+            4, len([event for event in self._events if event[0] == "removed"])
+        )
+
+    def test_errors_isolated(self):
+        runners = self._runners(3)
+        runners[0] = FakeRunner(
+            "bad-prepare", self._root, self._events, fail_prepare=True
+        )
+        runners[1] = FakeRunner("bad-run", self._root, self._events, fail_run=True)
+        results = list(RunPipeline(runners).run())
+        self.assertIsInstance(results[0].error, RuntimeError)
+        self.assertIsNone(results[0].output)
+        self.assertIsInstance(results[1].error, RuntimeError)
+        self.assertGreaterEqual(results[1].preparation_time, 0)
+        self.assertIsNone(results[2].error)
+        self.assertEqual(("p2", ""), results[2].output)
+
+    def test_lookahead_bounded(self):
+        results = RunPipeline(self._runners(5), lookahead=1, workers=4).run()
+        next(results)
+        prepared = [event[1] for event in self._events if event[0] == "prepared"]
+        self.assertLessEqual(len(prepared), 2)
+        results.close()
+
+    def test_disk_usage_bounded(self):
+        runners = self._runners(4, size=1024)
+        pipeline = RunPipeline(runners, lookahead=3, workers=3, max_disk_usage=1024)
+        results = pipeline.run()
+        for result in results:
+            self.assertIsNone(result.error)
+            executed = len([e for e in self._events if e[0] == "run"])
+            prepared = len([e for e in self._events if e[0] == "prepared"])
+            self.assertLessEqual(prepared - executed, 1)
+
+    def test_close_removes_pending_environments(self):
+        results = RunPipeline(self._runners(4), lookahead=3, workers=3).run()
+        next(results)
+        results.close()
+        self.assertEqual([], os.listdir(self._root))
+
+
+class ProcessRunner:
+    """A picklable stand-in for Runner, which is inherited by forked workers"""
+
+    def __init__(self, project_name, repo_path, **kwargs):
+        self._project_name = project_name
+        self._options = kwargs
+
+    def run(self):
+        if self._project_name == "crash":
+            os._exit(1)
+        if self._project_name == "error":
+            raise RuntimeError("broken project")
+        return self._project_name, str(self._options.get("venv_path"))
+
+    @staticmethod
+    def get_run_result(log):
+        resources = ResourceMeasurements(
+            memory=len(log) * 100,
+            termination_reason="memory" if log == "oom" else None,
+        )
+        return RunResult(passed=len(log), runner="fake", resources=resources)
+
+
+class BreakingExecutor(ProcessPoolExecutor):
+    """A pool that breaks on its third submission, isolated runs are kept"""
+
+    def __init__(self, max_workers=None):
+        super().__init__(max_workers=max_workers)
+        self._isolated = max_workers == 1
+        self._submitted = 0
+
+    def submit(self, *args, **kwargs):
+        self._submitted += 1
+        if not self._isolated and self._submitted > 2:
+            raise BrokenProcessPool("broken during submission")
+        return super().submit(*args, **kwargs)
+
+
+@unittest.skipUnless(
+    multiprocessing.get_start_method() == "fork", "Workers need to be forked"
+)
+@mock.patch("testrunner.batch.Runner", ProcessRunner)
+class BatchRunnerTest(unittest.TestCase):
+    def test_illegal_workers(self):
+        with self.assertRaises(IllegalArgumentException):
+            BatchRunner([], workers=0)
+
+    def test_run(self):
+        projects = [Project("p{}".format(i), "/tmp") for i in range(12)]
+        batch = BatchRunner(projects, workers=4, venv_path="/venvs")
+        results = list(batch.run())
+        self.assertCountEqual(projects, [result.project for result in results])
+        for result in results:
+            self.assertIsNone(result.error)
+            self.assertEqual("/venvs", result.output[1])
+            self.assertEqual(len(result.project.project_name), result.run_result.passed)
+        self.assertEqual(12, batch.completed)
+        self.assertEqual(0, batch.failed)
+        self.assertGreater(batch.throughput, 0)
+
+    def test_errors_isolated(self):
+        projects = [
+            Project("a", "/tmp"),
+            Project("error", "/tmp"),
+            Project("b", "/tmp"),
+        ]
+        batch = BatchRunner(projects, workers=2)
+        results = {result.project.project_name: result for result in batch.run()}
+        self.assertIn("RuntimeError: broken project", results["error"].error)
+        self.assertIsNone(results["a"].error)
+        self.assertIsNone(results["b"].error)
+        self.assertEqual(1, batch.failed)
+
+    def test_crashes_isolated(self):
+        projects = [Project("p{}".format(i), "/tmp") for i in range(6)]
+        projects.insert(2, Project("crash", "/tmp"))
+        batch = BatchRunner(projects, workers=3)
+        results = {result.project.project_name: result for result in batch.run()}
+        self.assertEqual(7, len(results))
+        self.assertIsNotNone(results.pop("crash").error)
+        for result in results.values():
+            self.assertIsNone(result.error)
+            self.assertIsNotNone(result.run_result)
+        self.assertEqual(1, batch.failed)
+
+    def test_broken_during_submission(self):
+        projects = [Project("p{}".format(i), "/tmp") for i in range(5)]
+        with mock.patch("testrunner.batch.ProcessPoolExecutor", BreakingExecutor):
+            batch = BatchRunner(projects, workers=5)
+            results = list(batch.run())
+        self.assertCountEqual(projects, [result.project for result in results])
+        for result in results:
+            self.assertIsNone(result.error)
+        self.assertEqual(5, batch.completed)
+        self.assertEqual(0, batch.failed)
+
+    def test_memory_admission(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            history_path = os.path.join(tmp_dir, "history.json")
+            history = MemoryHistory(history_path)
+            for name in ("big1", "big2"):
+                history.update(
+                    name, RunResult(resources=ResourceMeasurements(memory=800))
+                )
+            projects = [Project("big1", "/tmp"), Project("big2", "/tmp")]
+            projects.append(Project("oom", "/tmp", memory_limit=100))
+            batch = BatchRunner(
+                projects, workers=3, memory_history=history, memory_budget=1000
+            )
+            results = {r.project.project_name: r for r in batch.run()}
+            self.assertEqual(3, len(results))
+            self.assertEqual(RunStatus.OUT_OF_MEMORY, results["oom"].run_result.status)
+            self.assertEqual(1, batch.deferred)
+            self.assertEqual(1, batch.out_of_memory)
+            history = MemoryHistory(history_path)
+            self.assertEqual(400, history.peak("big1"))
+            self.assertEqual(300, history.peak("oom"))
+            self.assertIsNone(history.peak("other"))
@@ -0,0 +1,225 @@
+"""
+Test runner is a library for running unit tests on Python code.
+
+It offers the opinion to automatically detect the correct run settings for
+the tests and gives information about the test results and coverage information.
+
+Test-Runner is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Test-Runner is distributed in the hope that it will be useful
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Test-Runner.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from pytesting_utils import IllegalArgumentException
+
+from benchmarks.detection_benchmark import (
+    detect_with_grep,
+    is_nose,
+    is_nose2,
+    is_pytest,
+    is_setup_py,
+)
+from testrunner.detection import RunnerTypeDetector
+from testrunner.runner_type import RunnerType
+
+
+class RunnerTypeDetectorTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.mkdtemp()
+        self._detector = RunnerTypeDetector()
+
+    def tearDown(self):
+        shutil.rmtree(self._tmp_dir)
+
+    def _write(self, relative_path: str, content: str) -> None:
+        path = os.path.join(self._tmp_dir, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(content)
+
+    def test_illegal_max_file_size(self):
+        with self.assertRaises(IllegalArgumentException):
+            RunnerTypeDetector(max_file_size=0)
+
+    def test_pytest_ini(self):
+        self._write("pytest.ini", "foo")
+        result = self._detector.detect(self._tmp_dir)
+        self.assertEqual(RunnerType.PYTEST, result.runner_type)
+        self.assertEqual("pytest.ini exists", result.evidence)
+        self.assertEqual(0, result.files_scanned)
+
+    def test_setup_py_test_suite_pytest(self):
+        self._write("setup.py", "    test_suite=pytest")
+        result = self._detector.detect(self._tmp_dir)
+        self.assertEqual(RunnerType.PYTEST, result.runner_type)
+        self.assertEqual("setup.py mentions pytest", result.evidence)
+
+    def test_nested_pytest_import(self):
+        self._write("setup.py", "    test_suite=nose")
+        self._write(os.path.join("tests", "unit", "test_foo.py"), "import pytest")
+        result = self._detector.detect(self._tmp_dir)
+        self.assertEqual(RunnerType.PYTEST, result.runner_type)
+        self.assertEqual(
+            "{} mentions pytest".format(os.path.join("tests", "unit", "test_foo.py")),
+            result.evidence,
+        )
+
+    def test_mention_across_chunk_boundary(self):
+        self._write("data.txt", "x" * (1024 * 1024 - 3) + "pytest")
+        result = self._detector.detect(self._tmp_dir)
+        self.assertEqual(RunnerType.PYTEST, result.runner_type)
+
+    def test_skips_vcs_directory(self):
+        self._write("setup.py", "nose2")
+        self._write(os.path.join(".git", "COMMIT_EDITMSG"), "use pytest")
+        result = self._detector.detect(self._tmp_dir)
+        self.assertEqual(RunnerType.NOSE2, result.runner_type)
+
+    def test_skips_virtual_environment(self):
+        self._write("setup.py", "nose")
+        self._write(os.path.join("env", "pyvenv.cfg"), "home = /usr/bin")
+        self._write(os.path.join("env", "lib", "pytest.py"), "pytest")
+        self._write(os.path.join("old", "bin", "activate"), "")
+        self._write(os.path.join("old", "lib", "pytest.py"), "pytest")
+        result = self._detector.detect(self._tmp_dir)
+        self.assertEqual(RunnerType.NOSE, result.runner_type)
+
+    def test_skips_large_files(self):
+        self._write("big.dat", "pytest" + "x" * 64)
+        detector = RunnerTypeDetector(max_file_size=32)
+        result = detector.detect(self._tmp_dir)
+        self.assertEqual(RunnerType._UNKNOWN, result.runner_type)
+        self.assertEqual(1, result.files_scanned)
+
+    def test_custom_skip_directories(self):
+        self._write(os.path.join("fixtures", "foo.py"), "import pytest")
+        detector = RunnerTypeDetector(skip_directories={"fixtures"})
+        result = detector.detect(self._tmp_dir)
+        self.assertEqual(RunnerType._UNKNOWN, result.runner_type)
+
+    def test_setup_py_test_suite(self):
+        self._write("setup.py", "    test_suite=foobar")
+        result = self._detector.detect(self._tmp_dir)
+        self.assertEqual(RunnerType.SETUP_PY, result.runner_type)
+        self.assertEqual("setup.py mentions test_suite=", result.evidence)
+
+    def test_unknown(self):
+        self._write("setup.py", "foo")
+        result = self._detector.detect(self._tmp_dir)
+        self.assertEqual(RunnerType._UNKNOWN, result.runner_type)
+        self.assertEqual(1, result.files_scanned)
+
+    def test_same_result_as_grep_checks(self):
+        layouts = [
+            {"setup.py": "test_suite=py.test"},
+            {"setup.py": "nose2"},
+            {"setup.py": "nose"},
+            {"setup.py": "test_suite=foo"},
+            {"setup.py": "foo", os.path.join("pkg", "conftest.py"): "import pytest"},
+            {"README.md": "Run the tests with pytest"},
+        ]
+        for layout in layouts:
+            shutil.rmtree(self._tmp_dir)
+            os.mkdir(self._tmp_dir)
+            for path, content in layout.items():
+                self._write(path, content)
+            with self.subTest(layout=layout):
+                self.assertEqual(
+                    detect_with_grep(self._tmp_dir),
+                    self._detector.detect(self._tmp_dir).runner_type,
+                )
+
+
+class GrepChecksTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self._tmp_dir)
+
+    def test_is_not_pytest(self):
+        self.assertFalse(is_pytest(self._tmp_dir))
+
+    def test_is_not_setup_py(self):
+        self.assertFalse(is_setup_py(self._tmp_dir))
+
+    def test_is_not_pytest_setup_py(self):
+        with open(os.path.join(self._tmp_dir, "setup.py"), "w") as f:
+            f.write("    test_suite=nose")
+        self.assertFalse(is_pytest(self._tmp_dir))
+
+    def test_is_pytest_setup_test_suite_pytest(self):
+        with open(os.path.join(self._tmp_dir, "setup.py"), "w") as f:
+            f.write("    test_suite=pytest")
+        self.assertTrue(is_pytest(self._tmp_dir))
+
+    def test_is_pytest_setup_test_suite_py_test(self):
+        with open(os.path.join(self._tmp_dir, "setup.py"), "w") as f:
+            f.write("    test_suite=py.test")
+        self.assertTrue(is_pytest(self._tmp_dir))
+
+    def test_is_pytest_ini(self):
+        with open(os.path.join(self._tmp_dir, "pytest.ini"), "w") as f:
+            f.write("foo")
+        self.assertTrue(is_pytest(self._tmp_dir))
+
+    def test_is_pytest_import(self):
+        with open(os.path.join(self._tmp_dir, "foo.py"), "w") as f:
+            f.write("import pytest")
+        self.assertTrue(is_pytest(self._tmp_dir))
+
+    def test_is_pytest_from_import(self):
+        with open(os.path.join(self._tmp_dir, "foo.py"), "w") as f:
+            f.write("from pytest import foo")
+        self.assertTrue(is_pytest(self._tmp_dir))
+
+    def test_is_pytest_grep(self):
+        with open(os.path.join(self._tmp_dir, "foo.txt"), "w") as f:
+            f.write("foo pytest bar")
+        self.assertTrue(is_pytest(self._tmp_dir))
+
+    def test_is_setup_py_test(self):
+        with open(os.path.join(self._tmp_dir, "setup.py"), "w") as f:
+            f.write("    test_suite=nose")
+        self.assertTrue(is_setup_py(self._tmp_dir))
+
+    def test_is_not_setup_py_test(self):
+        with open(os.path.join(self._tmp_dir, "setup.py"), "w") as f:
+            f.write("foo")
+        self.assertFalse(is_setup_py(self._tmp_dir))
+
+    def test_detect_nose2(self):
+        with open(os.path.join(self._tmp_dir, "setup.py"), "w") as f:
+            f.write("nose2")
+        self.assertTrue(is_nose2(self._tmp_dir))
+
+    def test_detect_not_nose2(self):
+        with open(os.path.join(self._tmp_dir, "setup.py"), "w") as f:
+            f.write("2nosa")
+        self.assertFalse(is_nose2(self._tmp_dir))
+
+    def test_detect_nose(self):
+        with open(os.path.join(self._tmp_dir, "setup.py"), "w") as f:
+            f.write("nose")
+        self.assertTrue(is_nose(self._tmp_dir))
+
+    def test_detect_not_nose(self):
+        with open(os.path.join(self._tmp_dir, "setup.py"), "w") as f:
+            f.write("nosa")
+        self.assertFalse(is_nose(self._tmp_dir))
+
+
+if __name__ == "__main__":
+    unittest.main()
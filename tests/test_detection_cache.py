@@ -0,0 +1,131 @@
+"""
+Test runner is a library for running unit tests on Python code.
+
+It offers the opinion to automatically detect the correct run settings for
+the tests and gives information about the test results and coverage information.
+
+Test-Runner is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Test-Runner is distributed in the hope that it will be useful
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Test-Runner.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from git import Repo
+
+from testrunner.detection import DetectionResult, RunnerTypeDetector
+from testrunner.detection_cache import DetectionCache, repository_fingerprint
+from testrunner.runner import Runner, RunnerType
+
+
+class RepositoryFingerprintTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self._tmp_dir)
+
+    def _write(self, file_name: str, content: str) -> None:
+        with open(os.path.join(self._tmp_dir, file_name), "w") as f:
+            f.write(content)
+
+    def test_fingerprint_without_git(self):
+        self._write("setup.py", "foo")
+        fingerprint = repository_fingerprint(self._tmp_dir)
+        self.assertTrue(fingerprint.startswith("files:"))
+        self.assertEqual(fingerprint, repository_fingerprint(self._tmp_dir))
+
+    def test_fingerprint_changes_with_configuration(self):
+        self._write("setup.py", "foo")
+        before = repository_fingerprint(self._tmp_dir)
+        self._write("tox.ini", "[tox]")
+        self.assertNotEqual(before, repository_fingerprint(self._tmp_dir))
+
+    def test_fingerprint_differs_between_paths(self):
+        other_dir = tempfile.mkdtemp()
+        try:
+            self.assertNotEqual(
+                repository_fingerprint(self._tmp_dir), repository_fingerprint(other_dir)
+            )
+        finally:
+            shutil.rmtree(other_dir)
+
+    def test_fingerprint_with_git(self):
+        repo = Repo.init(self._tmp_dir)
+        os.mkdir(os.path.join(self._tmp_dir, "sub"))
+        self._write("setup.py", "foo")
+        self._write(os.path.join("sub", "setup.py"), "bar")
+        repo.index.add(["setup.py", os.path.join("sub", "setup.py")])
+        repo.index.commit("initial")
+
+        root = repository_fingerprint(self._tmp_dir)
+        sub = repository_fingerprint(os.path.join(self._tmp_dir, "sub"))
+        self.assertEqual("git-tree:{}".format(repo.head.commit.tree.hexsha), root)
+        self.assertTrue(sub.startswith("git-tree:"))
+        self.assertNotEqual(root, sub)
+
+
+class DetectionCacheTest(unittest.TestCase):
+    def setUp(self):
+        self._repo_dir = tempfile.mkdtemp()
+        self._cache_dir = os.path.join(tempfile.mkdtemp(), "cache")
+        with open(os.path.join(self._repo_dir, "setup.py"), "w") as f:
+            f.write("nose2")
+
+    def tearDown(self):
+        shutil.rmtree(self._repo_dir)
+        shutil.rmtree(os.path.dirname(self._cache_dir))
+
+    def test_get_missing(self):
+        cache = DetectionCache(self._cache_dir)
+        self.assertIsNone(cache.get("foo"))
+
+    def test_put_get(self):
+        cache = DetectionCache(self._cache_dir)
+        result = DetectionResult(RunnerType.NOSE, "setup.py mentions nose", 3)
+        cache.put("foo", result)
+        self.assertEqual(result, cache.get("foo"))
+        self.assertEqual(result, DetectionCache(self._cache_dir).get("foo"))
+
+    def test_corrupt_entry(self):
+        cache = DetectionCache(self._cache_dir)
+        cache.put("foo", DetectionResult(RunnerType.NOSE))
+        for file_name in os.listdir(self._cache_dir):
+            with open(os.path.join(self._cache_dir, file_name), "w") as f:
+                f.write("{")
+        self.assertIsNone(cache.get("foo"))
+
+    def test_detect_uses_cache(self):
+        detector = mock.Mock(wraps=RunnerTypeDetector())
+        cache = DetectionCache(self._cache_dir, detector)
+        first = cache.detect(self._repo_dir)
+        second = cache.detect(self._repo_dir)
+        self.assertEqual(RunnerType.NOSE2, first.runner_type)
+        self.assertEqual(first, second)
+        detector.detect.assert_called_once_with(self._repo_dir)
+
+    def test_runner_uses_cache(self):
+        cache = DetectionCache(self._cache_dir)
+        cache.put(
+            repository_fingerprint(self._repo_dir),
+            DetectionResult(RunnerType.NOSE, "cached"),
+        )
+        runner = Runner("test", self._repo_dir, detection_cache=cache)
+        self.assertEqual(RunnerType.NOSE, runner._runner_type)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,294 @@
+"""
+Test runner is a library for running unit tests on Python code.
+
+It offers the opinion to automatically detect the correct run settings for
+the tests and gives information about the test results and coverage information.
+
+Test-Runner is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Test-Runner is distributed in the hope that it will be useful
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Test-Runner.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from array import array
+from unittest import mock
+
+from plumbum import local
+
+from testrunner.result_cache import ResultCache, working_tree_fingerprint
+from testrunner.runner import Runner, RunnerType
+from testrunner.runners.abstract_runner import RunResult
+from testrunner.runners.coverage_report import CoverageData, FileCoverage
+from testrunner.runners.junit_reader import FAILED, PASSED, TestCaseResult
+from testrunner.runners.measurements import ResourceMeasurements
+
+CONFIGURATION = {"runner": "PyTestRunner", "commands": ["pytest"]}
+
+
+class ResultCacheTest(unittest.TestCase):
+    def setUp(self):
+        self._cache_dir = tempfile.mkdtemp()
+        self._repo_dir = tempfile.mkdtemp()
+        with open(os.path.join(self._repo_dir, "setup.py"), "w") as f:
+            f.write("from setuptools import setup\n")
+
+    def tearDown(self):
+        shutil.rmtree(self._cache_dir)
+        shutil.rmtree(self._repo_dir)
+
+    def _write(self, name, content):
+        path = os.path.join(self._repo_dir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(content)
+
+    def _git(self, *args):
+        local["git"]["-C", self._repo_dir, "-c", "user.name=test"][
+            "-c", "user.email=test@example.com"
+        ][args]()
+
+    def _put(self, cache, key, output=("out", "err"), repo_path=None):
+        cache.put(key, RunResult(passed=1), output, repo_path or self._repo_dir)
+
+    def test_round_trip(self):
+        cache = ResultCache(self._cache_dir)
+        run_result = RunResult(
+            passed=3,
+            failed=1,
+            runner="pytest",
+            resources=ResourceMeasurements(walltime=1.5, memory=1024),
+        )
+        key = ResultCache.key(self._repo_dir, CONFIGURATION)
+        self.assertIsNone(cache.get(key))
+        cache.put(key, run_result, ("out", "err"), self._repo_dir)
+        cached = cache.get(key)
+        self.assertEqual(run_result, cached.run_result)
+        self.assertEqual(("out", "err"), cached.output)
+
+    def test_key(self):
+        key = ResultCache.key(self._repo_dir, CONFIGURATION)
+        self.assertEqual(key, ResultCache.key(self._repo_dir, dict(CONFIGURATION)))
+        self.assertNotEqual(
+            key, ResultCache.key(self._repo_dir, {"runner": "NoseRunner"})
+        )
+        with open(os.path.join(self._repo_dir, "setup.py"), "a") as f:
+            f.write("setup()\n")
+        self.assertNotEqual(key, ResultCache.key(self._repo_dir, CONFIGURATION))
+
+    def test_fingerprint_source_changes(self):
+        self._write("pkg/core.py", "x = 1\n")
+        fingerprint = working_tree_fingerprint(self._repo_dir)
+        self._write("pkg/core.py", "x = 2\n")
+        self.assertNotEqual(fingerprint, working_tree_fingerprint(self._repo_dir))
+        self._write("pkg/core.py", "x = 1\n")
+        self.assertEqual(fingerprint, working_tree_fingerprint(self._repo_dir))
+        self._write("pkg/new.py", "")
+        self.assertNotEqual(fingerprint, working_tree_fingerprint(self._repo_dir))
+
+    def test_fingerprint_ignores_run_files(self):
+        fingerprint = working_tree_fingerprint(self._repo_dir)
+        self._write("output.log", "log")
+        self._write(".coverage", "")
+        self._write(".coverage.testrunner-shard-0", "")
+        self._write(".testrunner-junit.xml", "")
+        self._write("venv/lib/site.py", "")
+        self._write("synthetic.egg-info/PKG-INFO", "")
+        self._write("pkg/__pycache__/core.cpython-36.pyc", "")
+        self.assertEqual(fingerprint, working_tree_fingerprint(self._repo_dir))
+
+    def test_fingerprint_git_working_tree(self):
+        self._write("pkg/core.py", "x = 1\n")
+        self._write(".gitignore", "*.tmp\n")
+        self._git("init", "-q")
+        self._git("add", "-A")
+        self._git("commit", "-q", "-m", "initial")
+        cache = ResultCache(self._cache_dir)
+        key = ResultCache.key(self._repo_dir, CONFIGURATION)
+        self._put(cache, key)
+
+        self._write("pkg/core.py", "x = 2\n")
+        modified_key = ResultCache.key(self._repo_dir, CONFIGURATION)
+        self.assertNotEqual(key, modified_key)
+        self.assertIsNone(cache.get(modified_key))
+
+        self._write("pkg/core.py", "x = 1\n")
+        self.assertEqual(key, ResultCache.key(self._repo_dir, CONFIGURATION))
+        self._write("scratch.tmp", "ignored")
+        self.assertEqual(key, ResultCache.key(self._repo_dir, CONFIGURATION))
+
+        self._write("pkg/untracked.py", "")
+        untracked_key = ResultCache.key(self._repo_dir, CONFIGURATION)
+        self.assertNotEqual(key, untracked_key)
+        self.assertIsNone(cache.get(untracked_key))
+
+    def test_fingerprint_git_hashes_changed_files_only(self):
+        self._write("pkg/core.py", "x = 1\n")
+        self._write("pkg/util.py", "y = 1\n")
+        self._git("init", "-q")
+        self._git("add", "-A")
+        self._git("commit", "-q", "-m", "initial")
+        with mock.patch(
+            "testrunner.result_cache._file_digest", return_value=b"digest"
+        ) as file_digest:
+            fingerprint = working_tree_fingerprint(self._repo_dir)
+            file_digest.assert_not_called()
+            self._write("pkg/core.py", "x = 2\n")
+            self._write("pkg/new.py", "")
+            working_tree_fingerprint(self._repo_dir)
+        self.assertEqual(
+            [
+                os.path.join(self._repo_dir, "pkg", name)
+                for name in ("core.py", "new.py")
+            ],
+            [call[0][0] for call in file_digest.call_args_list],
+        )
+        self._write("pkg/core.py", "x = 1\n")
+        os.remove(os.path.join(self._repo_dir, "pkg", "new.py"))
+        self.assertEqual(fingerprint, working_tree_fingerprint(self._repo_dir))
+
+    def test_fingerprint_git_ignores_run_files(self):
+        self._git("init", "-q")
+        self._git("add", "-A")
+        self._git("commit", "-q", "-m", "initial")
+        fingerprint = working_tree_fingerprint(self._repo_dir)
+        self._write("synthetic.egg-info/PKG-INFO", "")
+        self._write("src/synthetic.egg-info/SOURCES.txt", "")
+        self._write(".pytest_cache/v/cache/nodeids", "")
+        self._write("output.log", "log")
+        self.assertEqual(fingerprint, working_tree_fingerprint(self._repo_dir))
+
+    def test_test_results_and_coverage(self):
+        cache = ResultCache(self._cache_dir)
+        coverage = CoverageData(
+            4, 1, 75.0, {"a.py": FileCoverage(4, 1, 75.0, array("I", [1, 2, 3]))}
+        )
+        test_results = [
+            TestCaseResult("test_a.py::test_one", PASSED, 0.5),
+            TestCaseResult("test_a.py::test_two", FAILED, 1.0, "x" * 10),
+        ]
+        cache.put(
+            "a",
+            RunResult(passed=1),
+            ("", ""),
+            self._repo_dir,
+            test_results=test_results,
+        )
+        self.assertIsNone(cache.get("a").coverage)
+        self.assertEqual(test_results, list(cache.get_test_results("a")))
+        cache.put("b", RunResult(passed=1), ("", ""), self._repo_dir, coverage=coverage)
+        self.assertEqual(coverage, cache.get("b").coverage)
+        self.assertEqual([], list(cache.get_test_results("b")))
+        self.assertEqual(
+            "xxx", list(cache.get_test_results("a", max_message_length=3))[1].message
+        )
+        self.assertEqual([], list(cache.get_test_results("missing")))
+
+    def test_put_failure(self):
+        cache = ResultCache(self._cache_dir)
+        with mock.patch("os.rename", side_effect=OSError(28, "No space left")):
+            with self.assertRaises(OSError):
+                self._put(cache, "a")
+        self.assertEqual([], os.listdir(self._cache_dir))
+
+        def concurrent_rename(source, target):
+            os.mkdir(target)
+            raise OSError(39, "Directory not empty")
+
+        with mock.patch("os.rename", side_effect=concurrent_rename):
+            self._put(cache, "a")
+        self.assertEqual(["a"], os.listdir(self._cache_dir))
+
+    def test_invalidate(self):
+        cache = ResultCache(self._cache_dir)
+        other_repo = os.path.join(self._repo_dir, "other")
+        self._put(cache, "a")
+        self._put(cache, "b")
+        self._put(cache, "c", repo_path=other_repo)
+        self.assertTrue(cache.invalidate("a"))
+        self.assertFalse(cache.invalidate("a"))
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(1, cache.invalidate_repository(self._repo_dir))
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("c"))
+        cache.clear()
+        self.assertEqual([], os.listdir(self._cache_dir))
+
+    def test_evict_least_recently_used(self):
+        cache = ResultCache(self._cache_dir, max_entries=2)
+        self._put(cache, "a")
+        self._put(cache, "b")
+        past = time.time() - 60
+        os.utime(os.path.join(self._cache_dir, "b", "result.json"), (past, past))
+        os.utime(os.path.join(self._cache_dir, "a", "result.json"), (past, past))
+        cache.get("a")
+        self._put(cache, "c")
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("c"))
+
+    def test_evict_by_size(self):
+        cache = ResultCache(self._cache_dir, max_size=1000)
+        self._put(cache, "a", ("x" * 400, ""))
+        past = time.time() - 60
+        os.utime(os.path.join(self._cache_dir, "a", "result.json"), (past, past))
+        self._put(cache, "b", ("x" * 400, ""))
+        self.assertIsNone(cache.get("a"))
+        self.assertIsNotNone(cache.get("b"))
+
+    def test_runner_hit(self):
+        cache = ResultCache(self._cache_dir)
+        with mock.patch("testrunner.runner.PyTestRunner") as runner_mock:
+            runner_mock.return_value.configuration.return_value = CONFIGURATION
+            runner_mock.return_value.run.return_value = ("foo", "bar")
+            runner_mock.return_value.get_run_result.return_value = RunResult(
+                passed=2, resources=ResourceMeasurements(walltime=1.0)
+            )
+            runner_mock.return_value.get_test_results.return_value = iter(
+                [TestCaseResult("test_a.py::test", PASSED)]
+            )
+            runner_mock.return_value.get_coverage.return_value = CoverageData(
+                2, 0, 100.0
+            )
+            runner = Runner(
+                "test", self._repo_dir, RunnerType.PYTEST, result_cache=cache
+            )
+            self.assertEqual(("foo", "bar"), runner.run())
+            runner = Runner(
+                "test", self._repo_dir, RunnerType.PYTEST, result_cache=cache
+            )
+            output = runner.run()
+            self.assertEqual(("foo", "bar"), output)
+            self.assertEqual(2, runner.get_run_result(output[0]).passed)
+            self.assertEqual(
+                [TestCaseResult("test_a.py::test", PASSED)],
+                list(runner.get_test_results()),
+            )
+            self.assertEqual(CoverageData(2, 0, 100.0), runner.get_coverage())
+            self.assertEqual(
+                ResourceMeasurements(walltime=1.0), runner.get_resource_measurements()
+            )
+            self.assertIsNone(runner.get_shard_plan())
+            runner_mock.return_value.run.assert_called_once()
+            runner_mock.return_value.get_run_result.assert_called_once()
+            runner_mock.return_value.get_test_results.assert_called_once()
+            runner_mock.return_value.get_coverage.assert_called_once()
+            runner_mock.return_value.get_resource_measurements.assert_not_called()
+            cache.invalidate(runner.cache_key())
+            runner.run()
+            self.assertEqual(2, runner_mock.return_value.run.call_count)
+
+
+if __name__ == "__main__":
+    unittest.main()
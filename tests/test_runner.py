@@ -94,56 +94,6 @@ class TestRunner(unittest.TestCase):
             MockHelper.assert_called_once()
             self.assertEqual(run_result, result)
 
-    def test_is_not_pytest(self):
-        runner = Runner("test", self._pytest_dir, RunnerType.PYTEST)
-        self.assertFalse(runner._is_pytest())
-
-    def test_is_not_setup_py(self):
-        runner = Runner("test", self._setup_py_dir, RunnerType.SETUP_PY)
-        self.assertFalse(runner._is_setup_py())
-
-    def test_is_not_pytest_setup_py(self):
-        with open(os.path.join(self._pytest_dir, "setup.py"), "w") as f:
-            f.write("    test_suite=nose")
-        runner = Runner("test", self._pytest_dir, RunnerType.PYTEST)
-        self.assertFalse(runner._is_pytest())
-
-    def test_is_pytest_setup_test_suite_pytest(self):
-        with open(os.path.join(self._pytest_dir, "setup.py"), "w") as f:
-            f.write("    test_suite=pytest")
-        runner = Runner("test", self._pytest_dir, RunnerType.PYTEST)
-        self.assertTrue(runner._is_pytest())
-
-    def test_is_pytest_setup_test_suite_py_test(self):
-        with open(os.path.join(self._pytest_dir, "setup.py"), "w") as f:
-            f.write("    test_suite=py.test")
-        runner = Runner("test", self._pytest_dir, RunnerType.PYTEST)
-        self.assertTrue(runner._is_pytest())
-
-    def test_is_pytest_ini(self):
-        with open(os.path.join(self._pytest_dir, "pytest.ini"), "w") as f:
-            f.write("foo")
-        runner = Runner("test", self._pytest_dir, RunnerType.PYTEST)
-        self.assertTrue(runner._is_pytest())
-
-    def test_is_pytest_import(self):
-        with open(os.path.join(self._pytest_dir, "foo.py"), "w") as f:
-            f.write("import pytest")
-        runner = Runner("test", self._pytest_dir, RunnerType.PYTEST)
-        self.assertTrue(runner._is_pytest())
-
-    def test_is_pytest_from_import(self):
-        with open(os.path.join(self._pytest_dir, "foo.py"), "w") as f:
-            f.write("from pytest import foo")
-        runner = Runner("test", self._pytest_dir, RunnerType.PYTEST)
-        self.assertTrue(runner._is_pytest())
-
-    def test_is_pytest_grep(self):
-        with open(os.path.join(self._pytest_dir, "foo.txt"), "w") as f:
-            f.write("foo pytest bar")
-        runner = Runner("test", self._pytest_dir, RunnerType.PYTEST)
-        self.assertTrue(runner._is_pytest())
-
     def test_detect_runner_type_pytest(self):
         with open(os.path.join(self._pytest_dir, "foo.txt"), "w") as f:
             f.write("foo pytest bar")
@@ -151,18 +101,6 @@ class TestRunner(unittest.TestCase):
         runner_type = runner._detect_runner_type()
         self.assertEqual(runner_type, RunnerType.PYTEST)
 
-    def test_is_setup_py_test(self):
-        with open(os.path.join(self._setup_py_dir, "setup.py"), "w") as f:
-            f.write("    test_suite=nose")
-        runner = Runner("test", self._setup_py_dir, RunnerType.SETUP_PY)
-        self.assertTrue(runner._is_setup_py())
-
-    def test_is_not_setup_py_test(self):
-        with open(os.path.join(self._setup_py_dir, "setup.py"), "w") as f:
-            f.write("foo")
-        runner = Runner("test", self._setup_py_dir, RunnerType.SETUP_PY)
-        self.assertFalse(runner._is_setup_py())
-
     def test_detect_runner_type_setup_py(self):
         with open(os.path.join(self._setup_py_dir, "setup.py"), "w") as f:
             f.write("    test_suite=foobar")
@@ -170,30 +108,6 @@ class TestRunner(unittest.TestCase):
         runner_type = runner._detect_runner_type()
         self.assertEqual(runner_type, RunnerType.SETUP_PY)
 
-    def test_detect_nose2(self):
-        with open(os.path.join(self._setup_py_dir, "setup.py"), "w") as f:
-            f.write("nose2")
-        runner = Runner("test", self._setup_py_dir, RunnerType.AUTO_DETECT)
-        self.assertTrue(runner._is_nose2())
-
-    def test_detect_not_nose2(self):
-        with open(os.path.join(self._setup_py_dir, "setup.py"), "w") as f:
-            f.write("2nosa")
-        runner = Runner("test", self._setup_py_dir, RunnerType.NOSE2)
-        self.assertFalse(runner._is_nose2())
-
-    def test_detect_nose(self):
-        with open(os.path.join(self._setup_py_dir, "setup.py"), "w") as f:
-            f.write("nose")
-        runner = Runner("test", self._setup_py_dir, RunnerType.AUTO_DETECT)
-        self.assertTrue(runner._is_nose())
-
-    def test_detect_not_nose(self):
-        with open(os.path.join(self._setup_py_dir, "setup.py"), "w") as f:
-            f.write("nosa")
-        runner = Runner("test", self._setup_py_dir, RunnerType.NOSE)
-        self.assertFalse(runner._is_nose())
-
 
 if __name__ == "__main__":
     unittest.main()
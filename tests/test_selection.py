@@ -0,0 +1,213 @@
+"""
+Test runner is a library for running unit tests on Python code.
+
+It offers the opinion to automatically detect the correct run settings for
+the tests and gives information about the test results and coverage information.
+
+Test-Runner is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Test-Runner is distributed in the hope that it will be useful
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Test-Runner.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from git import Repo
+
+from testrunner.runner import Runner, RunnerType
+from testrunner.selection import (
+    ImportGraph,
+    ImportGraphCache,
+    _is_test_module,
+    configured_test_patterns,
+    module_names,
+    select_tests,
+)
+
+MODULES = {
+    "src/pkg/__init__.py": "",
+    "src/pkg/core.py": "import os\n",
+    "src/pkg/util.py": "from . import core\n",
+    "src/pkg/cli.py": "from .util import helper\n",
+    "tests/test_core.py": "from pkg.core import thing\n",
+    "tests/test_cli.py": "import pkg.cli\n",
+    "tests/test_other.py": "import json\n",
+    "tests/broken_test.py": "print 'python 2'\n",
+}
+
+
+class SelectionTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.mkdtemp()
+        for path, content in MODULES.items():
+            self._write(path, content)
+
+    def tearDown(self):
+        shutil.rmtree(self._tmp_dir)
+
+    def _write(self, path, content):
+        full_path = os.path.join(self._tmp_dir, path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, "w") as f:
+            f.write(content)
+
+    def _commit(self):
+        repo = Repo.init(self._tmp_dir)
+        repo.index.add(list(MODULES))
+        repo.index.commit("initial")
+        return repo.head.commit.hexsha
+
+    def test_module_names(self):
+        self.assertEqual(
+            ["src.pkg.core", "pkg.core", "core"], module_names("src/pkg/core.py")
+        )
+        self.assertEqual(["src.pkg", "pkg"], module_names("src/pkg/__init__.py"))
+
+    def test_imports(self):
+        graph = ImportGraph.build(self._tmp_dir)
+        self.assertEqual(
+            ["src", "src.pkg", "src.pkg.util", "src.pkg.util.helper"],
+            graph.imports("src/pkg/cli.py"),
+        )
+        self.assertEqual([], graph.imports("tests/broken_test.py"))
+
+    def test_affected(self):
+        graph = ImportGraph.build(self._tmp_dir)
+        self.assertEqual(
+            {
+                "src/pkg/core.py",
+                "src/pkg/util.py",
+                "src/pkg/cli.py",
+                "tests/test_core.py",
+                "tests/test_cli.py",
+            },
+            graph.affected(["src/pkg/core.py"]),
+        )
+        self.assertEqual(
+            {"src/pkg/cli.py", "tests/test_cli.py"},
+            graph.affected(["src/pkg/cli.py"]),
+        )
+
+    def test_cache(self):
+        cache = ImportGraphCache(os.path.join(self._tmp_dir, "cache"))
+        ImportGraph.build(self._tmp_dir, cache)
+        self._write("src/pkg/cli.py", "import pkg.core\n")
+        with mock.patch(
+            "testrunner.selection._read_imports", return_value=["pkg.core"]
+        ) as read_imports:
+            graph = ImportGraph.build(self._tmp_dir, cache)
+        read_imports.assert_called_once_with(
+            os.path.join(self._tmp_dir, "src", "pkg", "cli.py"), "src/pkg/cli.py"
+        )
+        self.assertEqual(["pkg.core"], graph.imports("src/pkg/cli.py"))
+        self.assertEqual(["os"], graph.imports("src/pkg/core.py"))
+
+    def test_select_tests(self):
+        base = self._commit()
+        self._write("src/pkg/util.py", "from . import core\nimport sys\n")
+        self._write("tests/test_new.py", "import pkg.util\n")
+        selection = select_tests(self._tmp_dir, base)
+        self.assertFalse(selection.run_all)
+        self.assertEqual(
+            ["tests/test_cli.py", "tests/test_new.py"], selection.test_modules
+        )
+
+    def test_select_all_on_configuration_change(self):
+        base = self._commit()
+        self._write("requirements.txt", "six\n")
+        selection = select_tests(self._tmp_dir, base)
+        self.assertTrue(selection.run_all)
+        self.assertEqual("requirements.txt changed", selection.reason)
+        selection = select_tests(self._tmp_dir, base, full_run_patterns=())
+        self.assertTrue(selection.run_all)
+        self.assertEqual(
+            "requirements.txt changed without test modules next to it",
+            selection.reason,
+        )
+
+    def test_select_tests_next_to_changed_data(self):
+        base = self._commit()
+        self._write("tests/data/input.json", "{}\n")
+        selection = select_tests(self._tmp_dir, base)
+        self.assertTrue(selection.run_all)
+        self._write("tests/data/test_data.py", "import json\n")
+        selection = select_tests(self._tmp_dir, base)
+        self.assertFalse(selection.run_all)
+        self.assertEqual(["tests/data/test_data.py"], selection.test_modules)
+        os.remove(os.path.join(self._tmp_dir, "tests/data/input.json"))
+        os.remove(os.path.join(self._tmp_dir, "tests/data/test_data.py"))
+        self._write("src/pkg/template.html", "<html/>\n")
+        self.assertTrue(select_tests(self._tmp_dir, base).run_all)
+
+    def test_select_all_for_module_without_tests(self):
+        base = self._commit()
+        self._write("src/pkg/cli.py", "from .util import helper\nhelper()\n")
+        self._write("testing/cli_tests.py", "import pkg.cli\n")
+        selection = select_tests(self._tmp_dir, base)
+        self.assertTrue(selection.run_all)
+        self.assertEqual(
+            "testing/cli_tests.py changed without test modules using it",
+            selection.reason,
+        )
+        nose_patterns = configured_test_patterns(self._tmp_dir, RunnerType.NOSE)
+        selection = select_tests(self._tmp_dir, base, test_patterns=nose_patterns)
+        self.assertFalse(selection.run_all)
+        self.assertEqual(
+            ["testing/cli_tests.py", "tests/test_cli.py"], selection.test_modules
+        )
+
+    def test_configured_test_patterns(self):
+        def test_modules(runner_type):
+            patterns = configured_test_patterns(self._tmp_dir, runner_type)
+            return [name for name in sorted(names) if _is_test_module(name, patterns)]
+
+        names = ["test_a.py", "a_test.py", "tests.py", "testing.py", "check_a.py"]
+        self.assertEqual(["a_test.py", "test_a.py"], test_modules(RunnerType.PYTEST))
+        self.assertEqual(
+            ["a_test.py", "test_a.py", "testing.py", "tests.py"],
+            test_modules(RunnerType.NOSE),
+        )
+        self.assertEqual(
+            ["test_a.py", "testing.py", "tests.py"], test_modules(RunnerType.NOSE2)
+        )
+        self._write("setup.cfg", "[tool:pytest]\npython_files = check_*.py\n")
+        self.assertEqual(["check_a.py"], test_modules(RunnerType.PYTEST))
+        self._write("pytest.ini", "[pytest]\npython_files =\n  tests.py\n  *_test.py\n")
+        self.assertEqual(["a_test.py", "tests.py"], test_modules(RunnerType.PYTEST))
+        self._write("setup.cfg", "[nosetests]\ntestMatch = ^check\n")
+        self.assertEqual(["check_a.py"], test_modules(RunnerType.NOSE))
+        self._write("unittest.cfg", "[unittest]\ntest-file-pattern = *_test.py\n")
+        self.assertEqual(["a_test.py"], test_modules(RunnerType.NOSE2))
+
+    def test_runner_runs_selected_modules(self):
+        base = self._commit()
+        self._write("tests/test_core.py", "from pkg.core import thing\nthing()\n")
+        runner = Runner("pkg", self._tmp_dir, RunnerType.NOSE2, changed_since=base)
+        self.assertEqual(
+            ["tests/test_core.py"], runner.get_test_selection().test_modules
+        )
+        self.assertTrue(runner._runner._test_command().endswith(" tests.test_core"))
+
+        runner = Runner("pkg", self._tmp_dir, RunnerType.PYTEST, changed_since="HEAD")
+        self.assertTrue(runner._runner._test_command().endswith(" tests/test_core.py"))
+
+    def test_runner_skips_run_without_affected_tests(self):
+        base = self._commit()
+        runner = Runner("pkg", self._tmp_dir, RunnerType.NOSE, changed_since=base)
+        self.assertEqual([], runner.get_test_selection().test_modules)
+        self.assertIsNone(runner.run())
+
+
+if __name__ == "__main__":
+    unittest.main()